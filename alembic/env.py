@@ -21,7 +21,10 @@ if config.config_file_name is not None:
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 from app.core.database import Base
-from app.store_system.models import Store, StoreInspection, Product, ProductArrival, Customer, Purchase
+from app.store_system.models import Store, StoreInspection, Product, ProductArrival, Customer, Purchase, Inventory, PurchaseArchiveTotal
+from app.core.idempotency import IdempotencyRecord
+from app.parking_system.models import ParkingLot, ParkingSpace, ParkingSession
+import re
 
 target_metadata = Base.metadata
 
@@ -30,6 +33,14 @@ target_metadata = Base.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+# 월/DEFAULT 파티션은 maintenance 가 관리하므로 autogenerate 대상에서 제외한다
+PARTITION_NAME_RE = re.compile(r"^purchases_(default|y\d{4}m\d{2})$")
+
+def include_name(name, type_, parent_names):
+    if type_ == "table":
+        return not PARTITION_NAME_RE.match(name)
+    return True
+
 def get_url():
     user = os.getenv("DB_USER", "user")
     password = os.getenv("DB_PASSWORD", "password")
@@ -45,6 +56,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -63,7 +75,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_name=include_name
         )
 
         with context.begin_transaction():
@@ -0,0 +1,35 @@
+"""store location search indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 17:40:12.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # 운영 중인 stores 테이블을 잠그지 않도록 트랜잭션 밖에서 CONCURRENTLY 로 만든다
+    with op.get_context().autocommit_block():
+        op.create_index('ix_stores_location_lower', 'stores', [sa.text('lower(location) text_pattern_ops')],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_stores_location_trgm', 'stores', ['location'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'location': 'gin_trgm_ops'},
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_stores_location_trgm', table_name='stores', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_stores_location_lower', table_name='stores', postgresql_concurrently=True, if_exists=True)
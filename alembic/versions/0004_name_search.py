@@ -0,0 +1,47 @@
+"""product and customer name search
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 19:05:41.532310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ('products', 'customers')
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table in TABLES:
+        op.add_column(table, sa.Column('search_vector', postgresql.TSVECTOR(),
+                                       sa.Computed("to_tsvector('simple', coalesce(name, ''))", persisted=True),
+                                       nullable=True))
+    # 생성 컬럼 추가는 테이블을 다시 쓰지만, 인덱스는 잠금 없이 CONCURRENTLY 로 만든다
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(f'ix_{table}_search_vector', table, ['search_vector'], unique=False,
+                            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True)
+            op.create_index(f'ix_{table}_name_trgm', table, ['name'], unique=False,
+                            postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.drop_index(f'ix_{table}_name_trgm', table_name=table, postgresql_concurrently=True, if_exists=True)
+            op.drop_index(f'ix_{table}_search_vector', table_name=table, postgresql_concurrently=True, if_exists=True)
+    for table in TABLES:
+        op.drop_column(table, 'search_vector')
@@ -0,0 +1,106 @@
+"""partition purchases by purchase_date
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 20:12:08.417356
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 마이그레이션 시점에 미리 만들어 둘 미래 월 파티션 수 (이후에는 maintenance manage-partitions 가 관리)
+MONTHS_AHEAD = 3
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _rename_old_table(old: str, new: str) -> None:
+    op.execute(f"ALTER TABLE {old} RENAME TO {new}")
+    # 인덱스 이름은 스키마 안에서 유일해야 하므로 새 테이블과 겹치지 않게 바꾼다
+    op.execute(f"ALTER INDEX ix_{old}_id RENAME TO ix_{new}_id")
+    op.execute(f"ALTER INDEX {old}_pkey RENAME TO {new}_pkey")
+    # 테이블을 지울 때 id 시퀀스가 함께 지워지지 않도록 소유 관계를 끊는다
+    op.execute("ALTER SEQUENCE purchases_id_seq OWNED BY NONE")
+
+
+def upgrade() -> None:
+    op.create_table('purchase_archive_totals',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id')
+    )
+
+    conn = op.get_bind()
+    if conn.execute(sa.text("SELECT EXISTS (SELECT 1 FROM purchases WHERE purchase_date IS NULL)")).scalar():
+        raise RuntimeError("purchases.purchase_date has NULL rows; fix them before partitioning by purchase_date")
+
+    _rename_old_table('purchases', 'purchases_unpartitioned')
+    op.create_table('purchases',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('purchases_id_seq'::regclass)"), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=True),
+    sa.Column('product_id', sa.Integer(), nullable=True),
+    sa.Column('purchase_date', sa.Date(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], name='purchases_customer_id_fkey'),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], name='purchases_product_id_fkey'),
+    sa.PrimaryKeyConstraint('id', 'purchase_date'),
+    postgresql_partition_by='RANGE (purchase_date)'
+    )
+    op.create_index(op.f('ix_purchases_id'), 'purchases', ['id'], unique=False)
+    op.execute("ALTER SEQUENCE purchases_id_seq OWNED BY purchases.id")
+    op.execute("CREATE TABLE purchases_default PARTITION OF purchases DEFAULT")
+
+    # 기존 데이터가 있는 달부터 MONTHS_AHEAD 개월 뒤까지 월 파티션을 만든 뒤 옮긴다
+    this_month = date.today().replace(day=1)
+    oldest = conn.execute(sa.text("SELECT min(purchase_date) FROM purchases_unpartitioned")).scalar()
+    month = min(oldest.replace(day=1), this_month) if oldest else this_month
+    while month <= _add_months(this_month, MONTHS_AHEAD):
+        op.execute(
+            f"CREATE TABLE purchases_y{month.year}m{month.month:02d} PARTITION OF purchases "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+
+    op.execute("""
+        INSERT INTO purchases (id, customer_id, product_id, purchase_date, quantity)
+        SELECT id, customer_id, product_id, purchase_date, quantity FROM purchases_unpartitioned
+    """)
+    op.drop_table('purchases_unpartitioned')
+
+
+def downgrade() -> None:
+    # 분리(detach)된 파티션의 데이터는 되돌리지 않는다
+    _rename_old_table('purchases', 'purchases_partitioned')
+    op.create_table('purchases',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('purchases_id_seq'::regclass)"), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=True),
+    sa.Column('product_id', sa.Integer(), nullable=True),
+    sa.Column('purchase_date', sa.Date(), nullable=True),
+    sa.Column('quantity', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], name='purchases_customer_id_fkey'),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], name='purchases_product_id_fkey'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_purchases_id'), 'purchases', ['id'], unique=False)
+    op.execute("ALTER SEQUENCE purchases_id_seq OWNED BY purchases.id")
+    op.execute("""
+        INSERT INTO purchases (id, customer_id, product_id, purchase_date, quantity)
+        SELECT id, customer_id, product_id, purchase_date, quantity FROM purchases_partitioned
+    """)
+    op.drop_table('purchases_partitioned')
+    op.drop_table('purchase_archive_totals')
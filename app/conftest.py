@@ -0,0 +1,154 @@
+# app/conftest.py (store_system / parking_system 테스트 공용)
+import pytest
+import pytest_asyncio
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from app.core.database import Base, get_db, get_lazy_db, get_async_db, get_lazy_async_db
+from app.core.testing import QueryCounter, worker_database_name, ensure_template_database, clone_database, drop_database, database_url, async_database_url
+from app.main import app, list_cache as app_list_cache, admission as app_admission, query_stats_observers, warmup as app_warmup, drainer as app_drainer
+from app.core.admission import ConcurrencyLimiter
+from app.core.config import settings
+from fastapi.testclient import TestClient
+from httpx import AsyncClient
+from app.store_system.tests.factories import CustomerFactory, ProductFactory, StoreFactory, PurchaseFactory
+
+
+import warnings
+warnings.filterwarnings("ignore", category=DeprecationWarning, module="cgi")
+
+
+# 세션(xdist 워커)당 한 번: 템플릿 DB(스키마 변경 시에만 재생성)를 복제해서 워커 전용 테스트 DB 를 만든다
+@pytest.fixture(scope="session")
+def test_database():
+    name = worker_database_name()
+    ensure_template_database(Base.metadata)
+    clone_database(name)
+    yield name
+    drop_database(name)
+
+
+# 앱 시작 시 주차 점유 카운터를 (테스트 DB 가 아닌) 설정의 DB 로 채우지 않는다. 카운터는 parking_system 테스트 conftest 에서 채운다
+settings.PARKING_OCCUPANCY_RECONCILER = False
+# 시작 워밍업도 설정의 DB 에 연결하지 않는다 (바로 ready)
+app_warmup.connections = app_warmup.async_connections = 0
+app_warmup.prime = False
+
+
+# @pytest.mark.max_queries(n): 테스트에서 보낸 API 요청 중 하나라도 SQL 을 n 개보다 많이 실행하면 실패한다 (N+1 회귀 방지)
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker("max_queries")
+    if marker is None:
+        yield
+        return
+    recorded = []
+    observer = lambda route, stats: recorded.append((route, stats.count))
+    query_stats_observers.append(observer)
+    try:
+        outcome = yield
+    finally:
+        query_stats_observers.remove(observer)
+    over = [f"{route}: {count}" for route, count in recorded if count > marker.args[0]]
+    if outcome.excinfo is None and over:
+        pytest.fail(f"more than {marker.args[0]} queries per request: {', '.join(over)}", pytrace=False)
+
+
+# 동기 엔진 설정
+@pytest.fixture(scope="session")
+def engine(test_database):
+    engine = create_engine(database_url(test_database))
+    yield engine
+    engine.dispose()
+
+
+# 비동기 엔진 설정 (테스트마다 이벤트 루프가 바뀌므로 커넥션을 풀링하지 않는다)
+@pytest.fixture(scope="session")
+def async_engine(test_database):
+    return create_async_engine(async_database_url(test_database), poolclass=NullPool)
+
+
+# with count_queries() as counter: ... 형태로 블록 안에서 실행된 SQL 수를 센다
+@pytest.fixture
+def count_queries(engine):
+    return lambda: QueryCounter(engine)
+
+
+# 테스트마다 바깥 트랜잭션을 열고 끝나면 롤백한다.
+# 세션의 commit/rollback 은 SAVEPOINT 에만 적용되므로 테스트 간 데이터가 남지 않는다.
+@pytest.fixture
+def db_session(engine):
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, autoflush=False, join_transaction_mode="create_savepoint")
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
+
+
+@pytest_asyncio.fixture
+async def async_db_session(async_engine):
+    async with async_engine.connect() as connection:
+        transaction = await connection.begin()
+        session = AsyncSession(bind=connection, autoflush=False, join_transaction_mode="create_savepoint")
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+# 목록 응답 캐시는 기본으로 꺼져 있으므로 필요한 테스트에서만 켠다
+@pytest.fixture
+def list_cache():
+    ttl = app_list_cache.ttl
+    app_list_cache.ttl = 60
+    app_list_cache.clear()
+    yield app_list_cache
+    app_list_cache.ttl = ttl
+    app_list_cache.clear()
+
+
+# 부하 차단 자리를 읽기/쓰기 1개씩, 대기 시간을 짧게 줄인다
+@pytest.fixture
+def admission():
+    limiters, queue_timeout, max_queue = app_admission.limiters, app_admission.queue_timeout, app_admission.max_queue
+    app_admission.limiters = {"read": ConcurrencyLimiter(1), "write": ConcurrencyLimiter(1)}
+    app_admission.queue_timeout, app_admission.max_queue = 0.05, 1
+    yield app_admission
+    app_admission.limiters, app_admission.queue_timeout, app_admission.max_queue = limiters, queue_timeout, max_queue
+
+
+@pytest.fixture
+def test_client(db_session):
+    def override_get_db():
+        yield db_session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_lazy_db] = override_get_db
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.clear()
+    # 테스트가 켠 종료 상태(drainer.draining)를 되돌린다
+    app_drainer.reset()
+
+
+@pytest_asyncio.fixture
+async def async_test_client(db_session, async_db_session):
+    def override_get_db():
+        yield db_session
+
+    async def override_get_async_db():
+        yield async_db_session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_lazy_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_lazy_async_db] = override_get_async_db
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
@@ -0,0 +1,125 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Iterable, Tuple
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from .metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT
+
+# 커넥션 풀이 바닥나면 요청이 pool_timeout 동안 스레드를 잡고 기다리다가 전체 지연이 무너진다.
+# 풀 크기만큼만 동시에 처리하고, 잠깐 기다려도 자리가 없으면 바로 503 을 돌려준다.
+# prefixes 밖의 경로(/metrics, /db-check 등)는 제한하지 않는다.
+
+
+class ConcurrencyLimiter:
+    """이벤트 루프 안에서 쓰는 FIFO 세마포어 (이벤트 루프에 묶이지 않아서 테스트 클라이언트마다 루프가 달라도 된다)."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters: "deque[asyncio.Future]" = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, timeout: float) -> bool:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            # 시간이 다 된 순간 자리를 넘겨받았을 수도 있다
+            return future.done() and not future.cancelled()
+        except BaseException:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            if future in self._waiters:
+                self._waiters.remove(future)
+
+    def set_limit(self, limit: int) -> None:
+        self.limit = limit
+        # 늘어난 자리만큼 기다리는 요청을 깨운다
+        while self.active < self.limit and self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                self.active += 1
+                future.set_result(None)
+
+    def release(self) -> None:
+        # 기다리는 요청이 있으면 자리를 그대로 넘겨준다 (상한이 줄어 넘쳐 있으면 넘겨주지 않고 줄인다)
+        while self._waiters and self.active <= self.limit:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+class AdmissionController:
+    def __init__(self, capacity: int, write_share: float, queue_timeout: float, max_queue: int,
+                 prefixes: Iterable[str], enabled: bool = True):
+        self.write_share = write_share
+        reads, writes = self.split(capacity)
+        self.limiters: Dict[str, ConcurrencyLimiter] = {
+            "read": ConcurrencyLimiter(reads),
+            "write": ConcurrencyLimiter(writes),
+        }
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self.prefixes = tuple(prefix.rstrip("/") + "/" for prefix in prefixes)
+        self.enabled = enabled
+
+    def split(self, capacity: int) -> Tuple[int, int]:
+        writes = min(max(1, round(capacity * self.write_share)), capacity - 1) if capacity > 1 else 1
+        return max(1, capacity - writes), writes
+
+    def set_capacity(self, capacity: int) -> None:
+        # 커넥션 풀 상한이 바뀌면 따라간다 (이벤트 루프 스레드에서 호출)
+        reads, writes = self.split(capacity)
+        self.limiters["read"].set_limit(reads)
+        self.limiters["write"].set_limit(writes)
+
+    @staticmethod
+    def route_class(request: Request) -> str:
+        # POST /batch 는 조회
+        if request.method in ("GET", "HEAD", "OPTIONS") or request.url.path.endswith("/batch"):
+            return "read"
+        return "write"
+
+    def reject(self, route_class: str, reason: str) -> Response:
+        ADMISSION_REJECTED.labels(route_class, reason).inc()
+        return JSONResponse({"detail": "Server is busy, retry later"}, status_code=503,
+                            headers={"Retry-After": str(max(1, math.ceil(self.queue_timeout)))})
+
+    async def handle(self, request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+        if not self.enabled or not request.url.path.startswith(self.prefixes):
+            return await call_next(request)
+
+        route_class = self.route_class(request)
+        limiter = self.limiters[route_class]
+        if limiter.waiting >= self.max_queue:
+            return self.reject(route_class, "queue_full")
+        started = time.perf_counter()
+        ADMISSION_QUEUE_DEPTH.labels(route_class).inc()
+        try:
+            admitted = await limiter.acquire(self.queue_timeout)
+        finally:
+            ADMISSION_QUEUE_DEPTH.labels(route_class).dec()
+        if not admitted:
+            return self.reject(route_class, "timeout")
+        ADMISSION_WAIT.labels(route_class).observe(time.perf_counter() - started)
+
+        ADMISSION_IN_FLIGHT.labels(route_class).inc()
+        try:
+            return await call_next(request)
+        finally:
+            ADMISSION_IN_FLIGHT.labels(route_class).dec()
+            limiter.release()
@@ -0,0 +1,32 @@
+from typing import List, Sequence
+from fastapi import HTTPException, Response
+from pydantic import BaseModel, conlist
+from .config import settings
+
+# id 목록 일괄 조회 (GET /{resource}/?ids=1,2,3, POST /{resource}/batch) 공통 처리
+
+
+class IdList(BaseModel):
+    # URL 길이 제한 때문에 긴 목록은 POST 본문으로 받는다
+    ids: conlist(int, min_items=1, max_items=settings.BATCH_MAX_IDS)
+
+
+def parse_ids(ids: str) -> List[int]:
+    try:
+        parsed = [int(i) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be a comma-separated list of integers")
+    if not parsed:
+        raise HTTPException(status_code=422, detail="ids must not be empty")
+    if len(parsed) > settings.BATCH_MAX_IDS:
+        raise HTTPException(status_code=422, detail=f"Too many ids (max {settings.BATCH_MAX_IDS})")
+    return parsed
+
+
+def batch_result(response: Response, ids: Sequence[int], objs: list) -> list:
+    # 찾지 못한 id 는 X-Missing-Ids 헤더로 알려준다 (본문은 목록 응답과 같은 형태 유지)
+    found = {obj.id for obj in objs}
+    missing = [id for id in dict.fromkeys(ids) if id not in found]
+    if missing:
+        response.headers["X-Missing-Ids"] = ",".join(map(str, missing))
+    return objs
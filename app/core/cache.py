@@ -0,0 +1,148 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, Mapping, NamedTuple, Optional, Tuple
+from fastapi import Request, Response
+from .etag import etag_matches, not_modified
+from .metrics import LIST_CACHE_REQUESTS, LIST_CACHE_COALESCED_WAIT
+
+# 목록 GET 응답 캐시 (프로세스 메모리, 워커마다 따로)
+# - 키: 경로 + 정렬한 쿼리 파라미터, 짧은 TTL
+# - 같은 키로 동시에 들어온 미스는 한 요청만 DB 를 조회하고 나머지는 그 결과를 기다린다 (single-flight)
+# - 해당 리소스(와 그 리소스를 expand 로 포함하는 리소스)에 쓰기가 성공하면 무효화
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    headers: Tuple[Tuple[str, str], ...]
+    media_type: Optional[str]
+    expires_at: float
+
+    def etag(self) -> Optional[str]:
+        return next((value for name, value in self.headers if name == "etag"), None)
+
+    def to_response(self) -> Response:
+        response = Response(content=self.body, media_type=self.media_type)
+        for name, value in self.headers:
+            if name not in ("content-length", "content-type"):
+                response.headers[name] = value
+        return response
+
+
+class ResponseCache:
+    def __init__(self, ttl: float, prefix: str, dependents: Mapping[str, Iterable[str]] = None, max_entries: int = 1024):
+        self.ttl = ttl
+        self.prefix = prefix.rstrip("/")
+        self.dependents = {name: tuple(deps) for name, deps in (dependents or {}).items()}
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], CachedResponse]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str, int], asyncio.Future] = {}
+        # 무효화 세대: 조회 도중 쓰기가 있었으면 그 결과는 저장하지 않는다
+        self._generations: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def resource_of(self, path: str) -> Optional[str]:
+        # /store-system/products/... -> products
+        if not path.startswith(self.prefix + "/"):
+            return None
+        return path[len(self.prefix) + 1:].split("/", 1)[0] or None
+
+    def is_list_request(self, request: Request) -> bool:
+        path = request.url.path
+        return request.method == "GET" and path.endswith("/") and self.resource_of(path) is not None \
+            and path.count("/") == self.prefix.count("/") + 2
+
+    def is_write_request(self, request: Request) -> bool:
+        # POST /batch 는 조회
+        return request.method in ("POST", "PUT", "PATCH", "DELETE") and not request.url.path.endswith("/batch") \
+            and self.resource_of(request.url.path) is not None
+
+    @staticmethod
+    def cache_key(request: Request) -> str:
+        # 같은 이름의 파라미터(expand, ids 등)는 순서를 유지하고 이름 순으로만 정렬한다
+        params = sorted(request.query_params.multi_items(), key=lambda item: item[0])
+        return request.url.path + "?" + "&".join(f"{name}={value}" for name, value in params)
+
+    def invalidate(self, resource: str) -> None:
+        for name in (resource, *self.dependents.get(resource, ())):
+            self._generations[name] = self._generations.get(name, 0) + 1
+            for key in [key for key in self._entries if key[0] == name]:
+                del self._entries[key]
+
+    def _get(self, resource: str, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get((resource, key))
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[(resource, key)]
+            return None
+        self._entries.move_to_end((resource, key))
+        return entry
+
+    def _put(self, resource: str, key: str, entry: CachedResponse) -> None:
+        self._entries[(resource, key)] = entry
+        self._entries.move_to_end((resource, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _fetch(self, request: Request, call_next) -> Tuple[Response, Optional[CachedResponse]]:
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response, None
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        entry = CachedResponse(body, tuple(response.headers.items()), response.media_type, time.monotonic() + self.ttl)
+        return entry.to_response(), entry
+
+    async def handle(self, request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+        if not self.enabled:
+            return await call_next(request)
+        if self.is_write_request(request):
+            response = await call_next(request)
+            if response.status_code < 400:
+                self.invalidate(self.resource_of(request.url.path))
+            return response
+        if not self.is_list_request(request):
+            return await call_next(request)
+
+        resource, key = self.resource_of(request.url.path), self.cache_key(request)
+        if_none_match = request.headers.get("if-none-match")
+        entry = self._get(resource, key)
+        if entry is not None:
+            LIST_CACHE_REQUESTS.labels(resource, "hit").inc()
+            if entry.etag() and etag_matches(if_none_match, entry.etag()):
+                return not_modified(entry.etag())
+            return entry.to_response()
+        if if_none_match:
+            # 조건부 요청의 304 는 캐시할 수 없으므로 그대로 보낸다
+            LIST_CACHE_REQUESTS.labels(resource, "bypass").inc()
+            return await call_next(request)
+
+        generation = self._generations.get(resource, 0)
+        flight = (resource, key, generation)
+        leader = self._inflight.get(flight)
+        if leader is not None:
+            LIST_CACHE_REQUESTS.labels(resource, "coalesced").inc()
+            started = time.perf_counter()
+            entry = await asyncio.shield(leader)
+            LIST_CACHE_COALESCED_WAIT.labels(resource).observe(time.perf_counter() - started)
+            # 앞선 요청이 실패했으면 직접 조회한다
+            return entry.to_response() if entry is not None else await call_next(request)
+
+        LIST_CACHE_REQUESTS.labels(resource, "miss").inc()
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[flight] = future
+        entry = None
+        try:
+            response, entry = await self._fetch(request, call_next)
+            if entry is not None and self._generations.get(resource, 0) == generation:
+                self._put(resource, key, entry)
+            return response
+        finally:
+            del self._inflight[flight]
+            future.set_result(entry)
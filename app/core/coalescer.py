@@ -0,0 +1,148 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Generic, List, Optional, TypeVar
+from loguru import logger
+from .metrics import WRITE_COALESCER_BATCH_SIZE, WRITE_COALESCER_FLUSH_LATENCY
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_FLUSH = object()  # flush_now(): 모으던 배치를 창이 끝나기 전에 바로 처리한다
+
+
+class WriteCoalescer(Generic[T, R]):
+    """짧은 시간(window) 안에 들어온 쓰기를 모아 flush() 한 번(한 트랜잭션)으로 처리한다.
+
+    submit() 을 호출한 요청 스레드는 자기 항목의 결과가 나올 때까지 (timeout 초까지) 기다린다.
+    배치가 실패하면 항목을 하나씩 다시 처리해서 문제가 된 요청만 실패시킨다.
+    닫히거나 처리 스레드가 죽으면 큐에 남은 항목은 모두 실패시키므로 결과를 받지 못하고 남는 요청은 없다.
+    """
+
+    def __init__(self, flush: Callable[[List[T]], List[R]], window: float, max_batch: int, name: str):
+        self.flush = flush
+        self.window = window
+        self.max_batch = max_batch
+        self.name = name
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self.submitted = 0
+
+    def submit(self, item: T, timeout: Optional[float] = None) -> R:
+        # 닫혔는지 확인하고 넣는 것을 close()/처리 스레드 종료와 같은 락 안에서 해서, 멈춘 뒤에 들어가는 항목이 없게 한다
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"{self.name} coalescer is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-coalescer", daemon=True)
+                self._thread.start()
+            self._queue.put((item, future))
+            self.submitted += 1
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # 아직 배치에 들어가지 않았으면 쓰지 않는다 (이미 쓰는 중이면 결과만 버린다)
+            future.cancel()
+            raise
+
+    def flush_now(self) -> None:
+        self._queue.put(_FLUSH)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        # 이미 들어온 항목은 모두 처리하고 멈춘다
+        with self._lock:
+            self._closed = True
+            if self._thread is not None:
+                self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _collect(self, first) -> tuple:
+        batch = [first]
+        stop = False
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                stop = True
+                break
+            if entry is _FLUSH:
+                break
+            batch.append(entry)
+        return batch, stop
+
+    def _run(self) -> None:
+        try:
+            while True:
+                first = self._queue.get()
+                if first is None:
+                    return
+                if first is _FLUSH:
+                    continue
+                batch, stop = self._collect(first)
+                # 기다리다 포기한(timeout) 요청의 항목은 쓰지 않는다
+                batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+                try:
+                    if batch:
+                        self._flush(batch)
+                except BaseException as e:
+                    self._fail(batch, e)
+                    raise
+                if stop:
+                    return
+        except BaseException as e:
+            # 그 배치의 요청들은 이미 이 예외로 실패했다
+            logger.error(f"{self.name} coalescer stopped: {e!r}")
+        finally:
+            self._reject_queued()
+
+    def _reject_queued(self) -> None:
+        # 처리 스레드가 멈추면 (close 또는 예외) 더는 받지 않고 큐에 남은 항목을 실패시킨다
+        with self._lock:
+            self._closed = True
+        error = RuntimeError(f"{self.name} coalescer is closed")
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if entry is not None and entry is not _FLUSH and entry[1].set_running_or_notify_cancel():
+                entry[1].set_exception(error)
+
+    @staticmethod
+    def _fail(batch: list, error: BaseException) -> None:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def _flush(self, batch: list) -> None:
+        items = [item for item, _ in batch]
+        started = time.perf_counter()
+        try:
+            results = self.flush(items)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            logger.warning(f"{self.name} batch of {len(batch)} failed ({e!r}), retrying one by one")
+            for entry in batch:
+                self._flush([entry])
+            return
+        if len(results) != len(batch):
+            # 어느 결과가 어느 요청의 것인지 알 수 없으므로 모두 실패시킨다
+            self._fail(batch, RuntimeError(f"{self.name} flush returned {len(results)} results for {len(batch)} items"))
+            return
+        WRITE_COALESCER_BATCH_SIZE.labels(self.name).observe(len(batch))
+        WRITE_COALESCER_FLUSH_LATENCY.labels(self.name).observe(time.perf_counter() - started)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
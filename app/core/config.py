@@ -1,5 +1,6 @@
 from pydantic import BaseSettings
 from pathlib import Path
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     DB_USER: str
@@ -12,6 +13,113 @@ class Settings(BaseSettings):
     DATABASE_URL: str = None
     ASYNC_DATABASE_URL: str = None
 
+    # DB 커넥션 풀 (동기/비동기 엔진 각각)
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+
+    # 커넥션 풀 자동 조절 (동기 엔진): 체크아웃 대기 시간/사용률을 보고 동시 사용 상한을
+    # DB_POOL_MIN_SIZE ~ DB_POOL_MAX_SIZE 안에서 DB_POOL_ADAPT_INTERVAL 초마다 바꾼다.
+    # 처음 상한은 DB_POOL_SIZE + DB_MAX_OVERFLOW
+    DB_POOL_ADAPTIVE: bool = False
+    DB_POOL_MIN_SIZE: int = 5
+    DB_POOL_MAX_SIZE: int = 40
+    DB_POOL_ADAPT_INTERVAL: float = 5.0
+    DB_POOL_WAIT_TARGET_MS: float = 5.0
+
+    # 시작 워밍업: 앱 시작 후 백그라운드에서 동기/비동기 엔진 커넥션을 이만큼씩 미리 열고(풀 크기까지),
+    # DB_WARMUP_PRIME_STATEMENTS 면 CRUD 기본 조회를 한 번씩 실행해서 SQL 컴파일 캐시를 채운다. 끝나기 전에는 /ready 가 503
+    DB_WARMUP_CONNECTIONS: int = 5
+    DB_WARMUP_PRIME_STATEMENTS: bool = True
+
+    # 동기 엔드포인트/의존성을 실행하는 스레드 수 (anyio 기본 limiter, 기본 40). 0 이면 동기 엔진 커넥션 풀 크기
+    # (DB_POOL_SIZE + DB_MAX_OVERFLOW, 자동 조절 시 현재 상한) + THREADPOOL_EXTRA_THREADS 로 맞춘다.
+    # 사용량/대기 수는 THREADPOOL_MONITOR_INTERVAL 초마다 메트릭으로 남긴다
+    THREADPOOL_SIZE: int = 0
+    THREADPOOL_EXTRA_THREADS: int = 4
+    THREADPOOL_MONITOR_INTERVAL: float = 1.0
+
+    # 종료 신호를 받고 진행 중인 요청을 기다리는 최대 시간(초, app/serve.py). 그동안 새 요청은 503, 끝나면 uvicorn 이 종료하면서 두 엔진의 커넥션 풀을 닫는다
+    SHUTDOWN_DRAIN_TIMEOUT: float = 20
+
+    # 부하 차단: 동시에 처리하는 API 요청 수를 커넥션 풀 크기(DB_POOL_SIZE + DB_MAX_OVERFLOW, 자동 조절 시 현재 상한)로 제한한다.
+    # 읽기/쓰기 몫을 나눠서 한쪽이 몰려도 다른 쪽 자리는 남는다
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_WRITE_SHARE: float = 0.3
+    # 자리를 기다리는 최대 시간(초)과 기다릴 수 있는 요청 수, 넘으면 503 + Retry-After
+    ADMISSION_QUEUE_TIMEOUT: float = 1.0
+    ADMISSION_MAX_QUEUE: int = 100
+
+    # 요청 기한(ms, 0 이면 제한 없음): DB 쿼리는 SET LOCAL statement_timeout 으로 남은 시간 안에서만 실행된다.
+    # 경로별 기본값은 {"GET /store-system/purchases/": 5000} 처럼 메서드 + 경로 템플릿으로 지정한다.
+    # 클라이언트는 X-Request-Timeout-Ms 헤더로 더 짧게만 줄일 수 있다
+    REQUEST_TIMEOUT_MS: int = 30000
+    REQUEST_TIMEOUT_ROUTES: Dict[str, int] = {}
+
+    # 응답에 Server-Timing 헤더(pool, db, validate, app, serialize, handler, total 구간별 ms)를 붙인다
+    SERVER_TIMING_ENABLED: bool = False
+
+    # 분산 추적 (OpenTelemetry): 요청, CRUD 메서드, 커넥션 체크아웃, SQL 문 스팬.
+    # TRACING_EXPORTER = otlp (TRACING_OTLP_ENDPOINT, 없으면 OTEL_EXPORTER_OTLP_ENDPOINT 또는 http://localhost:4318/v1/traces)
+    # | file (TRACING_FILE 에 한 줄에 스팬 하나씩 JSON).
+    # 헤드 샘플링: 새 trace 중 TRACING_SAMPLE_RATE 비율만 기록 (들어온 traceparent 의 결정은 따른다).
+    # 테일 샘플링: TRACING_TAIL_LATENCY_MS 를 주면 그 이상 걸렸거나 에러가 난 요청의 trace 만 내보낸다
+    TRACING_ENABLED: bool = False
+    TRACING_SERVICE_NAME: str = "store-parking-api"
+    TRACING_EXPORTER: str = "otlp"
+    TRACING_OTLP_ENDPOINT: Optional[str] = None
+    TRACING_FILE: str = "traces/spans.jsonl"
+    TRACING_SAMPLE_RATE: float = 1.0
+    TRACING_TAIL_LATENCY_MS: Optional[float] = None
+
+    # 요청 하나에서 같은 SQL 이 이 횟수 이상 실행되면 N+1 의심으로 경고한다 (DEBUG 면 응답에 X-DB-Query-Count/X-DB-Query-Time-Ms 헤더)
+    QUERY_REPEAT_THRESHOLD: int = 10
+
+    # 요청 프로파일링 (pyinstrument): X-Profile: html | speedscope 헤더가 있는 요청 하나를 프로파일링해서 결과를 응답으로 돌려준다.
+    # DEBUG 이거나 X-Profile-Token 헤더가 PROFILING_TOKEN 과 같을 때만 동작한다.
+    # PROFILING_SAMPLE_RATE(0~1, 경로별 {"GET /store-system/purchases/": 0.01})만큼의 요청은 계속 프로파일링해서 PROFILING_DIR 에 저장한다.
+    # 아무것도 설정하지 않으면 미들웨어를 붙이지 않는다
+    PROFILING_TOKEN: Optional[str] = None
+    PROFILING_INTERVAL: float = 0.001
+    PROFILING_SAMPLE_RATE: float = 0
+    PROFILING_SAMPLE_ROUTES: Dict[str, float] = {}
+    PROFILING_SAMPLE_FORMAT: str = "speedscope"
+    PROFILING_DIR: str = "profiles"
+
+    # 검색 한 번에 랭킹하는 최대 후보 수 (흔한 검색어로 수백만 행을 정렬하지 않도록)
+    SEARCH_MAX_RESULTS: int = 1000
+
+    # 목록 ?count=true 의 X-Total-Count: 조건 없는 목록은 통계 추정치, 조건이 있으면 이 개수까지만 세고 넘으면 "10000+"
+    LIST_COUNT_CAP: int = 10000
+
+    # ?ids= / POST /batch 로 한 번에 조회할 수 있는 최대 id 수
+    BATCH_MAX_IDS: int = 1000
+
+    # 목록 GET 응답 캐시 TTL(초). 0 이면 캐시하지 않는다
+    LIST_CACHE_TTL: float = 0
+    LIST_CACHE_MAX_ENTRIES: int = 1024
+
+    # Idempotency-Key 보관 기간(초)
+    IDEMPOTENCY_KEY_TTL: int = 24 * 60 * 60
+    # 처리 중인 키의 임대 시간(초). 처리하던 프로세스가 죽어서 응답이 저장되지 않은 키는 이 시간이 지나면 재시도가 다시 실행한다.
+    # 요청 기한(REQUEST_TIMEOUT_MS)보다 길어야 살아 있는 요청의 키를 빼앗지 않는다
+    IDEMPOTENCY_LOCK_TIMEOUT: float = 60
+
+    # 구매 월 파티션: 미리 만들어 둘 개월 수, 보존 개월 수 (None 이면 오래된 파티션을 분리하지 않음)
+    PURCHASE_PARTITION_MONTHS_AHEAD: int = 3
+    PURCHASE_RETENTION_MONTHS: Optional[int] = None
+
+    # POST /purchases/ 묶음 처리: 첫 요청 후 이 시간(ms) 동안 또는 MAX_ROWS 개까지 모아 한 번에 INSERT/커밋한다.
+    # 0 이면 요청마다 따로 커밋한다
+    PURCHASE_COALESCE_WINDOW_MS: float = 0
+    PURCHASE_COALESCE_MAX_ROWS: int = 500
+
+    # 주차 게이트 이벤트: 한 번에 받을 수 있는 최대 이벤트 수, 주차장별 점유 카운터를 DB 와 맞추는 주기(초, 0 이면 시작할 때만).
+    # PARKING_OCCUPANCY_RECONCILER 가 False 면 앱 시작 시 카운터를 채우지 않는다 (테스트)
+    PARKING_EVENT_BATCH_MAX: int = 5000
+    PARKING_OCCUPANCY_RECONCILER: bool = True
+    PARKING_OCCUPANCY_RECONCILE_INTERVAL: float = 30
+
     class Config:
         env_file = Path(__file__).resolve().parent.parent.parent / '.env'
         env_file_encoding = 'utf-8'
@@ -1,19 +1,75 @@
-from typing import Generic, TypeVar, Type, List
-from sqlalchemy.orm import Session
+from typing import Generic, TypeVar, Type, List, Optional, Sequence
+from sqlalchemy.orm import Session, selectinload
 from pydantic import BaseModel
 from contextlib import contextmanager, asynccontextmanager
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, any_, bindparam, func, literal, text
+from sqlalchemy.dialects.postgresql import ARRAY, INTEGER, insert
+from ..config import settings
+from ..pagination import TotalCount
+from ..tracing import trace_methods
 
 ModelType = TypeVar("ModelType")
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+def _id_array(ids: Sequence[int]):
+    # IN (...) 과 달리 id 개수와 상관없이 같은 SQL 문이 된다
+    return bindparam("ids", list(ids), type_=ARRAY(INTEGER))
+
+def _upsert_statement(model, objs_in: Sequence[BaseModel], index_elements: Sequence[str], update_fields: Optional[Sequence[str]]):
+    # 같은 키가 여러 번 오면 마지막 값만 쓴다 (한 문장에서 같은 행을 두 번 갱신할 수 없음)
+    rows = {}
+    for obj_in in objs_in:
+        data = jsonable_encoder(obj_in)
+        rows[tuple(data[name] for name in index_elements)] = data
+    if not rows:
+        return None, []
+    if update_fields is None:
+        update_fields = [name for name in next(iter(rows.values())) if name not in index_elements] or list(index_elements)
+    stmt = insert(model).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(index_elements=list(index_elements), set_={name: stmt.excluded[name] for name in update_fields})
+    return stmt.returning(model), list(rows)
+
+# 테이블(파티션 테이블이면 모든 파티션)의 통계상 행 수. 한 번도 ANALYZE 되지 않았으면 analyzed 가 False
+_ESTIMATED_ROWS = text("""
+    SELECT coalesce(max(c.reltuples), -1) >= 0 AS analyzed, coalesce(sum(greatest(c.reltuples, 0)), 0)::bigint AS estimate
+    FROM pg_class c
+    WHERE c.relkind = 'r'
+      AND (c.oid = CAST(:table AS regclass) OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = CAST(:table AS regclass)))
+""")
+
+def _count_statements(model, criteria, cap: int):
+    # cap + 1 행까지만 읽고 센다 (조건에 맞는 행이 수백만 개여도 COUNT(*) 로 전부 훑지 않는다)
+    limited = select(literal(1)).select_from(model).where(*criteria).limit(cap + 1).subquery()
+    return _ESTIMATED_ROWS.bindparams(table=model.__table__.fullname), select(func.count()).select_from(limited)
+
+def _estimated_total(row, cap: int) -> Optional[TotalCount]:
+    # 통계가 없거나 cap 이하로 작으면 직접 센다 (작은 테이블은 정확한 값이 싸다)
+    analyzed, estimate = row
+    return TotalCount(estimate, "estimate") if analyzed and estimate > cap else None
+
+def _counted_total(counted: int, cap: int) -> TotalCount:
+    return TotalCount(cap, "at_least") if counted > cap else TotalCount(counted, "exact")
+
+def _in_key_order(objs, index_elements: Sequence[str], keys: list) -> list:
+    by_key = {tuple(getattr(obj, name) for name in index_elements): obj for obj in objs}
+    return [by_key[key] for key in keys]
+
+def _in_request_order(objs, ids: Sequence[int]) -> list:
+    by_id = {obj.id: obj for obj in objs}
+    return [by_id[id] for id in dict.fromkeys(ids) if id in by_id]
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         self.model = model
 
+    def __init_subclass__(cls, **kwargs):
+        # DB 를 받는 메서드마다 추적 스팬 (app.core.tracing, 꺼져 있으면 그대로 호출)
+        super().__init_subclass__(**kwargs)
+        trace_methods(cls)
+
     @contextmanager
     def auto_commit(self, db: Session):
         try:
@@ -23,26 +79,71 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             db.rollback()
             raise e
 
-    def create(self, db: Session, obj_in: CreateSchemaType) -> ModelType:
+    def create(self, db: Session, obj_in: CreateSchemaType, commit: bool = True) -> ModelType:
+        # commit=False 면 INSERT 만 보내고 커밋(실패 시 롤백)은 호출한 쪽이 한다 (다른 쓰기와 한 트랜잭션으로 묶을 때)
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)
-        with self.auto_commit(db):
+        if commit:
+            with self.auto_commit(db):
+                db.add(db_obj)
+        else:
             db.add(db_obj)
+            db.flush()
         db.refresh(db_obj)
         return db_obj
 
     def get(self, db: Session, id: int) -> ModelType | None:
         return db.query(self.model).filter(self.model.id == id).first()
 
-    def get_multi(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[ModelType]:
-        return db.query(self.model).offset(skip).limit(limit).all()
+    def upsert(self, db: Session, objs_in: Sequence[CreateSchemaType], index_elements: Sequence[str],
+               update_fields: Optional[Sequence[str]] = None) -> List[ModelType]:
+        """index_elements(유니크 컬럼) 기준으로 INSERT ... ON CONFLICT DO UPDATE ... RETURNING 한 번에 생성/갱신한다.
+
+        update_fields 를 생략하면 키가 아닌 모든 필드를 갱신한다. 입력 순서(중복 키 제거)대로 돌려준다.
+        """
+        stmt, keys = _upsert_statement(self.model, objs_in, index_elements, update_fields)
+        if stmt is None:
+            return []
+        with self.auto_commit(db):
+            objs = db.scalars(stmt, execution_options={"populate_existing": True}).all()
+            # 커밋 후 만료되어 객체마다 다시 SELECT 하지 않도록 RETURNING 으로 받은 값 그대로 세션에서 분리한다
+            for obj in objs:
+                db.expunge(obj)
+        return _in_key_order(objs, index_elements, keys)
+
+    def get_version(self, db: Session, id: int) -> Optional[str]:
+        # 행 전체 대신 버전(xmin)만 읽는다 (조건부 GET 용)
+        return db.query(self.model.version).filter(self.model.id == id).scalar()
+
+    def get_many(self, db: Session, ids: Sequence[int], expand: Sequence[str] = ()) -> List[ModelType]:
+        # id = ANY(:ids) 한 번으로 읽고 요청한 순서대로 돌려준다 (중복 제거, 없는 id 는 빠짐)
+        objs = db.query(self.model).options(*self.expand_options(expand)).filter(self.model.id == any_(_id_array(ids))).all()
+        return _in_request_order(objs, ids)
+
+    def expand_options(self, expand: Sequence[str] = ()):
+        # 요청한 관계를 selectinload 로 한 번에 읽어 N+1 조회를 막는다
+        return [selectinload(getattr(self.model, name)) for name in expand]
+
+    def get_multi(self, db: Session, *, skip: int = 0, limit: int = 100, expand: Sequence[str] = ()) -> List[ModelType]:
+        return db.query(self.model).options(*self.expand_options(expand)).offset(skip).limit(limit).all()
+
+    def count(self, db: Session, *criteria, cap: Optional[int] = None) -> TotalCount:
+        """목록 전체 개수. 조건이 없으면 통계(pg_class.reltuples)가 cap 보다 클 때 추정치를 쓰고,
+        그 밖에는 cap(기본 LIST_COUNT_CAP) 개까지만 세서 넘으면 "cap 개 이상"(at_least)으로 돌려준다.
+        """
+        cap = settings.LIST_COUNT_CAP if cap is None else cap
+        estimated_rows, count_rows = _count_statements(self.model, criteria, cap)
+        if not criteria:
+            total = _estimated_total(db.execute(estimated_rows).one(), cap)
+            if total is not None:
+                return total
+        return _counted_total(db.scalar(count_rows), cap)
 
     def update(self, db: Session, db_obj: ModelType, obj_in: UpdateSchemaType) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
         update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        for field, value in update_data.items():
+            if hasattr(db_obj, field):
+                setattr(db_obj, field, value)
         with self.auto_commit(db):
             db.add(db_obj)
         db.refresh(db_obj)
@@ -59,6 +160,10 @@ class AsyncCRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         self.model = model
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        trace_methods(cls)
+
     @asynccontextmanager
     async def auto_commit(self, db: AsyncSession):
         try:
@@ -80,16 +185,43 @@ class AsyncCRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         result = await db.execute(select(self.model).filter(self.model.id == id))
         return result.scalars().first()
 
-    async def get_multi(self, db: AsyncSession, *, skip: int = 0, limit: int = 100) -> List[ModelType]:
-        result = await db.execute(select(self.model).offset(skip).limit(limit))
+    async def upsert(self, db: AsyncSession, objs_in: Sequence[CreateSchemaType], index_elements: Sequence[str],
+                     update_fields: Optional[Sequence[str]] = None) -> List[ModelType]:
+        stmt, keys = _upsert_statement(self.model, objs_in, index_elements, update_fields)
+        if stmt is None:
+            return []
+        async with self.auto_commit(db):
+            objs = (await db.scalars(stmt, execution_options={"populate_existing": True})).all()
+            for obj in objs:
+                db.expunge(obj)
+        return _in_key_order(objs, index_elements, keys)
+
+    async def get_many(self, db: AsyncSession, ids: Sequence[int], expand: Sequence[str] = ()) -> List[ModelType]:
+        result = await db.execute(select(self.model).options(*self.expand_options(expand)).filter(self.model.id == any_(_id_array(ids))))
+        return _in_request_order(result.scalars().all(), ids)
+
+    def expand_options(self, expand: Sequence[str] = ()):
+        # AsyncSession 에서는 lazy load 가 불가능하므로 관계는 반드시 미리 읽어야 한다
+        return [selectinload(getattr(self.model, name)) for name in expand]
+
+    async def get_multi(self, db: AsyncSession, *, skip: int = 0, limit: int = 100, expand: Sequence[str] = ()) -> List[ModelType]:
+        result = await db.execute(select(self.model).options(*self.expand_options(expand)).offset(skip).limit(limit))
         return result.scalars().all()
 
+    async def count(self, db: AsyncSession, *criteria, cap: Optional[int] = None) -> TotalCount:
+        cap = settings.LIST_COUNT_CAP if cap is None else cap
+        estimated_rows, count_rows = _count_statements(self.model, criteria, cap)
+        if not criteria:
+            total = _estimated_total((await db.execute(estimated_rows)).one(), cap)
+            if total is not None:
+                return total
+        return _counted_total(await db.scalar(count_rows), cap)
+
     async def update(self, db: AsyncSession, db_obj: ModelType, obj_in: UpdateSchemaType) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
         update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        for field, value in update_data.items():
+            if hasattr(db_obj, field):
+                setattr(db_obj, field, value)
         async with self.auto_commit(db):
             db.add(db_obj)
         await db.refresh(db_obj)
@@ -101,4 +233,7 @@ class AsyncCRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         if obj:
             async with self.auto_commit(db):
                 await db.delete(obj)
-        return obj
\ No newline at end of file
+        return obj
+
+trace_methods(CRUDBase)
+trace_methods(AsyncCRUDBase)
@@ -3,26 +3,48 @@ from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy import text
+from fastapi import Request
 from .config import settings
+from .deadline import install_query_cancel, track_request
+from .pool import AdaptiveQueuePool, PoolController
+from .timing import measure
+from .tracing import start_span
 from loguru import logger
 
 # 동기 엔진 설정
+if settings.DB_POOL_ADAPTIVE:
+    # 물리 풀은 최대 크기로 만들고 동시 사용 상한은 PoolController 가 조절한다
+    _pool_options = {"poolclass": AdaptiveQueuePool, "pool_size": settings.DB_POOL_MAX_SIZE, "max_overflow": 0}
+else:
+    _pool_options = {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW}
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_size=20,
-    max_overflow=10,
-    pool_timeout=30,
+    **_pool_options,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
     pool_recycle=1800,
     pool_pre_ping=True
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+install_query_cancel(engine)
+
+pool_controller = None
+if settings.DB_POOL_ADAPTIVE:
+    engine.pool.set_limit(min(max(settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW, settings.DB_POOL_MIN_SIZE), settings.DB_POOL_MAX_SIZE))
+    pool_controller = PoolController(engine, min_size=settings.DB_POOL_MIN_SIZE, max_size=settings.DB_POOL_MAX_SIZE,
+                                     interval=settings.DB_POOL_ADAPT_INTERVAL, wait_target_ms=settings.DB_POOL_WAIT_TARGET_MS)
+
+def pool_capacity() -> int:
+    # 동기 엔진이 동시에 빌려줄 수 있는 커넥션 수
+    if isinstance(engine.pool, AdaptiveQueuePool):
+        return engine.pool.limit
+    return settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
 
 # 비동기 엔진 설정
 async_engine = create_async_engine(
     settings.ASYNC_DATABASE_URL,
-    pool_size=20,
-    max_overflow=10,
-    pool_timeout=30,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
     pool_recycle=1800,
     pool_pre_ping=True
 )
@@ -31,9 +53,15 @@ AsyncSessionLocal = sessionmaker(class_=AsyncSession, autocommit=False, autoflus
 Base = declarative_base()
 
 # 동기 세션 의존성
-def get_db():
+def get_db(request: Request = None):
     db = SessionLocal()
+    if request is not None:
+        # 요청 기한을 statement_timeout 으로 걸고, 연결이 끊기면 쿼리를 취소할 수 있게 한다
+        track_request(db, request)
     try:
+        # 커넥션 풀 대기 시간 (Server-Timing pool, 트랜잭션 시작 시 statement_timeout 설정 포함)
+        with measure("pool"), start_span("db.pool.checkout"):
+            db.connection()
         # 데이터베이스 연결 테스트
         db.execute(text("SELECT 1"))
         logger.info("Synchronous database connection successful")
@@ -45,10 +73,31 @@ def get_db():
         logger.info("Synchronous database connection closed")
         db.close()
 
+# 커넥션을 처음 쓸 때 빌리는 동기 세션 (DB 를 쓰지 않고 끝날 수도 있는 엔드포인트용)
+def get_lazy_db(request: Request = None):
+    db = SessionLocal()
+    if request is not None:
+        track_request(db, request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+# 커넥션을 처음 쓸 때 빌리는 비동기 세션 (대부분 DB 를 쓰지 않고 답하는 엔드포인트용)
+async def get_lazy_async_db(request: Request = None):
+    async with AsyncSessionLocal() as session:
+        if request is not None:
+            track_request(session.sync_session, request, is_async=True)
+        yield session
+
 # 비동기 세션 의존성
-async def get_async_db():
+async def get_async_db(request: Request = None):
     async with AsyncSessionLocal() as session:
+        if request is not None:
+            track_request(session.sync_session, request, is_async=True)
         try:
+            with measure("pool"), start_span("db.pool.checkout"):
+                await session.connection()
             # 데이터베이스 연결 테스트
             await session.execute(text("SELECT 1"))
             logger.info("Asynchronous database connection successful")
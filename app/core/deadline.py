@@ -0,0 +1,189 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Optional, Set
+from fastapi import Request
+from loguru import logger
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from .config import settings
+
+# 요청 기한(deadline)을 Postgres 로 전달한다.
+# - 기한: 경로별 기본값(REQUEST_TIMEOUT_ROUTES, 없으면 REQUEST_TIMEOUT_MS). 클라이언트는 헤더로 더 짧게만 줄일 수 있다
+# - 기한은 요청이 도착한 시각(DeadlineMiddleware)부터 잰다 (부하 차단 대기열, 커넥션 풀 대기도 포함)
+# - 세션의 트랜잭션이 시작될 때마다 남은 시간을 SET LOCAL statement_timeout 으로 건다
+# - 클라이언트가 연결을 끊은 조회(GET/HEAD)는 실행 중인 쿼리를 취소한다
+
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+QUERY_CANCELED = "57014"  # statement_timeout / 취소 요청으로 중단된 쿼리의 SQLSTATE
+
+
+class Deadline:
+    def __init__(self, timeout_ms: Optional[int], started_at: Optional[float] = None):
+        self.timeout_ms = timeout_ms
+        started_at = time.monotonic() if started_at is None else started_at
+        self.expires_at = started_at + timeout_ms / 1000 if timeout_ms else None
+
+    def remaining_ms(self) -> Optional[int]:
+        if self.expires_at is None:
+            return None
+        # 0 은 "제한 없음" 이므로 기한이 지났으면 1ms 로 바로 취소되게 한다
+        return max(1, int((self.expires_at - time.monotonic()) * 1000))
+
+    def remaining_seconds(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+
+def request_deadline(request: Request) -> Deadline:
+    deadline = getattr(request.state, "deadline", None)
+    if deadline is not None:
+        return deadline
+    route = request.scope.get("route")
+    path = route.path if route is not None else request.url.path
+    timeout_ms = settings.REQUEST_TIMEOUT_ROUTES.get(f"{request.method} {path}", settings.REQUEST_TIMEOUT_MS) or None
+    header = request.headers.get(DEADLINE_HEADER)
+    if header and header.isdigit() and int(header) > 0:
+        timeout_ms = min(int(header), timeout_ms) if timeout_ms else int(header)
+    # 경로별 기한은 라우팅이 끝나야 알 수 있으므로 여기서 만들지만, 시간은 도착 시각부터 잰다
+    request.state.deadline = deadline = Deadline(timeout_ms, getattr(request.state, "arrived_at", None))
+    return deadline
+
+
+class DeadlineMiddleware:
+    """요청이 도착한 시각을 기록한다 (ASGI 미들웨어, 가능한 한 바깥에 건다)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            scope.setdefault("state", {})["arrived_at"] = time.monotonic()
+        await self.app(scope, receive, send)
+
+
+def apply_deadline(session: Session, deadline: Deadline) -> None:
+    if deadline.expires_at is None:
+        return
+
+    def set_statement_timeout(session, transaction, connection):
+        connection.execute(text(f"SET LOCAL statement_timeout = {deadline.remaining_ms()}"))
+
+    event.listen(session, "after_begin", set_statement_timeout)
+
+
+# 풀에 돌려준 커넥션은 다른 요청이 쓰므로, 반납 시점에 취소 대상에서 빠지도록 커넥션 -> 소유자를 기록해 둔다
+_lock = threading.Lock()
+_owners: Dict[object, "QueryCanceller"] = {}
+
+
+class QueryCanceller:
+    """요청 하나가 쓰는 (동기 드라이버) 커넥션들의 실행 중 쿼리를 취소한다.
+
+    동기 세션은 스레드에서 쓰이므로 요청 태스크를 취소하면 스레드가 세션을 쓰는 중에 의존성 정리(db.close())가
+    실행된다. 그래서 요청 태스크는 비동기 세션만 쓰는 요청일 때만 취소한다 (cancels_task).
+    """
+
+    def __init__(self):
+        self._connections: Set[object] = set()
+        self.threaded = False
+        self.async_sessions = False
+
+    @property
+    def cancels_task(self) -> bool:
+        return self.async_sessions and not self.threaded
+
+    def track_async(self) -> None:
+        # asyncpg 는 요청 태스크를 취소하면 드라이버가 쿼리를 취소한다
+        self.async_sessions = True
+
+    def track(self, session: Session) -> None:
+        self.threaded = True
+
+        def remember_connection(session, transaction, connection):
+            driver_connection = connection.connection.driver_connection
+            if callable(getattr(driver_connection, "cancel", None)):
+                with _lock:
+                    _owners[driver_connection] = self
+                    self._connections.add(driver_connection)
+
+        event.listen(session, "after_begin", remember_connection)
+
+    def cancel(self) -> None:
+        with _lock:
+            for driver_connection in self._connections:
+                try:
+                    driver_connection.cancel()
+                except Exception as e:
+                    logger.warning(f"Failed to cancel query: {e!r}")
+
+
+def install_query_cancel(engine: Engine) -> None:
+    @event.listens_for(engine, "checkin")
+    def forget_connection(dbapi_connection, connection_record):
+        with _lock:
+            owner = _owners.pop(dbapi_connection, None)
+            if owner is not None:
+                owner._connections.discard(dbapi_connection)
+
+
+def track_request(session: Session, request: Request, is_async: bool = False) -> None:
+    apply_deadline(session, request_deadline(request))
+    canceller = getattr(request.state, "query_canceller", None)
+    if canceller is not None:
+        if is_async:
+            canceller.track_async()
+        else:
+            canceller.track(session)
+
+
+def is_query_canceled(exc: Exception) -> bool:
+    orig = getattr(exc, "orig", None)
+    return (getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)) == QUERY_CANCELED
+
+
+class CancelOnDisconnect:
+    """클라이언트가 끊은 조회 요청을 중단한다 (ASGI 미들웨어).
+
+    동기 세션은 실행 중인 쿼리만 취소하고 스레드가 (504 로) 끝날 때까지 두어서, 의존성 정리는 스레드가 끝난 뒤에 실행된다.
+    비동기 세션만 쓰는 요청은 요청 태스크를 취소한다. 세션을 열기 전이거나 쓰기 요청은 끝까지 실행한다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return await self.app(scope, receive, send)
+
+        canceller = QueryCanceller()
+        scope.setdefault("state", {})["query_canceller"] = canceller
+        # 연결 끊김을 감시하는 쪽이 먼저 receive 를 읽으므로 앱에는 큐로 전달한다
+        messages: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        app_task = asyncio.ensure_future(self.app(scope, messages.get, send))
+
+        async def watch_disconnect():
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    break
+            if not app_task.done():
+                disconnected.set()
+                await asyncio.get_running_loop().run_in_executor(None, canceller.cancel)
+                if canceller.cancels_task:
+                    app_task.cancel()
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            await app_task
+        except (asyncio.CancelledError, Exception) as e:
+            # 끊긴 연결에는 응답을 보낼 수 없다 (Starlette 가 응답을 버리면서 내는 "No response returned" 등)
+            if not disconnected.is_set():
+                raise
+            logger.debug(f"Dropped response to disconnected client: {e!r}")
+        finally:
+            watcher.cancel()
@@ -0,0 +1,62 @@
+from hashlib import md5
+from typing import Callable, Optional, Sequence
+from fastapi import Request, Response
+
+# 조건부 GET: 행 버전(xmin)으로 ETag 를 만들고 If-None-Match 가 맞으면 본문 없이 304 를 돌려준다
+
+
+def row_etag(id, version) -> str:
+    # 단건 응답은 행 버전이 같으면 본문도 같으므로 strong ETag
+    return f'"{id}-{version}"'
+
+
+def list_etag(objs: Sequence, expand: Sequence[str] = ()) -> str:
+    # 목록은 포함된 행(과 expand 한 관계)의 id/버전으로 만든 weak ETag
+    parts = []
+    for obj in objs:
+        parts.append(f"{obj.id}:{obj.version}")
+        for name in expand:
+            related = getattr(obj, name)
+            if related is not None:
+                parts.append(f"{name}:{related.id}:{related.version}")
+    return f'W/"{md5(",".join(parts).encode()).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match 는 weak 비교 (W/ 접두어 무시)
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    strip = lambda tag: tag.strip().removeprefix("W/")
+    return strip(etag) in {strip(tag) for tag in if_none_match.split(",")}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def check_row_not_modified(request: Request, id: int, get_version: Callable[[], Optional[str]]) -> Optional[Response]:
+    # If-None-Match 가 있을 때만 버전만 조회해서, 바뀌지 않았으면 행 전체를 읽지 않고 304
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    version = get_version()
+    if version is None:
+        return None
+    etag = row_etag(id, version)
+    return not_modified(etag) if etag_matches(if_none_match, etag) else None
+
+
+def row_response(response: Response, obj):
+    response.headers["ETag"] = row_etag(obj.id, obj.version)
+    return obj
+
+
+def list_response(request: Request, response: Response, objs: list, expand: Sequence[str] = ()):
+    # 목록은 쿼리는 그대로 실행하지만 바뀌지 않았으면 직렬화/전송을 생략한다
+    etag = list_etag(objs, expand)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return objs
@@ -0,0 +1,116 @@
+from datetime import timedelta
+from hashlib import md5
+from typing import Callable, NamedTuple, Optional, Type
+from fastapi import Header, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from loguru import logger
+from pydantic import BaseModel
+from sqlalchemy import Column, DateTime, Index, Integer, String, func, update, delete
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.orm import Session
+from .config import settings
+from .database import Base
+
+# Idempotency-Key 헤더로 POST 재시도 시 같은 쓰기가 두 번 실행되지 않게 한다.
+# 1. 키 행을 "처리 중"(status_code NULL, locked_at) 으로 먼저 커밋해서 키를 차지한다
+# 2. 쓰기(create(commit=False))와 응답 저장을 한 트랜잭션으로 커밋한다. 둘 중 하나라도 실패하면 둘 다 롤백되고
+#    키 행을 지워서 재시도가 다시 실행되게 한다 (쓰기만 커밋되고 키가 처리 중으로 남는 경우가 없다)
+# 처리 중인 키로 들어온 중복 요청은 기다리지 않고 409 + Retry-After 를 받는다. 프로세스가 죽어서
+# 처리 중으로 남은 키는 IDEMPOTENCY_LOCK_TIMEOUT 초가 지나면 다음 재시도가 다시 차지한다.
+
+
+class IdempotencyRecord(Base):
+    __tablename__ = "idempotency_keys"
+
+    scope = Column(String, primary_key=True)  # "POST /store-system/purchases/"
+    key = Column(String, primary_key=True)
+    fingerprint = Column(String(32), nullable=False)  # 요청 본문 해시 (같은 키로 다른 요청을 보내면 거부)
+    status_code = Column(Integer)  # 응답 저장 전이면 NULL
+    response = Column(JSONB)
+    locked_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())  # 처리 중 임대 시작 (차지한 요청의 토큰)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (Index("ix_idempotency_keys_expires_at", "expires_at"),)
+
+
+class IdempotencyKey(NamedTuple):
+    scope: str
+    key: str
+
+
+def idempotency_key(request: Request, idempotency_key: Optional[str] = Header(None, max_length=255)) -> Optional[IdempotencyKey]:
+    if not idempotency_key:
+        return None
+    return IdempotencyKey(f"{request.method} {request.url.path}", idempotency_key)
+
+
+def run_idempotent(db: Session, idempotency: Optional[IdempotencyKey], payload: BaseModel,
+                   create: Callable[[bool], object], response_model: Type[BaseModel]):
+    """create(commit) 를 키당 한 번만 실행한다. 이미 처리된 키면 저장된 응답을 그대로 돌려준다.
+
+    키가 있으면 create(False) 로 부르므로 create 는 커밋하지 않고 쓰기만 보내야 한다 (CRUDBase.create(commit=False)).
+    """
+    if idempotency is None:
+        return create(True)
+
+    fingerprint = md5(payload.json(sort_keys=True).encode()).hexdigest()
+    key_filter = (IdempotencyRecord.scope == idempotency.scope) & (IdempotencyRecord.key == idempotency.key)
+    # clock_timestamp(): 같은 트랜잭션 안에서도 호출할 때마다 달라서 차지한 요청을 구분하는 토큰으로 쓴다
+    stmt = insert(IdempotencyRecord).values(
+        scope=idempotency.scope, key=idempotency.key, fingerprint=fingerprint, locked_at=func.clock_timestamp(),
+        expires_at=func.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+    )
+    # 만료된 키와 임대가 끝난 처리 중 키(처리하던 프로세스가 죽음)는 새 요청으로 취급해서 덮어쓴다
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyRecord.scope, IdempotencyRecord.key],
+        set_={"fingerprint": stmt.excluded.fingerprint, "expires_at": stmt.excluded.expires_at,
+              "locked_at": stmt.excluded.locked_at, "created_at": func.now(), "status_code": None, "response": None},
+        where=(IdempotencyRecord.expires_at < func.now()) | (
+            IdempotencyRecord.status_code.is_(None)
+            & (IdempotencyRecord.locked_at < func.now() - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT))
+        ),
+    ).returning(IdempotencyRecord.locked_at)
+
+    lock_token = db.execute(stmt).scalar()
+    if lock_token is None:
+        record = db.query(IdempotencyRecord).filter(key_filter).one()
+        fingerprint_matches, status_code, response = record.fingerprint == fingerprint, record.status_code, record.response
+        db.rollback()
+        if not fingerprint_matches:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        if status_code is None:
+            # 먼저 온 요청이 아직 처리 중이다 (커넥션/스레드를 잡고 기다리지 않는다)
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still being processed",
+                                headers={"Retry-After": "1"})
+        return JSONResponse(response, status_code=status_code, headers={"Idempotent-Replayed": "true"})
+    db.commit()
+
+    owned = key_filter & (IdempotencyRecord.locked_at == lock_token)
+    try:
+        body = jsonable_encoder(response_model.from_orm(create(False)))
+        saved = db.execute(update(IdempotencyRecord).where(owned).values(status_code=200, response=body)).rowcount
+        if not saved:
+            # 임대가 끝나서 다른 요청이 키를 다시 차지했다. 그 요청이 쓰므로 이 쓰기는 롤백한다
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still being processed",
+                                headers={"Retry-After": "1"})
+        db.commit()
+    except BaseException:
+        # 쓰기와 응답 저장은 함께 롤백된다. 키도 남기지 않는다 (재시도가 다시 실행된다).
+        # 지우지 못해도 (기한이 지나 statement_timeout 에 걸리는 등) 커밋된 쓰기가 없으므로 임대가 끝나면 다시 차지해도 된다
+        db.rollback()
+        try:
+            db.execute(delete(IdempotencyRecord).where(owned & IdempotencyRecord.status_code.is_(None)))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to release Idempotency-Key {idempotency.key!r}: {e!r}")
+        raise
+    return JSONResponse(body)
+
+
+def purge_expired(db: Session) -> int:
+    deleted = db.execute(delete(IdempotencyRecord).where(IdempotencyRecord.expires_at < func.now())).rowcount
+    db.commit()
+    return deleted
@@ -1,5 +1,6 @@
 
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram, multiprocess
+import os
 import time
 
 REQUEST_COUNT = Counter(
@@ -21,4 +22,123 @@ def record_request_data(app_name, request, response, latency):
         request.url.path,
         response.status_code
     ).inc()
-    REQUEST_LATENCY.labels(app_name, request.url.path).observe(latency)
\ No newline at end of file
+    REQUEST_LATENCY.labels(app_name, request.url.path).observe(latency)
+
+def flush_metrics():
+    # 멀티프로세스 모드(PROMETHEUS_MULTIPROC_DIR, gunicorn 워커 여러 개)면 종료하는 워커의 live gauge 파일을 정리한다.
+    # 그 밖의 메트릭은 /metrics 스크레이프로 가져가므로 따로 보낼 것이 없다
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
+
+# 진행 중인 HTTP 요청 수 (종료할 때 이 값이 0 이 될 때까지 기다린다)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    'http_requests_in_flight', 'HTTP requests currently being handled'
+)
+
+# 목록 응답 캐시: result = hit / miss / coalesced / bypass (hit ratio = hit / 전체)
+LIST_CACHE_REQUESTS = Counter(
+    'list_cache_requests_total', 'List response cache lookups',
+    ['resource', 'result']
+)
+LIST_CACHE_COALESCED_WAIT = Histogram(
+    'list_cache_coalesced_wait_seconds', 'Time coalesced requests waited for the in-flight query',
+    ['resource']
+)
+
+# 쓰기 묶음 처리(WriteCoalescer): 배치 하나 = 커밋 하나 (_count 가 커밋 수)
+WRITE_COALESCER_BATCH_SIZE = Histogram(
+    'write_coalescer_batch_size', 'Rows written per coalesced commit',
+    ['name'], buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+)
+WRITE_COALESCER_FLUSH_LATENCY = Histogram(
+    'write_coalescer_flush_seconds', 'Time to write and commit one coalesced batch',
+    ['name']
+)
+
+# 부하 차단(AdmissionController): route_class = read / write, reason = queue_full / timeout
+ADMISSION_IN_FLIGHT = Gauge(
+    'admission_in_flight', 'Requests currently holding an admission slot',
+    ['route_class']
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    'admission_queue_depth', 'Requests waiting for an admission slot',
+    ['route_class']
+)
+ADMISSION_REJECTED = Counter(
+    'admission_rejected_total', 'Requests rejected with 503 by admission control',
+    ['route_class', 'reason']
+)
+ADMISSION_WAIT = Histogram(
+    'admission_wait_seconds', 'Time admitted requests waited for a slot',
+    ['route_class']
+)
+
+# 커넥션 풀 자동 조절(AdaptiveQueuePool / PoolController)
+DB_POOL_LIMIT = Gauge(
+    'db_pool_limit', 'Current adaptive connection pool limit',
+    ['pool']
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled connection',
+    ['pool'], buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+DB_POOL_RESIZES = Counter(
+    'db_pool_resizes_total', 'Adaptive connection pool limit changes',
+    ['pool', 'direction']
+)
+
+# 주차 게이트 이벤트: result = entry / exit / ignored
+PARKING_GATE_EVENTS = Counter(
+    'parking_gate_events_total', 'Gate events ingested by result',
+    ['result']
+)
+PARKING_OCCUPANCY_DRIFT = Counter(
+    'parking_occupancy_drift_total', 'Absolute difference between in-memory occupancy and the database found on reconcile'
+)
+
+# 요청 프로파일링: mode = on_demand (X-Profile 헤더) / sampled
+PROFILED_REQUESTS = Counter(
+    'profiled_requests_total', 'Requests profiled with pyinstrument',
+    ['mode']
+)
+
+# 요청별 SQL 실행 수/DB 시간 (route = 경로 템플릿)
+DB_QUERIES_PER_REQUEST = Histogram(
+    'db_queries_per_request', 'SQL statements executed per request',
+    ['method', 'route'], buckets=(0, 1, 2, 3, 4, 5, 7, 10, 15, 20, 30, 50, 100)
+)
+DB_TIME_PER_REQUEST = Histogram(
+    'db_time_per_request_seconds', 'Time spent executing SQL per request',
+    ['method', 'route']
+)
+DB_REPEATED_QUERIES = Counter(
+    'db_repeated_queries_total', 'Requests that ran the same statement QUERY_REPEAT_THRESHOLD times or more (possible N+1)',
+    ['method', 'route']
+)
+
+# 시작 시간: phase = import (app.main 모듈 로딩) / startup (startup 이벤트) / warmup (커넥션 풀, 컴파일 캐시 준비)
+APP_STARTUP_SECONDS = Gauge(
+    'app_startup_seconds', 'Time spent in each startup phase',
+    ['phase']
+)
+APP_READY = Gauge(
+    'app_ready', '1 once the startup warmup has finished (/ready returns 200)'
+)
+DB_WARMUP_CONNECTIONS = Gauge(
+    'db_warmup_connections', 'Connections opened ahead of traffic by the startup warmup',
+    ['pool']
+)
+
+# 동기 엔드포인트/의존성 스레드풀 (anyio 기본 limiter, ThreadPool.run 이 주기적으로 기록)
+THREADPOOL_LIMIT = Gauge(
+    'threadpool_limit', 'Worker threads available to sync endpoints and dependencies'
+)
+THREADPOOL_BUSY = Gauge(
+    'threadpool_busy', 'Worker threads currently running sync work'
+)
+THREADPOOL_QUEUE_DEPTH = Gauge(
+    'threadpool_queue_depth', 'Sync calls waiting for a worker thread'
+)
+THREADPOOL_SATURATED_SECONDS = Counter(
+    'threadpool_saturated_seconds_total', 'Sampled time during which sync calls were waiting for a worker thread'
+)
@@ -0,0 +1,40 @@
+import base64
+import json
+from typing import Callable, NamedTuple
+from fastapi import Response
+
+TOTAL_COUNT_HEADER = "X-Total-Count"
+TOTAL_COUNT_ACCURACY_HEADER = "X-Total-Count-Accuracy"
+
+
+# keyset 페이지네이션 커서: 마지막 행의 정렬 키를 불투명한 문자열로 전달한다
+def encode_cursor(*values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    # 잘못된 커서는 ValueError
+    values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+# 목록 전체 개수 (?count=true). accuracy: exact / estimate (pg_class.reltuples 통계) / at_least (cap 개에서 세기를 멈춤)
+class TotalCount(NamedTuple):
+    value: int
+    accuracy: str
+
+    def header(self) -> str:
+        return f"{self.value}+" if self.accuracy == "at_least" else str(self.value)
+
+
+def set_total_count(response: Response, requested: bool, count: Callable[[], TotalCount]) -> None:
+    # 요청했을 때만 센다 (세는 쿼리가 한두 개 더 나간다)
+    if requested:
+        write_total_count(response, count())
+
+
+def write_total_count(response: Response, total: TotalCount) -> None:
+    response.headers[TOTAL_COUNT_HEADER] = total.header()
+    response.headers[TOTAL_COUNT_ACCURACY_HEADER] = total.accuracy
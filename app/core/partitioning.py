@@ -0,0 +1,86 @@
+import re
+from datetime import date
+from typing import List, NamedTuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# 날짜 컬럼 기준 월 단위 RANGE 파티션 관리 (부모 테이블은 DEFAULT 파티션을 함께 가진다)
+
+_BOUND_RE = re.compile(r"FROM \('(\d{4}-\d{2}-\d{2})'\) TO \('(\d{4}-\d{2}-\d{2})'\)")
+
+
+class Partition(NamedTuple):
+    name: str
+    start: date
+    end: date
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def list_partitions(db: Session, table: str) -> List[Partition]:
+    # DEFAULT 파티션은 제외하고 범위 파티션만 시작일 순으로 돌려준다
+    rows = db.execute(text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = CAST(:table AS regclass)
+    """), {"table": table}).all()
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND_RE.search(bound)
+        if match:
+            partitions.append(Partition(name, date.fromisoformat(match[1]), date.fromisoformat(match[2])))
+    return sorted(partitions, key=lambda p: p.start)
+
+
+def create_month_partition(db: Session, table: str, column: str, month: date) -> str:
+    """한 달짜리 파티션을 만든다. DEFAULT 파티션에 들어가 있던 해당 월 행은 새 파티션으로 옮긴다."""
+    name = partition_name(table, month)
+    default = default_partition_name(table)
+    bounds = {"start": month, "end": add_months(month, 1)}
+    # 옮기는 동안 DEFAULT 파티션으로의 쓰기를 막는다 (다른 파티션 쓰기/읽기는 막지 않음)
+    db.execute(text(f"LOCK TABLE {default} IN SHARE ROW EXCLUSIVE MODE"))
+    db.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    db.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {default} WHERE {column} >= :start AND {column} < :end RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), bounds)
+    # 인덱스/기본키/외래키는 ATTACH 시 부모 테이블 정의대로 만들어진다
+    db.execute(text(
+        f"ALTER TABLE {table} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+    ))
+    return name
+
+
+def ensure_month_partitions(db: Session, table: str, column: str, start: date, end: date) -> List[str]:
+    # start 가 속한 월부터 end 가 속한 월까지 없는 파티션을 만든다
+    existing = {p.start for p in list_partitions(db, table)}
+    created = []
+    month = month_start(start)
+    while month <= end:
+        if month not in existing:
+            created.append(create_month_partition(db, table, column, month))
+        month = add_months(month, 1)
+    return created
+
+
+def detach_partition(db: Session, table: str, name: str) -> None:
+    db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
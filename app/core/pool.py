@@ -0,0 +1,216 @@
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, NamedTuple, Optional
+from loguru import logger
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool, QueuePool
+from .metrics import DB_POOL_CHECKOUT_WAIT, DB_POOL_LIMIT, DB_POOL_RESIZES
+
+# 커넥션 풀 크기 자동 조절
+# - AdaptiveQueuePool: 물리 풀은 최대 크기로 만들고, 동시에 빌려줄 커넥션 수(limit)만 실행 중에 바꾼다.
+#   limit 보다 많은 유휴 커넥션은 반납될 때 닫는다
+# - PoolController: 주기적으로 체크아웃 대기 시간/사용률을 보고 limit 을 [min_size, max_size] 안에서 늘리거나 줄인다
+
+
+class PoolSample(NamedTuple):
+    limit: int
+    checkouts: int
+    avg_wait_ms: float
+    max_wait_ms: float
+    timeouts: int
+    peak_in_use: int
+
+    @property
+    def utilization(self) -> float:
+        return self.peak_in_use / self.limit if self.limit else 0.0
+
+
+class AdaptiveQueuePool(QueuePool):
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self._limit = self.size()
+        self._in_use = 0
+        self._limit_cond = threading.Condition()
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._peak_in_use = self._in_use
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    def set_limit(self, limit: int) -> None:
+        with self._limit_cond:
+            self._limit = max(1, min(limit, self.size()))
+            self._limit_cond.notify_all()
+        DB_POOL_LIMIT.labels(self.logging_name or "default").set(self._limit)
+
+    def sample(self) -> PoolSample:
+        # 지난 sample() 이후의 통계를 돌려주고 초기화한다
+        with self._limit_cond:
+            checkouts = self._checkouts
+            sample = PoolSample(self._limit, checkouts, self._wait_total / checkouts * 1000 if checkouts else 0.0,
+                                self._wait_max * 1000, self._timeouts, self._peak_in_use)
+            self._reset_stats()
+        return sample
+
+    def _do_get(self):
+        started = time.perf_counter()
+        deadline = started + self._timeout
+        with self._limit_cond:
+            while self._in_use >= self._limit:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise exc.TimeoutError(
+                        f"AdaptiveQueuePool limit of {self._limit} reached, connection timed out, timeout {self._timeout:0.2f}",
+                        code="3o7r",
+                    )
+                self._limit_cond.wait(remaining)
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+        try:
+            record = super()._do_get()
+        except BaseException:
+            self._release_slot()
+            raise
+        waited = time.perf_counter() - started
+        with self._limit_cond:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        DB_POOL_CHECKOUT_WAIT.labels(self.logging_name or "default").observe(waited)
+        return record
+
+    def _do_return_conn(self, record) -> None:
+        try:
+            if self._pool.qsize() >= self._limit:
+                try:
+                    record.close()
+                finally:
+                    self._dec_overflow()
+            else:
+                super()._do_return_conn(record)
+        finally:
+            self._release_slot()
+
+    def _release_slot(self) -> None:
+        with self._limit_cond:
+            self._in_use -= 1
+            self._limit_cond.notify()
+
+    def recreate(self) -> "AdaptiveQueuePool":
+        # engine.dispose() 후에도 현재 limit 을 유지한다
+        pool = super().recreate()
+        pool.set_limit(self._limit)
+        return pool
+
+    def status(self) -> str:
+        return f"{super().status()} Limit: {self._limit}"
+
+
+class PoolResize(NamedTuple):
+    at: float
+    old: int
+    new: int
+    reason: str
+
+
+class PoolController:
+    """engine 의 AdaptiveQueuePool limit 을 interval 초마다 조절한다 (백그라운드 스레드)."""
+
+    def __init__(self, engine: Engine, min_size: int, max_size: int, interval: float, wait_target_ms: float,
+                 grow_utilization: float = 0.9, shrink_utilization: float = 0.5):
+        self.engine = engine
+        self.min_size = min_size
+        self.max_size = max_size
+        self.interval = interval
+        self.wait_target_ms = wait_target_ms
+        self.grow_utilization = grow_utilization
+        self.shrink_utilization = shrink_utilization
+        self.on_resize: List[Callable[[int], None]] = []
+        self.last_sample: Optional[PoolSample] = None
+        self.history: "deque[PoolResize]" = deque(maxlen=20)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def pool(self) -> AdaptiveQueuePool:
+        return self.engine.pool
+
+    def decide(self, sample: PoolSample) -> "tuple[int, str]":
+        limit = sample.limit
+        if sample.timeouts or sample.avg_wait_ms > self.wait_target_ms or sample.utilization >= self.grow_utilization:
+            reason = "timeouts" if sample.timeouts else "wait" if sample.avg_wait_ms > self.wait_target_ms else "utilization"
+            return min(self.max_size, limit + max(1, math.ceil(limit * 0.25))), reason
+        if sample.utilization < self.shrink_utilization:
+            # 천천히 줄이고, 지난 구간의 최대 동시 사용량 아래로는 줄이지 않는다
+            return max(self.min_size, sample.peak_in_use, limit - max(1, limit // 10)), "idle"
+        return limit, "steady"
+
+    def tick(self) -> Optional[PoolResize]:
+        pool = self.pool
+        sample = pool.sample()
+        self.last_sample = sample
+        new, reason = self.decide(sample)
+        if new != sample.limit:
+            # 물리 풀 크기를 넘지 않도록 잘린 값을 쓴다
+            pool.set_limit(new)
+            new = pool.limit
+        if new == sample.limit:
+            return None
+        resize = PoolResize(time.time(), sample.limit, new, reason)
+        self.history.append(resize)
+        DB_POOL_RESIZES.labels(pool.logging_name or "default", "grow" if new > sample.limit else "shrink").inc()
+        logger.info(f"Pool limit {sample.limit} -> {new} ({reason}, avg wait {sample.avg_wait_ms:.1f}ms, "
+                    f"peak {sample.peak_in_use}, timeouts {sample.timeouts})")
+        for callback in self.on_resize:
+            callback(new)
+        return resize
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="pool-controller", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                logger.warning(f"Pool controller tick failed: {e!r}")
+
+    def state(self) -> Dict:
+        return {
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "interval": self.interval,
+            "wait_target_ms": self.wait_target_ms,
+            "last_sample": dict(self.last_sample._asdict(), utilization=self.last_sample.utilization) if self.last_sample else None,
+            "history": [resize._asdict() for resize in self.history],
+        }
+
+
+def pool_state(pool: Pool) -> Dict:
+    state = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        state.update(size=pool.size(), checked_out=pool.checkedout(), idle=pool.checkedin(),
+                     overflow=pool.overflow(), timeout=pool.timeout())
+    if isinstance(pool, AdaptiveQueuePool):
+        state["limit"] = pool.limit
+    return state
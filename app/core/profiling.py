@@ -0,0 +1,171 @@
+import asyncio
+import hmac
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, List, Optional
+from loguru import logger
+from pyinstrument import Profiler
+from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+from pyinstrument.session import Session
+from starlette.responses import Response
+from starlette.routing import Match
+from .metrics import PROFILED_REQUESTS
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+PROFILED_STATUS_HEADER = "X-Profiled-Status"
+
+# 형식 -> (렌더러, Content-Type, 파일 확장자)
+FORMATS = {
+    "html": (HTMLRenderer, "text/html; charset=utf-8", "html"),
+    "speedscope": (SpeedscopeRenderer, "application/json", "speedscope.json"),
+}
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    """요청 하나의 프로파일. 이벤트 루프 쪽 세션에 동기 엔드포인트를 실행한 스레드의 세션을 합친다."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._profiler = Profiler(interval=interval, async_mode="enabled")
+        self._thread_sessions: List[Session] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        self._profiler.start()
+
+    def stop(self) -> Session:
+        session = self._profiler.stop()
+        with self._lock:
+            for thread_session in self._thread_sessions:
+                session = Session.combine(session, thread_session)
+        return session
+
+    @contextmanager
+    def in_thread(self):
+        profiler = Profiler(interval=self.interval, async_mode="disabled")
+        profiler.start()
+        try:
+            yield
+        finally:
+            session = profiler.stop()
+            with self._lock:
+                self._thread_sessions.append(session)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current_profile.get()
+
+
+class RequestProfiler:
+    """어떤 요청을 프로파일링할지 정하고 결과를 저장한다.
+
+    - X-Profile: html | speedscope 헤더가 있으면 (allow_header 이거나 X-Profile-Token 이 token 과 같을 때)
+      그 요청을 프로파일링하고 원래 응답 대신 프로파일을 돌려준다 (원래 상태 코드는 X-Profiled-Status).
+    - 그 밖의 요청은 sample_rate (경로별 sample_routes) 비율로 프로파일링해서 output_dir 에 저장한다.
+    """
+
+    def __init__(self, interval: float = 0.001, token: Optional[str] = None, allow_header: bool = False,
+                 sample_rate: float = 0, sample_routes: Optional[Dict[str, float]] = None,
+                 sample_format: str = "speedscope", output_dir: str = "profiles"):
+        self.interval = interval
+        self.token = token
+        self.allow_header = allow_header
+        self.sample_rate = sample_rate
+        self.sample_routes = sample_routes or {}
+        self.sample_format = sample_format
+        self.output_dir = Path(output_dir)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.allow_header or self.token or self.sample_rate > 0 or self.sample_routes)
+
+    def requested_format(self, scope) -> Optional[str]:
+        headers = dict(scope["headers"])
+        requested = headers.get(PROFILE_HEADER.lower().encode())
+        if requested is None:
+            return None
+        if not self.allow_header:
+            token = headers.get(PROFILE_TOKEN_HEADER.lower().encode(), b"")
+            if not self.token or not hmac.compare_digest(token, self.token.encode()):
+                return None
+        requested = requested.decode("latin-1").strip().lower()
+        return requested if requested in FORMATS else "html"
+
+    def route_path(self, scope) -> str:
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return scope["path"]
+
+    def sampled(self, scope) -> bool:
+        rate = self.sample_rate
+        if self.sample_routes:
+            rate = self.sample_routes.get(f"{scope['method']} {self.route_path(scope)}", rate)
+        return rate > 0 and random.random() < rate
+
+    def render(self, session: Session, fmt: str) -> str:
+        renderer, _, _ = FORMATS[fmt]
+        return renderer().render(session)
+
+    def store(self, session: Session, scope) -> Path:
+        _, _, extension = FORMATS[self.sample_format]
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", self.route_path(scope)).strip("_") or "root"
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / f"{int(time.time() * 1000)}-{scope['method']}-{slug}.{extension}"
+        path.write_text(self.render(session, self.sample_format))
+        return path
+
+
+class ProfilingMiddleware:
+    """RequestProfiler 가 고른 요청만 프로파일링한다 (ASGI 미들웨어, 고르지 않은 요청은 그대로 통과)."""
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        fmt = self.profiler.requested_format(scope)
+        if fmt is None and not self.profiler.sampled(scope):
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(self.profiler.interval)
+        token = _current_profile.set(profile)
+        status = None
+
+        async def discard_response(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        profile.start()
+        try:
+            await self.app(scope, receive, discard_response if fmt else send)
+        finally:
+            session = profile.stop()
+            _current_profile.reset(token)
+
+        loop = asyncio.get_running_loop()
+        if fmt:
+            PROFILED_REQUESTS.labels(mode="on_demand").inc()
+            content = await loop.run_in_executor(None, self.profiler.render, session, fmt)
+            _, media_type, _ = FORMATS[fmt]
+            response = Response(content, media_type=media_type, headers={PROFILED_STATUS_HEADER: str(status)})
+            await response(scope, receive, send)
+        else:
+            PROFILED_REQUESTS.labels(mode="sampled").inc()
+            try:
+                path = await loop.run_in_executor(None, self.profiler.store, session, scope)
+                logger.info(f"Request profile saved: {path}")
+            except OSError as e:
+                logger.error(f"Failed to save request profile: {str(e)}")
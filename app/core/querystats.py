@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import Counter as StatementCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, List, Optional, Tuple
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .metrics import DB_QUERIES_PER_REQUEST, DB_TIME_PER_REQUEST, DB_REPEATED_QUERIES
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Query-Time-Ms"
+
+
+class QueryStats:
+    """요청 하나(또는 track_queries() 블록)에서 실행된 SQL 문 수와 DB 시간."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements: StatementCounter = StatementCounter()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        # 동기 엔드포인트는 스레드풀에서 실행되므로 잠그고 더한다
+        with self._lock:
+            self.count += 1
+            self.duration += elapsed
+            self.statements[statement] += 1
+
+    def most_repeated(self) -> Tuple[Optional[str], int]:
+        # 같은 SQL 이 가장 많이 반복된 횟수 (N+1 이면 관계 수만큼 반복된다)
+        if not self.statements:
+            return None, 0
+        return self.statements.most_common(1)[0]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is not None and conn.info.get("query_started_at"):
+        stats.record(statement, time.perf_counter() - conn.info["query_started_at"].pop())
+
+
+def install_query_stats() -> None:
+    # 모든 엔진(동기, 비동기 엔진의 sync_engine, 테스트 엔진)에 한 번만 건다
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_queries():
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def _route_name(scope) -> str:
+    route = scope.get("route")
+    return route.path if route is not None else "unmatched"
+
+
+class QueryStatsMiddleware:
+    """요청마다 실행된 SQL 문 수/DB 시간을 경로별 히스토그램으로 남긴다 (ASGI 미들웨어).
+
+    header 가 True 면 X-DB-Query-Count / X-DB-Query-Time-Ms 응답 헤더를 붙이고,
+    같은 SQL 이 repeat_threshold 번 이상 반복되면 N+1 의심으로 경고를 남긴다.
+    observers 에 등록한 함수는 요청이 끝날 때 ("METHOD /route/path", QueryStats) 로 호출된다 (테스트용).
+    """
+
+    def __init__(self, app, header: bool = False, repeat_threshold: int = 10,
+                 observers: Optional[List[Callable[[str, QueryStats], None]]] = None):
+        self.app = app
+        self.header = header
+        self.repeat_threshold = repeat_threshold
+        self.observers = observers if observers is not None else []
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (QUERY_COUNT_HEADER.lower().encode(), str(stats.count).encode()),
+                    (QUERY_TIME_HEADER.lower().encode(), f"{stats.duration * 1000:.1f}".encode()),
+                ]
+            await send(message)
+
+        with track_queries() as stats:
+            await self.app(scope, receive, send_with_header if self.header else send)
+
+        route = _route_name(scope)
+        if route == "unmatched":
+            return
+        DB_QUERIES_PER_REQUEST.labels(scope["method"], route).observe(stats.count)
+        DB_TIME_PER_REQUEST.labels(scope["method"], route).observe(stats.duration)
+        statement, repeats = stats.most_repeated()
+        if repeats >= self.repeat_threshold:
+            DB_REPEATED_QUERIES.labels(scope["method"], route).inc()
+            logger.warning(f"Possible N+1: {scope['method']} {route} ran the same statement {repeats} times: {statement[:200]}")
+        for observer in self.observers:
+            observer(f"{scope['method']} {route}", stats)
@@ -0,0 +1,47 @@
+import asyncio
+import functools
+from typing import Callable
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from .profiling import current_profile
+from .timing import measure
+
+
+def _instrument_endpoint(endpoint: Callable) -> Callable:
+    # include_router 가 라우트를 같은 클래스로 다시 만들 때 이미 감싼 엔드포인트를 넘겨준다
+    if getattr(endpoint, "__instrumented__", False):
+        return endpoint
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            with measure("app"):
+                return await endpoint(*args, **kwargs)
+        async_wrapper.__instrumented__ = True
+        return async_wrapper
+
+    # 동기 엔드포인트는 스레드풀에서 실행되므로 프로파일링 중인 요청이면 그 스레드에서도 프로파일러를 켠다
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        with measure("app"):
+            profile = current_profile()
+            if profile is None:
+                return endpoint(*args, **kwargs)
+            with profile.in_thread():
+                return endpoint(*args, **kwargs)
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
+class InstrumentedRoute(APIRoute):
+    """엔드포인트(app)와 라우트 핸들러 전체(handler) 구간을 Server-Timing 에 남기고 요청 프로파일링을 스레드까지 잇는다."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _instrument_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Response]:
+        handler = super().get_route_handler()
+
+        async def instrumented_handler(request: Request) -> Response:
+            with measure("handler"):
+                return await handler(request)
+        return instrumented_handler
@@ -0,0 +1,12 @@
+from pydantic.utils import GetterDict
+from sqlalchemy import inspect
+
+
+class LoadedGetterDict(GetterDict):
+    # orm_mode 직렬화 시 로드되지 않은 relationship 은 lazy load 하지 않고 비워 둔다.
+    # (expand 로 요청한 관계만 selectinload 로 미리 읽어서 응답에 포함시키기 위함)
+    def get(self, key, default=None):
+        state = inspect(self._obj, raiseerr=False)
+        if state is not None and key in state.mapper.relationships and key in state.unloaded:
+            return default
+        return getattr(self._obj, key, default)
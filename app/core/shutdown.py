@@ -0,0 +1,95 @@
+import asyncio
+import time
+import uvicorn
+from loguru import logger
+from starlette.responses import JSONResponse
+from .metrics import HTTP_REQUESTS_IN_FLIGHT
+
+
+class RequestDrainer:
+    """진행 중인 HTTP 요청 수를 센다. 종료 신호를 받으면 (DrainingServer) drain() 으로 새 요청은 503 으로
+    돌려보내고 진행 중인 요청이 끝나기를 (timeout 초까지) 기다린다. DrainMiddleware 로 앱 가장 바깥에 건다.
+    """
+
+    def __init__(self, poll_interval: float = 0.05):
+        self.poll_interval = poll_interval
+        self.draining = False
+        self.in_flight = 0
+
+    async def drain(self, timeout: float) -> int:
+        # 기한 안에 끝나지 않은 요청 수를 돌려준다
+        self.draining = True
+        deadline = time.monotonic() + timeout
+        while self.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+        return self.in_flight
+
+    def reset(self) -> None:
+        self.draining = False
+
+
+class DrainMiddleware:
+    def __init__(self, app, drainer: RequestDrainer):
+        self.app = app
+        self.drainer = drainer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if self.drainer.draining:
+            response = JSONResponse({"detail": "Server is shutting down"}, status_code=503,
+                                    headers={"Retry-After": "1", "Connection": "close"})
+            return await response(scope, receive, send)
+
+        async def send_with_close(message):
+            # 종료 중에 끝난 요청은 keep-alive 연결도 닫아서 클라이언트가 다른 인스턴스로 다시 연결하게 한다
+            if message["type"] == "http.response.start" and self.drainer.draining:
+                message["headers"] = [*message.get("headers", []), (b"connection", b"close")]
+            await send(message)
+
+        self.drainer.in_flight += 1
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_close)
+        finally:
+            self.drainer.in_flight -= 1
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+
+
+class DrainingServer(uvicorn.Server):
+    """종료 신호(SIGTERM/SIGINT)를 받으면 uvicorn 이 리스너를 닫기 전에 먼저 drain 한다.
+
+    uvicorn 은 신호를 받으면 리스너를 닫고 연결이 끝나기를 기다린 다음에야 lifespan shutdown 을 보내므로
+    그때는 이미 새 요청이 들어오지 않는다. drain 하는 동안에는 /ready 를 포함한 새 요청이 503 이라
+    로드 밸런서가 이 인스턴스를 빼고, drain 이 끝나면 원래의 uvicorn 종료를 시작한다.
+    drain 중에 신호를 한 번 더 받으면 기다리지 않고 바로 uvicorn 에 넘긴다.
+    """
+
+    def __init__(self, config: uvicorn.Config, drainer: RequestDrainer, timeout: float):
+        super().__init__(config)
+        self.drainer = drainer
+        self.drain_timeout = timeout
+        self._loop = None
+        self._drain_task = None
+
+    async def serve(self, sockets=None):
+        self._loop = asyncio.get_running_loop()
+        await super().serve(sockets)
+
+    def handle_exit(self, sig, frame):
+        if self._loop is None or self._drain_task is not None:
+            return super().handle_exit(sig, frame)
+        # 신호 처리기는 이벤트 루프 밖에서 불릴 수 있다 (uvicorn 버전에 따라 signal.signal 로 건다)
+        self.drainer.draining = True
+        self._loop.call_soon_threadsafe(self._start_drain, sig, frame)
+
+    def _start_drain(self, sig, frame):
+        if self._drain_task is None:
+            self._drain_task = asyncio.ensure_future(self._drain_then_exit(sig, frame))
+
+    async def _drain_then_exit(self, sig, frame):
+        logger.info(f"Draining {self.drainer.in_flight} in-flight requests before shutdown")
+        remaining = await self.drainer.drain(self.drain_timeout)
+        if remaining:
+            logger.warning(f"Shutdown drain timed out with {remaining} requests in flight")
+        super().handle_exit(sig, frame)
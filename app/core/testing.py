@@ -0,0 +1,121 @@
+import os
+from contextlib import contextmanager
+from hashlib import md5
+from sqlalchemy import create_engine, event, text, MetaData
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+from sqlalchemy.schema import CreateTable, CreateIndex
+from .config import settings
+from loguru import logger
+
+# 테스트용 데이터베이스 이름
+TEMPLATE_DB_NAME = f"{settings.DB_NAME}_template"
+
+
+def worker_database_name() -> str:
+    # pytest-xdist 워커(gw0, gw1, ...)마다 별도의 DB 를 사용한다
+    worker = os.environ.get("PYTEST_XDIST_WORKER")
+    return f"{settings.DB_NAME}_test_{worker}" if worker else f"{settings.DB_NAME}_test"
+
+
+def database_url(name: str) -> str:
+    return make_url(settings.DATABASE_URL).set(database=name).render_as_string(hide_password=False)
+
+
+def async_database_url(name: str) -> str:
+    return make_url(settings.ASYNC_DATABASE_URL).set(database=name).render_as_string(hide_password=False)
+
+
+def _admin_engine():
+    # CREATE/DROP DATABASE 는 트랜잭션 밖에서 실행되어야 한다
+    return create_engine(settings.DATABASE_URL, isolation_level="AUTOCOMMIT", poolclass=NullPool)
+
+
+def _quote(name: str) -> str:
+    return postgresql.dialect().identifier_preparer.quote(name)
+
+
+@contextmanager
+def _template_lock(conn):
+    # 여러 워커가 동시에 템플릿을 만들거나 복제하지 않도록 잠근다
+    conn.execute(text("SELECT pg_advisory_lock(hashtext(:name))"), {"name": TEMPLATE_DB_NAME})
+    try:
+        yield
+    finally:
+        conn.execute(text("SELECT pg_advisory_unlock(hashtext(:name))"), {"name": TEMPLATE_DB_NAME})
+
+
+def schema_fingerprint(metadata: MetaData) -> str:
+    """테이블/인덱스 DDL 의 해시. 모델이 바뀌면 템플릿을 다시 만든다."""
+    dialect = postgresql.dialect()
+    ddl = []
+    for table in metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(dialect=dialect)))
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            ddl.append(str(CreateIndex(index).compile(dialect=dialect)))
+    return md5("\n".join(ddl).encode()).hexdigest()
+
+
+def ensure_template_database(metadata: MetaData) -> None:
+    """스키마가 적용된 템플릿 DB 를 준비한다. 스키마가 같으면 재사용한다."""
+    fingerprint = schema_fingerprint(metadata)
+    admin = _admin_engine()
+    with admin.connect() as conn, _template_lock(conn):
+        current = conn.execute(
+            text("SELECT shobj_description(oid, 'pg_database') FROM pg_database WHERE datname = :name"),
+            {"name": TEMPLATE_DB_NAME},
+        ).first()
+        if current is not None and current[0] == fingerprint:
+            return
+
+        logger.info(f"Building template database {TEMPLATE_DB_NAME}")
+        conn.execute(text(f"DROP DATABASE IF EXISTS {_quote(TEMPLATE_DB_NAME)}"))
+        conn.execute(text(f"CREATE DATABASE {_quote(TEMPLATE_DB_NAME)}"))
+
+        template_engine = create_engine(database_url(TEMPLATE_DB_NAME), poolclass=NullPool)
+        try:
+            metadata.create_all(bind=template_engine)
+        finally:
+            template_engine.dispose()
+
+        conn.execute(text(f"COMMENT ON DATABASE {_quote(TEMPLATE_DB_NAME)} IS '{fingerprint}'"))
+    admin.dispose()
+
+
+def clone_database(name: str) -> None:
+    """템플릿 DB 를 복제해 테스트 DB 를 만든다 (파일 복사라 create_all 보다 훨씬 빠르다)."""
+    admin = _admin_engine()
+    with admin.connect() as conn, _template_lock(conn):
+        conn.execute(text(f"DROP DATABASE IF EXISTS {_quote(name)}"))
+        conn.execute(text(f"CREATE DATABASE {_quote(name)} TEMPLATE {_quote(TEMPLATE_DB_NAME)}"))
+    admin.dispose()
+
+
+def drop_database(name: str) -> None:
+    admin = _admin_engine()
+    with admin.connect() as conn:
+        conn.execute(text(f"DROP DATABASE IF EXISTS {_quote(name)}"))
+    admin.dispose()
+
+
+class QueryCounter:
+    """엔진에서 실행된 SQL 문을 세는 컨텍스트 매니저 (N+1 회귀 테스트용)."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
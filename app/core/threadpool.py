@@ -0,0 +1,55 @@
+import asyncio
+from typing import Optional
+from anyio import CapacityLimiter, to_thread
+from .metrics import THREADPOOL_BUSY, THREADPOOL_LIMIT, THREADPOOL_QUEUE_DEPTH, THREADPOOL_SATURATED_SECONDS
+
+# 동기(def) 엔드포인트와 의존성(get_db 등)은 anyio 기본 limiter 의 스레드풀(기본 40개)에서 실행된다.
+# 스레드가 커넥션 풀보다 많으면 남는 스레드는 pool_timeout 동안 커넥션을 기다리면서 GIL 만 나눠 갖는다.
+# 스레드 수를 커넥션 풀 크기에 맞추면 넘치는 요청은 스레드를 잡지 않고 이벤트 루프에서 순서를 기다린다.
+
+
+class ThreadPool:
+    """anyio 기본 스레드 limiter 의 크기를 정하고 사용량을 메트릭으로 남긴다.
+
+    size 가 0 이면 커넥션 풀 크기 + extra (커넥션을 쓰지 않는 동기 작업 몫). limiter 는 이벤트 루프마다 따로이므로
+    startup 이벤트에서 attach() 한다. run() 은 interval 초마다 사용 중/대기 중인 작업 수를 기록한다.
+    """
+
+    def __init__(self, size: int = 0, extra: int = 4, interval: float = 1.0):
+        self.size = size
+        self.extra = extra
+        self.interval = interval
+        self.limiter: Optional[CapacityLimiter] = None
+
+    def limit_for(self, pool_capacity: int) -> int:
+        return self.size if self.size > 0 else max(pool_capacity + self.extra, 1)
+
+    def attach(self, pool_capacity: int) -> None:
+        self.limiter = to_thread.current_default_thread_limiter()
+        self.set_capacity(pool_capacity)
+
+    def set_capacity(self, pool_capacity: int) -> None:
+        # 커넥션 풀 상한이 바뀌면 (자동 조절) 스레드 수도 맞춘다. 줄어들면 이미 빌려 간 스레드는 끝날 때 돌아온다
+        if self.limiter is None:
+            return
+        limit = self.limit_for(pool_capacity)
+        self.limiter.total_tokens = limit
+        THREADPOOL_LIMIT.set(limit)
+
+    def state(self) -> dict:
+        if self.limiter is None:
+            return {"limit": None, "busy": 0, "waiting": 0}
+        statistics = self.limiter.statistics()
+        return {"limit": statistics.total_tokens, "busy": statistics.borrowed_tokens, "waiting": statistics.tasks_waiting}
+
+    def sample(self) -> int:
+        state = self.state()
+        THREADPOOL_BUSY.set(state["busy"])
+        THREADPOOL_QUEUE_DEPTH.set(state["waiting"])
+        return state["waiting"]
+
+    async def run(self) -> None:
+        while True:
+            if self.sample():
+                THREADPOOL_SATURATED_SECONDS.inc(self.interval)
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,94 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from .config import settings
+from .querystats import QueryStats, current_query_stats
+
+SERVER_TIMING_HEADER = "Server-Timing"
+
+
+class ServerTiming:
+    """요청 하나의 구간별 시간. 같은 이름을 여러 번 재면 시간을 더하고 처음 시작/마지막 끝을 남긴다."""
+
+    def __init__(self, query_stats: Optional[QueryStats] = None):
+        self.query_stats = query_stats
+        self.started_at = time.perf_counter()
+        self.spans: Dict[str, Tuple[float, float, float]] = {}  # 이름 -> (처음 시작, 마지막 끝, 합계)
+
+    def add(self, name: str, start: float, end: float) -> None:
+        first, _, total = self.spans.get(name, (start, end, 0.0))
+        self.spans[name] = (first, end, total + end - start)
+
+    @contextmanager
+    def measure(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter())
+
+    def duration(self, name: str) -> Optional[float]:
+        span = self.spans.get(name)
+        return span[2] if span else None
+
+    def entries(self) -> List[Tuple[str, float, Optional[str]]]:
+        # (이름, ms, 설명). handler 는 요청 검증/의존성(validate) -> 엔드포인트(app) -> 응답 검증/직렬화(serialize) 로 나눈다
+        entries = []
+        pool = self.duration("pool")
+        if pool is not None:
+            entries.append(("pool", pool, "Connection pool checkout"))
+        if self.query_stats is not None and self.query_stats.count:
+            entries.append(("db", self.query_stats.duration, f"{self.query_stats.count} queries"))
+        handler, endpoint = self.spans.get("handler"), self.spans.get("app")
+        if handler and endpoint:
+            entries.append(("validate", endpoint[0] - handler[0], "Request validation and dependencies"))
+            entries.append(("app", endpoint[2], "Endpoint"))
+            entries.append(("serialize", handler[1] - endpoint[1], "Response validation and serialization"))
+        if handler:
+            entries.append(("handler", handler[2], "Route handler"))
+        entries.append(("total", time.perf_counter() - self.started_at, None))
+        return [(name, seconds * 1000, desc) for name, seconds, desc in entries]
+
+    def header(self) -> str:
+        return ", ".join(
+            f'{name};dur={ms:.1f}' + (f';desc="{desc}"' if desc else "")
+            for name, ms, desc in self.entries()
+        )
+
+
+_current_timing: ContextVar[Optional[ServerTiming]] = ContextVar("server_timing", default=None)
+
+
+@contextmanager
+def measure(name: str):
+    # Server-Timing 이 꺼져 있으면 아무것도 하지 않는다
+    timing = _current_timing.get()
+    if timing is None:
+        yield
+        return
+    with timing.measure(name):
+        yield
+
+
+class ServerTimingMiddleware:
+    """SERVER_TIMING_ENABLED 이면 응답에 Server-Timing 헤더를 붙인다 (ASGI 미들웨어, DB 시간은 QueryStatsMiddleware 안쪽에서 읽는다)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.SERVER_TIMING_ENABLED:
+            return await self.app(scope, receive, send)
+        timing = ServerTiming(current_query_stats())
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (SERVER_TIMING_HEADER.lower().encode(), timing.header().encode())]
+            await send(message)
+
+        token = _current_timing.set(timing)
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            _current_timing.reset(token)
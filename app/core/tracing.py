@@ -0,0 +1,290 @@
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional, Sequence
+from loguru import logger
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 분산 추적 (OpenTelemetry): HTTP 요청 -> CRUD 메서드 -> 커넥션 풀 체크아웃 -> SQL 문 스팬.
+# configure() 로 TracerProvider 를 넣기 전에는 모든 훅이 바로 통과한다 (비용 없음)
+
+TRACE_ID_HEADER = "X-Trace-Id"
+
+_tracer: Optional[trace.Tracer] = None
+_provider: Optional[TracerProvider] = None
+
+
+def configure(provider: Optional[TracerProvider]) -> None:
+    global _tracer, _provider
+    _provider = provider
+    _tracer = provider.get_tracer(__name__) if provider is not None else None
+    if provider is not None:
+        install_log_trace_ids()
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def shutdown() -> None:
+    # 남은 스팬을 내보내고 끈다
+    if _provider is not None:
+        _provider.shutdown()
+    configure(None)
+
+
+@contextmanager
+def start_span(name: str, **kwargs):
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, **kwargs) as span:
+        yield span
+
+
+# CRUD 메서드 스팬: DB 세션을 받는 공개 메서드만 "클래스.메서드" 이름으로 감싼다
+def traced_method(func):
+    name = func.__name__
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            if _tracer is None:
+                return await func(self, *args, **kwargs)
+            with _tracer.start_as_current_span(f"{type(self).__name__}.{name}"):
+                return await func(self, *args, **kwargs)
+    else:
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if _tracer is None:
+                return func(self, *args, **kwargs)
+            with _tracer.start_as_current_span(f"{type(self).__name__}.{name}"):
+                return func(self, *args, **kwargs)
+    wrapper.__traced__ = True
+    return wrapper
+
+
+def _takes_db(func) -> bool:
+    params = list(inspect.signature(func).parameters)
+    return len(params) > 1 and params[1] == "db"
+
+
+def trace_methods(cls) -> None:
+    # 상속받은(믹스인 포함) 메서드도 이 클래스에 감싸서 단다. 이미 감쌌거나 다른 데코레이터(auto_commit 등)가 붙은 것은 건너뛴다
+    seen = set()
+    for klass in cls.__mro__:
+        for name, attr in vars(klass).items():
+            if name in seen:
+                continue
+            seen.add(name)
+            if (name.startswith("_") or not inspect.isfunction(attr) or getattr(attr, "__traced__", False)
+                    or hasattr(attr, "__wrapped__") or not _takes_db(attr)):
+                continue
+            setattr(cls, name, traced_method(attr))
+
+
+# SQL 문 스팬 (모든 엔진)
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _tracer is None or context is None:
+        return
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+    context._trace_span = _tracer.start_span(operation, kind=SpanKind.CLIENT, attributes={
+        "db.system": "postgresql", "db.statement": statement[:2000], "db.operation": operation,
+    })
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        if cursor is not None and cursor.rowcount is not None and cursor.rowcount >= 0:
+            span.set_attribute("db.rows", cursor.rowcount)
+        span.end()
+        context._trace_span = None
+
+
+def _handle_error(exception_context):
+    span = getattr(exception_context.execution_context, "_trace_span", None)
+    if span is not None:
+        span.record_exception(exception_context.original_exception)
+        span.set_status(Status(StatusCode.ERROR, type(exception_context.original_exception).__name__))
+        span.end()
+        exception_context.execution_context._trace_span = None
+
+
+def install_sql_tracing() -> None:
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+# 로그 레코드에 현재 trace/span id 를 넣는다 (포맷에서 {extra[trace_id]} 로 사용)
+def _add_trace_ids(record) -> None:
+    context = trace.get_current_span().get_span_context()
+    if context.is_valid:
+        record["extra"]["trace_id"] = format(context.trace_id, "032x")
+        record["extra"]["span_id"] = format(context.span_id, "016x")
+    else:
+        record["extra"].setdefault("trace_id", "-")
+        record["extra"].setdefault("span_id", "-")
+
+
+def install_log_trace_ids() -> None:
+    # loguru 는 patcher 를 하나만 두고 configure(patcher=) 가 덮어쓰므로, 이미 걸린 patcher 를 먼저 부르고 이어서 붙인다.
+    # 현재 patcher 를 읽는 공개 API 가 없어서 _core 를 본다. 여러 번 불러도 한 번만 건다
+    previous = getattr(logger._core, "patcher", None)
+    if previous is None:
+        logger.configure(patcher=_add_trace_ids)
+        return
+    if previous is _add_trace_ids or getattr(previous, "__trace_ids__", False):
+        return
+
+    def patcher(record):
+        previous(record)
+        _add_trace_ids(record)
+
+    patcher.__trace_ids__ = True
+    logger.configure(patcher=patcher)
+
+
+class FileSpanExporter(SpanExporter):
+    """스팬을 한 줄에 하나씩 JSON 으로 파일에 쓴다 (콜렉터 없이 확인/테스트용)."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        try:
+            with self._lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(lines)
+        except OSError as e:
+            logger.error(f"Failed to write spans: {str(e)}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+class TailSamplingProcessor(SpanProcessor):
+    """trace 의 스팬을 모아 두었다가 로컬 루트 스팬(요청)이 끝날 때 내보낼지 정한다.
+
+    루트가 latency_ms 이상 걸렸거나 스팬 중 하나라도 에러면 trace 전체를 next_processor 로 넘기고 아니면 버린다.
+    끝나지 않은 trace 는 max_traces 개, trace 당 스팬은 max_spans 개까지만 들고 있는다.
+    """
+
+    def __init__(self, next_processor: SpanProcessor, latency_ms: float, max_traces: int = 10000, max_spans: int = 1000):
+        self.next_processor = next_processor
+        self.latency_ms = latency_ms
+        self.max_traces = max_traces
+        self.max_spans = max_spans
+        self._traces: "OrderedDict[int, List[ReadableSpan]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def on_start(self, span, parent_context=None) -> None:
+        pass
+
+    def on_end(self, span: ReadableSpan) -> None:
+        trace_id = span.context.trace_id
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            if spans is None:
+                spans = self._traces[trace_id] = []
+                if len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+            if len(spans) < self.max_spans:
+                spans.append(span)
+            if span.parent is not None and not span.parent.is_remote:
+                return
+            self._traces.pop(trace_id, None)
+        if self.keep(span, spans):
+            for finished in spans:
+                self.next_processor.on_end(finished)
+
+    def keep(self, root: ReadableSpan, spans: List[ReadableSpan]) -> bool:
+        if (root.end_time - root.start_time) / 1e6 >= self.latency_ms:
+            return True
+        return any(span.status.status_code == StatusCode.ERROR for span in spans)
+
+    def shutdown(self) -> None:
+        self.next_processor.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.next_processor.force_flush(timeout_millis)
+
+
+def create_provider(service_name: str, exporter: str = "otlp", otlp_endpoint: Optional[str] = None,
+                    file_path: str = "traces/spans.jsonl", sample_rate: float = 1.0,
+                    tail_latency_ms: Optional[float] = None) -> TracerProvider:
+    # 헤드 샘플링: 들어온 traceparent 의 결정을 따르고, 새 trace 는 sample_rate 비율만 기록한다
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}),
+                              sampler=ParentBased(TraceIdRatioBased(sample_rate)))
+    if exporter == "file":
+        span_exporter = FileSpanExporter(file_path)
+    else:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        span_exporter = OTLPSpanExporter(endpoint=otlp_endpoint) if otlp_endpoint else OTLPSpanExporter()
+    processor = BatchSpanProcessor(span_exporter)
+    if tail_latency_ms is not None:
+        processor = TailSamplingProcessor(processor, latency_ms=tail_latency_ms)
+    provider.add_span_processor(processor)
+    return provider
+
+
+def install_tracing(provider: Optional[TracerProvider] = None) -> None:
+    install_sql_tracing()
+    if provider is not None:
+        configure(provider)
+
+
+class TracingMiddleware:
+    """요청마다 SERVER 스팬을 연다 (ASGI 미들웨어). traceparent 헤더가 있으면 그 trace 를 잇고,
+    응답에 X-Trace-Id 헤더를 붙인다. 경로 템플릿은 라우팅이 끝난 뒤에 알 수 있으므로 스팬 이름은 마지막에 정한다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _tracer is None:
+            return await self.app(scope, receive, send)
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        status_code = None
+
+        with _tracer.start_as_current_span(
+            f"{scope['method']} {scope['path']}", context=propagate.extract(headers), kind=SpanKind.SERVER,
+            attributes={"http.method": scope["method"], "http.target": scope["path"]},
+        ) as span:
+            trace_id = format(span.get_span_context().trace_id, "032x")
+
+            async def send_with_trace_id(message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    message["headers"] = [*message.get("headers", []), (TRACE_ID_HEADER.lower().encode(), trace_id.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    span.update_name(f"{scope['method']} {route.path}")
+                    span.set_attribute("http.route", route.path)
+                if status_code is not None:
+                    span.set_attribute("http.status_code", status_code)
+                    if status_code >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
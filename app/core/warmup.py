@@ -0,0 +1,110 @@
+import asyncio
+import time
+from typing import Optional, Sequence
+from loguru import logger
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from .metrics import APP_READY, APP_STARTUP_SECONDS, DB_WARMUP_CONNECTIONS
+
+# 시작 워밍업
+# - 커넥션 풀에 커넥션을 미리 열어 두어 배포 직후 첫 요청들이 커넥션 연결 비용을 내지 않게 한다
+# - CRUD 기본 조회(get, get_multi, get_many)를 결과 없이 한 번씩 실행해서 SQLAlchemy 컴파일 캐시를 채운다.
+#   바인드 값은 캐시 키에 들어가지 않으므로 실제 요청도 같은 캐시 항목을 쓴다
+
+
+def open_connections(engine: Engine, count: int) -> int:
+    # 동시에 빌려야 서로 다른 커넥션이 열린다. pool_size 를 넘는 커넥션은 반납할 때 닫히므로 그만큼만 연다
+    connections = []
+    try:
+        for _ in range(min(count, engine.pool.size())):
+            connections.append(engine.connect())
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+
+async def open_async_connections(engine: AsyncEngine, count: int) -> int:
+    results = await asyncio.gather(*(engine.connect().start() for _ in range(min(count, engine.sync_engine.pool.size()))),
+                                   return_exceptions=True)
+    connections = [result for result in results if not isinstance(result, BaseException)]
+    await asyncio.gather(*(connection.close() for connection in connections))
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return len(connections)
+
+
+def prime_statements(engine: Engine, cruds: Sequence) -> None:
+    with Session(engine) as db:
+        for crud in cruds:
+            crud.get(db, 0)
+            crud.get_multi(db, limit=0)
+            crud.get_many(db, [0])
+        db.rollback()
+
+
+async def prime_async_statements(engine: AsyncEngine, cruds: Sequence) -> None:
+    async with AsyncSession(engine) as db:
+        for crud in cruds:
+            await crud.get(db, 0)
+            await crud.get_multi(db, limit=0)
+            await crud.get_many(db, [0])
+        await db.rollback()
+
+
+class Warmup:
+    """앱 시작 후 백그라운드에서 두 엔진의 커넥션 풀을 채우고 컴파일 캐시를 준비한다.
+
+    이벤트 루프를 막지 않도록 동기 엔진 작업은 스레드풀에서 실행한다. 끝나기 전에는 ready 가 False 이고
+    (/ready 가 503), 커넥션을 열지 못하면 retry_interval 초 뒤에 다시 시도한다.
+    """
+
+    def __init__(self, engine: Engine, async_engine: AsyncEngine, connections: int = 0, async_connections: Optional[int] = None,
+                 sync_cruds: Sequence = (), async_cruds: Sequence = (), prime: bool = True, retry_interval: float = 1.0):
+        self.engine = engine
+        self.async_engine = async_engine
+        self.connections = connections
+        self.async_connections = connections if async_connections is None else async_connections
+        self.sync_cruds = sync_cruds
+        self.async_cruds = async_cruds
+        self.prime = prime
+        self.retry_interval = retry_interval
+        self.ready = False
+
+    async def warm(self) -> None:
+        opened = await asyncio.gather(
+            run_in_threadpool(open_connections, self.engine, self.connections),
+            open_async_connections(self.async_engine, self.async_connections),
+        )
+        DB_WARMUP_CONNECTIONS.labels("sync").set(opened[0])
+        DB_WARMUP_CONNECTIONS.labels("async").set(opened[1])
+        if self.prime:
+            # 캐시 준비는 최적화일 뿐이므로 실패해도(마이그레이션 전 등) 시작을 막지 않는다
+            results = await asyncio.gather(
+                run_in_threadpool(prime_statements, self.engine, self.sync_cruds),
+                prime_async_statements(self.async_engine, self.async_cruds),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.warning(f"Statement cache priming failed: {str(result)}")
+
+    async def run(self) -> None:
+        started_at = time.perf_counter()
+        while True:
+            try:
+                await self.warm()
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Startup warmup failed, retrying in {self.retry_interval}s: {str(e)}")
+                await asyncio.sleep(self.retry_interval)
+        elapsed = time.perf_counter() - started_at
+        APP_STARTUP_SECONDS.labels("warmup").set(elapsed)
+        APP_READY.set(1)
+        self.ready = True
+        logger.info(f"Startup warmup finished in {elapsed * 1000:.0f} ms")
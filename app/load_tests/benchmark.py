@@ -0,0 +1,138 @@
+"""설정(환경 변수)만 바꿔 가며 같은 locust 시나리오를 돌려 결과를 비교한다.
+
+변형(variant)마다 uvicorn 서버를 새로 띄우고 locust 를 headless 로 실행한 뒤,
+Aggregated 통계, 실행 뒤 /metrics 값(METRICS)과 /debug/pool 스냅샷을 모아 표로 출력한다.
+
+예) 고정 크기 풀 vs 자동 조절 풀
+    python -m app.load_tests.benchmark \\
+        --variant fixed: \\
+        --variant adaptive:DB_POOL_ADAPTIVE=true,DB_POOL_ADAPT_INTERVAL=2 \\
+        -u 500 -r 50 -t 3m
+
+예) 기본 스레드풀(40) vs 커넥션 풀 크기에 맞춘 스레드풀
+    python -m app.load_tests.benchmark \\
+        --variant threads40:THREADPOOL_SIZE=40 \\
+        --variant matched: \\
+        -u 500 -r 50 -t 3m
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from prometheus_client.parser import text_string_to_metric_families
+
+DEFAULT_LOCUSTFILE = Path(__file__).resolve().parent / "store_system" / "locustfile.py"
+COLUMNS = ("Request Count", "Failure Count", "Requests/s", "50%", "95%", "99%", "Max Response Time")
+# 실행이 끝난 뒤 /metrics 에서 읽는 값 (라벨이 있으면 합친다, 워커가 여럿이면 멀티프로세스 모드일 때만 전체 합)
+METRICS = ("threadpool_saturated_seconds_total", "admission_rejected_total")
+
+
+def parse_variant(value: str) -> Tuple[str, Dict[str, str]]:
+    # "adaptive:DB_POOL_ADAPTIVE=true,DB_POOL_MAX_SIZE=60"
+    name, _, assignments = value.partition(":")
+    env = dict(item.split("=", 1) for item in assignments.split(",") if item)
+    return name, env
+
+
+def wait_until_ready(url: str, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"server did not become ready: {url}")
+
+
+def fetch_json(url: str) -> Optional[dict]:
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return json.load(response)
+    except OSError:
+        return None
+
+
+def fetch_metrics(url: str) -> Dict[str, str]:
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            text = response.read().decode()
+    except OSError:
+        return {}
+    totals = {name: 0.0 for name in METRICS}
+    for family in text_string_to_metric_families(text):
+        for sample in family.samples:
+            if sample.name in totals:
+                totals[sample.name] += sample.value
+    return {name: f"{value:g}" for name, value in totals.items()}
+
+
+def aggregated_stats(csv_prefix: Path) -> Dict[str, str]:
+    with open(f"{csv_prefix}_stats.csv", newline="") as f:
+        for row in csv.DictReader(f):
+            if row["Name"] == "Aggregated":
+                return {column: row.get(column, "") for column in COLUMNS}
+    return {}
+
+
+def run_variant(name: str, env: Dict[str, str], args) -> Dict[str, object]:
+    host = f"http://127.0.0.1:{args.port}"
+    csv_prefix = args.out / name
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--workers", str(args.workers)],
+        env={**os.environ, **env},
+    )
+    try:
+        wait_until_ready(f"{host}/db-check")
+        subprocess.run(
+            [sys.executable, "-m", "locust", "-f", str(args.locustfile), "--headless", "--only-summary",
+             "-u", str(args.users), "-r", str(args.spawn_rate), "-t", args.run_time,
+             "--host", host, "--csv", str(csv_prefix)],
+            check=True,
+        )
+        metrics = fetch_metrics(f"{host}/metrics")
+        pool = fetch_json(f"{host}/debug/pool")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    if pool is not None:
+        (args.out / f"{name}_pool.json").write_text(json.dumps(pool, indent=2))
+    return {"variant": name, **aggregated_stats(csv_prefix), **metrics}
+
+
+def print_table(rows: List[Dict[str, object]]) -> None:
+    headers = ["variant", *COLUMNS, *METRICS]
+    widths = [max(len(h), *(len(str(row.get(h, ""))) for row in rows)) for h in headers]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(row.get(h, "")).ljust(w) for h, w in zip(headers, widths)))
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variant", action="append", type=parse_variant, required=True,
+                        help="NAME:ENV=VALUE,... (repeat for each configuration to compare)")
+    parser.add_argument("-f", "--locustfile", type=Path, default=DEFAULT_LOCUSTFILE)
+    parser.add_argument("-u", "--users", type=int, default=300)
+    parser.add_argument("-r", "--spawn-rate", type=int, default=50)
+    parser.add_argument("-t", "--run-time", default="2m")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--out", type=Path, default=Path("bench_results"))
+    args = parser.parse_args(argv)
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    rows = [run_variant(name, env, args) for name, env in args.variant]
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
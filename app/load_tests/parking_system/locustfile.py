@@ -0,0 +1,19 @@
+from locust import HttpUser, between, constant
+import app.load_tests.server_timing  # noqa: F401  (Server-Timing 구간별 통계)
+from app.load_tests.parking_system.scenario0.gates import GateBehavior
+from app.load_tests.parking_system.scenario0.occupancy import OccupancyBehavior
+
+# 게이트: 주차장을 하나 만들고 입차/출차 이벤트 200개씩을 묶어 보냅니다 (가끔 같은 묶음을 재전송).
+# 안내판: 주차장별 점유 수를 계속 조회합니다.
+#
+# python -m app.load_tests.benchmark -f app/load_tests/parking_system/locustfile.py --variant default: -u 200 -t 2m
+
+class ParkingGateUser(HttpUser):
+    weight = 1
+    wait_time = between(0.5, 1)
+    tasks = [GateBehavior]
+
+class ParkingBoardUser(HttpUser):
+    weight = 4
+    wait_time = constant(0.1)
+    tasks = [OccupancyBehavior]
@@ -0,0 +1,48 @@
+import random
+import uuid
+from datetime import datetime, timezone
+from locust import task, TaskSet
+
+BATCH_SIZE = 200
+
+
+def random_plate():
+    return f"{random.randint(10, 999)}{random.choice('가나다라마바사아자하')}{random.randint(1000, 9999)}"
+
+
+class GateBehavior(TaskSet):
+    # 사용자 한 명 = 주차장 게이트 하나. 입출차 이벤트를 모아 /events/batch 로 보낸다
+    def on_start(self):
+        response = self.client.post("/parking-system/lots/", json={"name": f"Lot {uuid.uuid4().hex[:8]}", "capacity": 1000})
+        self.lot_id = response.json()["id"]
+        self.parked = []
+
+    def make_events(self):
+        events, exiting = [], set()
+        now = datetime.now(timezone.utc).isoformat()
+        for _ in range(BATCH_SIZE):
+            # 주차 중인 차가 많을수록 출차가 많아진다
+            if self.parked and random.random() < len(self.parked) / 1000:
+                plate = self.parked.pop(random.randrange(len(self.parked)))
+                exiting.add(plate)
+                kind = "exit"
+            else:
+                plate = random_plate()
+                if plate in exiting:
+                    continue
+                self.parked.append(plate)
+                kind = "entry"
+            events.append({"event_id": uuid.uuid4().hex, "lot_id": self.lot_id, "plate": plate, "kind": kind, "occurred_at": now})
+        return events
+
+    @task(5)
+    def post_events(self):
+        events = self.make_events()
+        self.client.post("/parking-system/events/batch", json=events)
+        # 게이트 재전송: 같은 묶음을 가끔 다시 보낸다 (모두 무시돼야 한다)
+        if random.random() < 0.05:
+            self.client.post("/parking-system/events/batch", json=events, name="/parking-system/events/batch (retry)")
+
+    @task(1)
+    def read_sessions(self):
+        self.client.get("/parking-system/sessions/", params={"lot_id": self.lot_id, "open_only": True})
@@ -0,0 +1,18 @@
+import random
+from locust import task, TaskSet
+
+
+class OccupancyBehavior(TaskSet):
+    # 안내판/앱: 점유 수만 자주 읽는다 (DB 를 거치지 않는 메모리 카운터)
+    @task(1)
+    def read_all_occupancy(self):
+        response = self.client.get("/parking-system/lots/occupancy")
+        if response.status_code == 200:
+            self.lot_ids = [row["lot_id"] for row in response.json()]
+
+    @task(10)
+    def read_lot_occupancy(self):
+        lot_ids = getattr(self, "lot_ids", None)
+        if not lot_ids:
+            return
+        self.client.get(f"/parking-system/lots/{random.choice(lot_ids)}/occupancy", name="/parking-system/lots/[id]/occupancy")
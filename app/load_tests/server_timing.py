@@ -0,0 +1,29 @@
+"""locust 통계에 Server-Timing 구간을 따로 기록한다 (서버에 SERVER_TIMING_ENABLED=true 필요).
+
+locustfile 에서 import 만 하면 된다. 요청마다 응답의 Server-Timing 항목이
+"SERVER-TIMING" 유형, "<요청 이름> <구간>" 이름의 통계로 추가되어 웹 UI / --csv 결과에서
+pool, db, validate, app, serialize 중 어디서 시간이 걸렸는지 볼 수 있다.
+"""
+from locust import events
+
+REQUEST_TYPE = "SERVER-TIMING"
+
+
+def parse_server_timing(header: str):
+    for entry in header.split(","):
+        name, *params = entry.strip().split(";")
+        values = dict(param.split("=", 1) for param in params if "=" in param)
+        if name and "dur" in values:
+            yield name, float(values["dur"])
+
+
+@events.request.add_listener
+def record_server_timing(request_type, name, response=None, exception=None, **kwargs):
+    if request_type == REQUEST_TYPE or exception is not None or response is None:
+        return
+    header = response.headers.get("Server-Timing")
+    if not header:
+        return
+    for metric, duration in parse_server_timing(header):
+        events.request.fire(request_type=REQUEST_TYPE, name=f"{name} {metric}", response_time=duration,
+                            response_length=0, response=None, context={}, exception=None)
@@ -1,4 +1,5 @@
 from locust import HttpUser, between
+import app.load_tests.server_timing  # noqa: F401  (Server-Timing 구간별 통계)
 from app.load_tests.store_system.scenario0.stores import StoreBehavior
 
 # 상점 생성: 1000개의 상점이 생성될 때까지 새로운 상점을 생성합니다.
@@ -1,39 +1,159 @@
+import time
+_import_started = time.perf_counter()
 from urllib.request import Request
 
 from fastapi import FastAPI, Depends
-from app.core.database import get_db
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import DBAPIError
+import asyncio
+from app.core.database import get_db, engine, async_engine, pool_controller, pool_capacity
+from app.core.pool import pool_state
 from sqlalchemy.orm import Session
 from loguru import logger
 from prometheus_client import make_asgi_app
-from app.core.metrics import start_timer, record_request_data
-import time
+from app.core.metrics import start_timer, record_request_data, flush_metrics, APP_STARTUP_SECONDS
+from app.core.cache import ResponseCache
+from app.core.admission import AdmissionController
+from app.core.deadline import CancelOnDisconnect, DeadlineMiddleware, is_query_canceled
+from app.core.profiling import ProfilingMiddleware, RequestProfiler
+from app.core.querystats import QueryStatsMiddleware, install_query_stats
+from app.core.timing import ServerTimingMiddleware
+from app.core import tracing
+from app.core.warmup import Warmup
+from app.core.shutdown import DrainMiddleware, RequestDrainer
+from app.core.threadpool import ThreadPool
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
 
-from app.store_system import include_routers as include_store_routers
+from app.store_system import include_routers as include_store_routers, CACHE_DEPENDENTS as STORE_CACHE_DEPENDENTS, WARMUP_CRUDS as STORE_WARMUP_CRUDS
+from app.store_system.coalescing import create_purchase_coalescer
+from app.parking_system import include_routers as include_parking_routers, WARMUP_CRUDS as PARKING_WARMUP_CRUDS
+from app.parking_system.occupancy import start_reconciler, occupancy
 app = FastAPI()
 
 app.include_router(include_store_routers(), prefix="/store-system")
+app.include_router(include_parking_routers(), prefix="/parking-system")
 
 @app.get("/")
 async def root():
     logger.info("Root endpoint accessed")
     return {"message": "Welcome to the Multi-System Performance Test API"}
 
+# 커넥션 풀/컴파일 캐시 워밍업 (startup 이벤트에서 백그라운드로 시작, 끝나면 /ready 가 200)
+warmup = Warmup(engine, async_engine, connections=min(settings.DB_WARMUP_CONNECTIONS, pool_capacity()),
+                async_connections=settings.DB_WARMUP_CONNECTIONS, sync_cruds=STORE_WARMUP_CRUDS,
+                async_cruds=PARKING_WARMUP_CRUDS, prime=settings.DB_WARMUP_PRIME_STATEMENTS)
+
+# 동기 엔드포인트/의존성 스레드 수를 커넥션 풀 크기에 맞춘다 (THREADPOOL_SIZE 가 0 일 때)
+threadpool = ThreadPool(size=settings.THREADPOOL_SIZE, extra=settings.THREADPOOL_EXTRA_THREADS,
+                        interval=settings.THREADPOOL_MONITOR_INTERVAL)
+
+# 진행 중인 요청 수 (종료 신호를 받으면 새 요청을 막고 진행 중인 요청을 기다린다, 미들웨어는 맨 아래에서 가장 바깥에 건다)
+drainer = RequestDrainer()
+
 @app.on_event("startup")
 async def startup_event():
+    started_at = time.perf_counter()
     logger.info("Application startup")
-    # 데이터베이스 연결 확인
-    db = next(get_db())
-    db.close()
+    drainer.reset()
+    threadpool.attach(pool_capacity())
+    app.state.threadpool_monitor = asyncio.create_task(threadpool.run())
+    # 구매 생성 묶음 처리는 lifespan 마다 새로 만든다 (이전 shutdown 에서 닫혔다)
+    app.state.purchase_coalescer = create_purchase_coalescer()
+    # 데이터베이스 연결 확인과 커넥션 풀 준비는 이벤트 루프를 막지 않도록 백그라운드에서 한다
+    app.state.warmup = asyncio.create_task(warmup.run())
+    if pool_controller is not None:
+        # 풀 상한이 바뀌면 부하 차단 자리 수와 스레드 수도 맞춘다 (컨트롤러 스레드 -> 이벤트 루프)
+        loop = asyncio.get_running_loop()
+        pool_controller.on_resize.append(lambda capacity: loop.call_soon_threadsafe(admission.set_capacity, capacity))
+        pool_controller.on_resize.append(lambda capacity: loop.call_soon_threadsafe(threadpool.set_capacity, capacity))
+        pool_controller.start()
+    # 주차장별 점유 카운터를 채우고 주기적으로 DB 와 맞춘다
+    if settings.PARKING_OCCUPANCY_RECONCILER:
+        app.state.occupancy_reconciler = start_reconciler()
+    APP_STARTUP_SECONDS.labels("startup").set(time.perf_counter() - started_at)
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Application shutdown")
+    # 1. 진행 중인 요청은 종료 신호를 받았을 때 이미 drain 했다 (app/serve.py 의 DrainingServer).
+    #    lifespan shutdown 은 uvicorn 이 리스너를 닫고 연결이 끝난 다음에 오므로 여기서는 새 요청이 없다
+    # 2. 백그라운드 작업을 멈추고 (커넥션을 돌려받을 때까지) 기다린다
+    names = ("warmup", "occupancy_reconciler", "threadpool_monitor")
+    tasks = [task for task in (getattr(app.state, name, None) for name in names) if task is not None]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for name in names:
+        setattr(app.state, name, None)
+    # 모아 둔 구매 생성을 마저 커밋한다
+    purchase_coalescer, app.state.purchase_coalescer = getattr(app.state, "purchase_coalescer", None), None
+    if purchase_coalescer is not None:
+        await run_in_threadpool(purchase_coalescer.close, settings.SHUTDOWN_DRAIN_TIMEOUT)
+    if pool_controller is not None:
+        pool_controller.stop()
+        pool_controller.on_resize.clear()
+    # 3. 풀의 커넥션을 바로 닫아서 Postgres 세션이 배포 중에 남지 않게 한다
+    await run_in_threadpool(engine.dispose)
+    await async_engine.dispose()
+    # 4. 메트릭/로그 정리
+    flush_metrics()
+    tracing.shutdown()
+    await logger.complete()
+    logger.info("Application shutdown complete")
+
+# 요청 기한(statement_timeout)을 넘겨서 취소된 쿼리
+@app.exception_handler(DBAPIError)
+async def db_error_handler(request, exc: DBAPIError):
+    if is_query_canceled(exc):
+        return JSONResponse({"detail": "Request deadline exceeded"}, status_code=504)
+    raise exc
 
 # 데이터베이스 연결 상태를 확인하는 엔드포인트 추가
 @app.get("/db-check")
 def db_check(db: Session = Depends(get_db)):
     return {"message": "Database connection is successful"}
 
+# readiness probe: 워밍업(과 주차 점유 카운터 첫 적재)이 끝나기 전에는 트래픽을 받지 않도록 503
+@app.get("/ready")
+async def ready():
+    if not warmup.ready or (settings.PARKING_OCCUPANCY_RECONCILER and not occupancy.loaded):
+        return JSONResponse({"status": "starting"}, status_code=503, headers={"Retry-After": "1"})
+    return {"status": "ready"}
+
+# 커넥션 풀 상태 (/debug/pool 은 DEBUG 일 때만)
+def pool_status():
+    return {
+        "sync": dict(pool_state(engine.pool), controller=pool_controller.state() if pool_controller else None),
+        "async": pool_state(async_engine.sync_engine.pool),
+        "threadpool": threadpool.state(),
+        "admission": {name: {"limit": limiter.limit, "active": limiter.active, "waiting": limiter.waiting}
+                      for name, limiter in admission.limiters.items()},
+    }
+
+if settings.DEBUG:
+    app.get("/debug/pool")(pool_status)
+
+# 부하 차단: 동시 처리 수를 커넥션 풀 크기로 제한 (캐시 적중은 제한 없이 바로 응답하도록 캐시보다 안쪽에 둔다).
+# parking_system 은 비동기 엔진 풀을 쓰므로 대상이 아니다
+admission = AdmissionController(
+    capacity=pool_capacity(), write_share=settings.ADMISSION_WRITE_SHARE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT, max_queue=settings.ADMISSION_MAX_QUEUE,
+    prefixes=["/store-system"], enabled=settings.ADMISSION_ENABLED,
+)
+
+@app.middleware("http")
+async def admission_middleware(request: Request, call_next):
+    return await admission.handle(request, call_next)
+
+# 목록 GET 응답 캐시 (LIST_CACHE_TTL > 0 일 때만)
+list_cache = ResponseCache(ttl=settings.LIST_CACHE_TTL, prefix="/store-system",
+                           dependents=STORE_CACHE_DEPENDENTS, max_entries=settings.LIST_CACHE_MAX_ENTRIES)
+
+@app.middleware("http")
+async def list_cache_middleware(request: Request, call_next):
+    return await list_cache.handle(request, call_next)
+
 # 그라파나 메트릭
 metrics_app = make_asgi_app()
 app.mount("/metrics", metrics_app)
@@ -45,3 +165,39 @@ async def metrics_middleware(request: Request, call_next):
     latency = time.time() - start_time
     record_request_data("fastapi_app", request, response, latency)
     return response
+
+# 클라이언트가 연결을 끊은 조회 요청은 실행 중인 쿼리를 취소한다
+app.add_middleware(CancelOnDisconnect)
+
+# 구간별 처리 시간을 Server-Timing 헤더로 (SERVER_TIMING_ENABLED, DB 시간을 읽으므로 QueryStatsMiddleware 안쪽)
+app.add_middleware(ServerTimingMiddleware)
+
+# 요청별 SQL 실행 수/DB 시간 (observers 는 테스트의 max_queries 마커가 사용)
+install_query_stats()
+query_stats_observers = []
+app.add_middleware(QueryStatsMiddleware, header=settings.DEBUG, repeat_threshold=settings.QUERY_REPEAT_THRESHOLD,
+                   observers=query_stats_observers)
+
+# 요청 프로파일링 (X-Profile 헤더 / 표본 추출). 설정이 없으면 붙이지 않으므로 비용이 없다
+request_profiler = RequestProfiler(
+    interval=settings.PROFILING_INTERVAL, token=settings.PROFILING_TOKEN, allow_header=settings.DEBUG,
+    sample_rate=settings.PROFILING_SAMPLE_RATE, sample_routes=settings.PROFILING_SAMPLE_ROUTES,
+    sample_format=settings.PROFILING_SAMPLE_FORMAT, output_dir=settings.PROFILING_DIR,
+)
+if request_profiler.enabled:
+    app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+
+# 분산 추적: 요청 -> CRUD 메서드 -> 커넥션 체크아웃 -> SQL 문 스팬 (TRACING_ENABLED, 켜면 로그에 extra[trace_id])
+tracing.install_tracing(tracing.create_provider(
+    settings.TRACING_SERVICE_NAME, exporter=settings.TRACING_EXPORTER, otlp_endpoint=settings.TRACING_OTLP_ENDPOINT,
+    file_path=settings.TRACING_FILE, sample_rate=settings.TRACING_SAMPLE_RATE, tail_latency_ms=settings.TRACING_TAIL_LATENCY_MS,
+) if settings.TRACING_ENABLED else None)
+app.add_middleware(tracing.TracingMiddleware)
+
+# 요청 기한은 도착 시각부터 잰다 (부하 차단/커넥션 풀 대기 포함)
+app.add_middleware(DeadlineMiddleware)
+
+# 종료 중 요청 차단/진행 중 요청 수 (가장 바깥)
+app.add_middleware(DrainMiddleware, drainer=drainer)
+
+APP_STARTUP_SECONDS.labels("import").set(time.perf_counter() - _import_started)
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from . import crud
+from .routers import lots, spaces, sessions, events
+
+# 시작할 때 SQL 컴파일 캐시를 채울 CRUD (app.core.warmup)
+WARMUP_CRUDS = [crud.parking_lot, crud.parking_space, crud.parking_session]
+
+def include_routers():
+    router = APIRouter()
+    router.include_router(lots.router, prefix="/lots", tags=["parking lots"])
+    router.include_router(spaces.router, prefix="/spaces", tags=["parking spaces"])
+    router.include_router(sessions.router, prefix="/sessions", tags=["parking sessions"])
+    router.include_router(events.router, prefix="/events", tags=["gate events"])
+    return router
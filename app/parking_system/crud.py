@@ -0,0 +1,136 @@
+from datetime import datetime, timezone
+from sqlalchemy import bindparam, func, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.types import DateTime, Integer, String
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.parking_system import models, schemas
+from app.core.crud.base import AsyncCRUDBase
+from app.core.pagination import TotalCount
+
+# 입차: 주차장이 있는 이벤트만 세션을 연다. 같은 event_id 나 이미 열린 세션이 있으면(중복 입차) 건너뛴다
+_OPEN_SESSIONS = text("""
+    INSERT INTO parking_sessions (lot_id, space_id, plate, entered_at, entry_event_id)
+    SELECT e.lot_id, s.id, e.plate, e.occurred_at, e.event_id
+    FROM unnest(:event_ids, :lot_ids, :plates, :occurred_at, :space_codes) AS e(event_id, lot_id, plate, occurred_at, space_code)
+    JOIN parking_lots l ON l.id = e.lot_id
+    LEFT JOIN parking_spaces s ON s.lot_id = e.lot_id AND s.code = e.space_code
+    ON CONFLICT DO NOTHING
+    RETURNING lot_id
+""").bindparams(
+    bindparam("event_ids", type_=ARRAY(String)), bindparam("lot_ids", type_=ARRAY(Integer)),
+    bindparam("plates", type_=ARRAY(String)), bindparam("occurred_at", type_=ARRAY(DateTime(timezone=True))),
+    bindparam("space_codes", type_=ARRAY(String)),
+)
+
+# 출차: 입차 이후에 온 출차만 열린 세션을 닫는다 (이미 닫혔으면 중복 출차로 보고 건너뜀)
+_CLOSE_SESSIONS = text("""
+    UPDATE parking_sessions s
+    SET exited_at = e.occurred_at, exit_event_id = e.event_id
+    FROM unnest(:event_ids, :lot_ids, :plates, :occurred_at) AS e(event_id, lot_id, plate, occurred_at)
+    WHERE s.lot_id = e.lot_id AND s.plate = e.plate AND s.exited_at IS NULL AND s.entered_at <= e.occurred_at
+    RETURNING s.lot_id
+""").bindparams(
+    bindparam("event_ids", type_=ARRAY(String)), bindparam("lot_ids", type_=ARRAY(Integer)),
+    bindparam("plates", type_=ARRAY(String)), bindparam("occurred_at", type_=ARRAY(DateTime(timezone=True))),
+)
+
+def _aware(moment: datetime) -> datetime:
+    # 시간대가 없으면 UTC 로 본다
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+def _segments(events: Sequence[schemas.GateEvent]) -> List[List[schemas.GateEvent]]:
+    # 시간순으로 정렬한 뒤 같은 차량(주차장, 번호판)이 두 번 나오기 전까지를 한 묶음으로 나눈다.
+    # 묶음 안에서는 차량마다 이벤트가 하나뿐이라 입차/출차를 문장 두 개로 처리해도 순서가 어긋나지 않는다.
+    segments, keys = [[]], set()
+    for event in sorted(events, key=lambda e: _aware(e.occurred_at)):
+        key = (event.lot_id, event.plate)
+        if key in keys:
+            segments.append([])
+            keys.clear()
+        keys.add(key)
+        segments[-1].append(event)
+    return [segment for segment in segments if segment]
+
+class CRUDParkingLot(AsyncCRUDBase[models.ParkingLot, schemas.ParkingLotCreate, schemas.ParkingLotCreate]):
+    async def occupancy(self, db: AsyncSession, lot_id: Optional[int] = None) -> List[Tuple[int, int, int]]:
+        # (lot_id, capacity, 열린 세션 수). lot_id 를 주면 그 주차장만
+        stmt = (
+            select(self.model.id, self.model.capacity, func.count(models.ParkingSession.id))
+            .outerjoin(models.ParkingSession, (models.ParkingSession.lot_id == self.model.id) & models.ParkingSession.exited_at.is_(None))
+            .group_by(self.model.id)
+        )
+        if lot_id is not None:
+            stmt = stmt.where(self.model.id == lot_id)
+        result = await db.execute(stmt)
+        return [tuple(row) for row in result.all()]
+
+class CRUDParkingSpace(AsyncCRUDBase[models.ParkingSpace, schemas.ParkingSpaceCreate, schemas.ParkingSpaceCreate]):
+    async def get_by_lot_id(self, db: AsyncSession, lot_id: int, skip: int = 0, limit: int = 100) -> List[models.ParkingSpace]:
+        result = await db.execute(select(self.model).filter(self.model.lot_id == lot_id).order_by(self.model.code).offset(skip).limit(limit))
+        return result.scalars().all()
+
+class CRUDParkingSession(AsyncCRUDBase[models.ParkingSession, schemas.ParkingSession, schemas.ParkingSession]):
+    def filters(self, lot_id: Optional[int] = None, plate: Optional[str] = None, open_only: bool = False) -> list:
+        criteria = []
+        if lot_id is not None:
+            criteria.append(self.model.lot_id == lot_id)
+        if plate is not None:
+            criteria.append(self.model.plate == plate)
+        if open_only:
+            criteria.append(self.model.exited_at.is_(None))
+        return criteria
+
+    async def get_filtered(self, db: AsyncSession, lot_id: Optional[int] = None, plate: Optional[str] = None,
+                           open_only: bool = False, skip: int = 0, limit: int = 100) -> List[models.ParkingSession]:
+        query = select(self.model).filter(*self.filters(lot_id, plate, open_only))
+        result = await db.execute(query.order_by(self.model.id.desc()).offset(skip).limit(limit))
+        return result.scalars().all()
+
+    async def count_filtered(self, db: AsyncSession, lot_id: Optional[int] = None, plate: Optional[str] = None,
+                             open_only: bool = False) -> TotalCount:
+        return await self.count(db, *self.filters(lot_id, plate, open_only))
+
+    async def ingest(self, db: AsyncSession, events: Sequence[schemas.GateEvent]) -> Tuple[schemas.GateEventIngestResult, Dict[int, int]]:
+        """게이트 이벤트 묶음을 한 트랜잭션에서 반영한다. 결과와 주차장별 점유 변화량을 돌려준다."""
+        deltas: Dict[int, int] = {}
+        entries = exits = 0
+        async with self.auto_commit(db):
+            for segment in _segments(events):
+                entry_events = [e for e in segment if e.kind == schemas.GateEventKind.entry]
+                exit_events = [e for e in segment if e.kind == schemas.GateEventKind.exit]
+                if entry_events:
+                    opened = (await db.execute(_OPEN_SESSIONS, {
+                        "event_ids": [e.event_id for e in entry_events], "lot_ids": [e.lot_id for e in entry_events],
+                        "plates": [e.plate for e in entry_events], "occurred_at": [_aware(e.occurred_at) for e in entry_events],
+                        "space_codes": [e.space_code for e in entry_events],
+                    })).scalars().all()
+                    for lot_id in opened:
+                        deltas[lot_id] = deltas.get(lot_id, 0) + 1
+                    entries += len(opened)
+                if exit_events:
+                    closed = (await db.execute(_CLOSE_SESSIONS, {
+                        "event_ids": [e.event_id for e in exit_events], "lot_ids": [e.lot_id for e in exit_events],
+                        "plates": [e.plate for e in exit_events], "occurred_at": [_aware(e.occurred_at) for e in exit_events],
+                    })).scalars().all()
+                    for lot_id in closed:
+                        deltas[lot_id] = deltas.get(lot_id, 0) - 1
+                    exits += len(closed)
+        result = schemas.GateEventIngestResult(received=len(events), entries=entries, exits=exits,
+                                               ignored=len(events) - entries - exits)
+        return result, {lot_id: delta for lot_id, delta in deltas.items() if delta}
+
+parking_lot = CRUDParkingLot(models.ParkingLot)
+parking_space = CRUDParkingSpace(models.ParkingSpace)
+parking_session = CRUDParkingSession(models.ParkingSession)
+
+# Convenience functions
+async def get_parking_spaces_by_lot(db: AsyncSession, lot_id: int, skip: int = 0, limit: int = 100) -> List[models.ParkingSpace]:
+    return await parking_space.get_by_lot_id(db, lot_id=lot_id, skip=skip, limit=limit)
+
+async def get_parking_sessions(db: AsyncSession, lot_id: Optional[int] = None, plate: Optional[str] = None,
+                               open_only: bool = False, skip: int = 0, limit: int = 100) -> List[models.ParkingSession]:
+    return await parking_session.get_filtered(db, lot_id=lot_id, plate=plate, open_only=open_only, skip=skip, limit=limit)
+
+async def ingest_gate_events(db: AsyncSession, events: Sequence[schemas.GateEvent]) -> Tuple[schemas.GateEventIngestResult, Dict[int, int]]:
+    return await parking_session.ingest(db, events)
@@ -0,0 +1,46 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+
+class ParkingLot(Base):
+    __tablename__ = "parking_lots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    capacity = Column(Integer, nullable=False)
+
+    spaces = relationship("ParkingSpace", back_populates="lot", cascade="all, delete-orphan", passive_deletes=True)
+
+class ParkingSpace(Base):
+    __tablename__ = "parking_spaces"
+
+    id = Column(Integer, primary_key=True, index=True)
+    lot_id = Column(Integer, ForeignKey("parking_lots.id", ondelete="CASCADE"), nullable=False)
+    code = Column(String, nullable=False)  # 주차장 안에서의 구역 번호 ("B2-017")
+
+    lot = relationship("ParkingLot", back_populates="spaces")
+
+    __table_args__ = (UniqueConstraint("lot_id", "code", name="uq_parking_spaces_lot_id_code"),)
+
+class ParkingSession(Base):
+    __tablename__ = "parking_sessions"
+
+    # 입차 이벤트로 열리고 출차 이벤트로 닫힌다 (exited_at 이 NULL 이면 주차 중)
+    id = Column(Integer, primary_key=True, index=True)
+    lot_id = Column(Integer, ForeignKey("parking_lots.id", ondelete="CASCADE"), nullable=False)
+    space_id = Column(Integer, ForeignKey("parking_spaces.id", ondelete="SET NULL"))
+    plate = Column(String, nullable=False)
+    entered_at = Column(DateTime(timezone=True), nullable=False)
+    exited_at = Column(DateTime(timezone=True))
+    # 게이트가 같은 이벤트를 다시 보내도 한 번만 반영한다
+    entry_event_id = Column(String, nullable=False, unique=True)
+    exit_event_id = Column(String)
+
+    lot = relationship("ParkingLot")
+    space = relationship("ParkingSpace")
+
+    __table_args__ = (
+        # 차량 한 대는 주차장마다 열린 세션이 하나뿐이다 (주차장별 점유 수 집계에도 사용)
+        Index("uq_parking_sessions_open_plate", "lot_id", "plate", unique=True, postgresql_where=exited_at.is_(None)),
+        Index("ix_parking_sessions_plate", "plate"),
+    )
@@ -0,0 +1,128 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, List, Mapping, Optional
+from fastapi import HTTPException
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import PARKING_OCCUPANCY_DRIFT
+from app.parking_system import crud, schemas
+
+
+class OccupancyCounters:
+    """주차장별 점유 수를 메모리에 들고 있다가 조회에 바로 답한다 (워커 프로세스마다 하나).
+
+    이 프로세스가 처리한 이벤트는 커밋 직후 apply() 로 바로 반영되고,
+    다른 워커가 처리한 이벤트까지 포함한 정확한 값은 reconcile() 때 DB 에서 다시 맞춘다.
+    """
+
+    def __init__(self):
+        self._capacity: Dict[int, int] = {}
+        self._occupied: Dict[int, int] = {}
+        # reconcile 쿼리가 도는 동안 들어온 변화량 (DB 값으로 덮어쓴 뒤 다시 더한다)
+        self._pending: Optional[Dict[int, int]] = None
+        self.reconciled_at: Optional[datetime] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.reconciled_at is not None
+
+    def reset(self) -> None:
+        self._capacity.clear()
+        self._occupied.clear()
+        self._pending = None
+        self.reconciled_at = None
+
+    async def reconcile(self, db: AsyncSession) -> int:
+        # DB 와 다른 만큼(절대값 합)을 돌려준다
+        self._pending = {}
+        try:
+            rows = await crud.parking_lot.occupancy(db)
+        except BaseException:
+            self._pending = None
+            raise
+        pending, self._pending = self._pending, None
+        drift = 0
+        capacity, occupied = {}, {}
+        for lot_id, lot_capacity, count in rows:
+            count += pending.get(lot_id, 0)
+            # 처음 보는 주차장(다른 워커가 만든 것)은 어긋난 것으로 치지 않는다
+            if lot_id in self._occupied:
+                drift += abs(self._occupied.get(lot_id, 0) - count)
+            capacity[lot_id], occupied[lot_id] = lot_capacity, count
+        self._capacity, self._occupied = capacity, occupied
+        self.reconciled_at = datetime.now(timezone.utc)
+        if drift:
+            PARKING_OCCUPANCY_DRIFT.inc(drift)
+            logger.warning(f"Parking occupancy drift corrected: {drift}")
+        return drift
+
+    def apply(self, deltas: Mapping[int, int]) -> None:
+        for lot_id, delta in deltas.items():
+            if lot_id in self._occupied:
+                self._occupied[lot_id] = max(self._occupied[lot_id] + delta, 0)
+            if self._pending is not None:
+                self._pending[lot_id] = self._pending.get(lot_id, 0) + delta
+
+    def set_lot(self, lot_id: int, capacity: int) -> None:
+        self._capacity[lot_id] = capacity
+        self._occupied.setdefault(lot_id, 0)
+
+    async def load_lot(self, db: AsyncSession, lot_id: int) -> Optional[schemas.LotOccupancy]:
+        # 카운터에 없는 주차장 (다른 워커가 reconcile 뒤에 만든 것) 을 DB 에서 읽어 채운다. 없는 주차장이면 None
+        rows = await crud.parking_lot.occupancy(db, lot_id=lot_id)
+        if not rows:
+            return None
+        _, capacity, count = rows[0]
+        # 읽는 동안 이 워커가 먼저 채웠으면 (set_lot/reconcile) 그 값을 둔다
+        if lot_id not in self._capacity:
+            self._capacity[lot_id], self._occupied[lot_id] = capacity, count
+        return self.get(lot_id)
+
+    def remove_lot(self, lot_id: int) -> None:
+        self._capacity.pop(lot_id, None)
+        self._occupied.pop(lot_id, None)
+
+    def get(self, lot_id: int) -> Optional[schemas.LotOccupancy]:
+        if lot_id not in self._capacity:
+            return None
+        capacity, occupied = self._capacity[lot_id], self._occupied[lot_id]
+        return schemas.LotOccupancy(lot_id=lot_id, capacity=capacity, occupied=occupied,
+                                    available=max(capacity - occupied, 0), reconciled_at=self.reconciled_at)
+
+    def all(self) -> List[schemas.LotOccupancy]:
+        return [self.get(lot_id) for lot_id in sorted(self._capacity)]
+
+
+occupancy = OccupancyCounters()
+
+
+async def reconcile_occupancy() -> int:
+    async with AsyncSessionLocal() as db:
+        return await occupancy.reconcile(db)
+
+
+async def run_reconciler(interval: float) -> None:
+    # 시작할 때 한 번 채우고, interval 초마다 DB 와 맞춘다
+    while True:
+        try:
+            await reconcile_occupancy()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Parking occupancy reconcile failed: {str(e)}")
+        if interval <= 0 and occupancy.loaded:
+            return
+        await asyncio.sleep(interval if interval > 0 else 1)
+
+
+def loaded_occupancy() -> OccupancyCounters:
+    # 첫 reconcile 전에는 점유 수를 알 수 없다
+    if not occupancy.loaded:
+        raise HTTPException(status_code=503, detail="Occupancy not loaded yet", headers={"Retry-After": "1"})
+    return occupancy
+
+
+def start_reconciler() -> asyncio.Task:
+    return asyncio.create_task(run_reconciler(settings.PARKING_OCCUPANCY_RECONCILE_INTERVAL))
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends
+from pydantic import conlist
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.parking_system import crud, schemas
+from app.parking_system.occupancy import occupancy
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.metrics import PARKING_GATE_EVENTS
+from app.core.routing import InstrumentedRoute
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+@router.post("/batch", response_model=schemas.GateEventIngestResult)
+async def ingest_gate_events(
+    events: conlist(schemas.GateEvent, min_items=1, max_items=settings.PARKING_EVENT_BATCH_MAX),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # 게이트 이벤트 묶음을 한 트랜잭션으로 반영한다. 재전송된 이벤트(event_id 중복)는 무시되므로 그대로 다시 보내도 된다
+    result, deltas = await crud.ingest_gate_events(db, events)
+    occupancy.apply(deltas)
+    PARKING_GATE_EVENTS.labels(result="entry").inc(result.entries)
+    PARKING_GATE_EVENTS.labels(result="exit").inc(result.exits)
+    PARKING_GATE_EVENTS.labels(result="ignored").inc(result.ignored)
+    return result
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from app.parking_system import crud, schemas
+from app.parking_system.occupancy import OccupancyCounters, loaded_occupancy, occupancy
+from app.core.database import get_async_db, get_lazy_async_db
+from app.core.routing import InstrumentedRoute
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+@router.post("/", response_model=schemas.ParkingLot)
+async def create_parking_lot(lot: schemas.ParkingLotCreate, db: AsyncSession = Depends(get_async_db)):
+    db_lot = await crud.parking_lot.create(db=db, obj_in=lot)
+    occupancy.set_lot(db_lot.id, db_lot.capacity)
+    return db_lot
+
+# 점유 수는 DB 를 읽지 않고 메모리 카운터로 답한다 (reconciled_at 시점에 DB 와 맞춘 값 + 그 뒤 이 워커가 받은 이벤트)
+@router.get("/occupancy", response_model=List[schemas.LotOccupancy])
+async def read_occupancy(counters: OccupancyCounters = Depends(loaded_occupancy)):
+    return counters.all()
+
+# 카운터에 없으면 (다른 워커가 만든 주차장) DB 에서 읽어 채운다. 커넥션은 그때만 빌린다
+@router.get("/{lot_id}/occupancy", response_model=schemas.LotOccupancy)
+async def read_lot_occupancy(lot_id: int, counters: OccupancyCounters = Depends(loaded_occupancy),
+                             db: AsyncSession = Depends(get_lazy_async_db)):
+    lot_occupancy = counters.get(lot_id) or await counters.load_lot(db, lot_id)
+    if lot_occupancy is None:
+        raise HTTPException(status_code=404, detail="Parking lot not found")
+    return lot_occupancy
+
+@router.get("/{lot_id}", response_model=schemas.ParkingLot)
+async def read_parking_lot(lot_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_lot = await crud.parking_lot.get(db=db, id=lot_id)
+    if db_lot is None:
+        raise HTTPException(status_code=404, detail="Parking lot not found")
+    return db_lot
+
+@router.get("/{lot_id}/spaces", response_model=List[schemas.ParkingSpace])
+async def read_parking_lot_spaces(lot_id: int, skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    if await crud.parking_lot.get(db=db, id=lot_id) is None:
+        raise HTTPException(status_code=404, detail="Parking lot not found")
+    return await crud.get_parking_spaces_by_lot(db, lot_id=lot_id, skip=skip, limit=limit)
+
+@router.put("/{lot_id}", response_model=schemas.ParkingLot)
+async def update_parking_lot(lot_id: int, lot: schemas.ParkingLotCreate, db: AsyncSession = Depends(get_async_db)):
+    db_lot = await crud.parking_lot.get(db=db, id=lot_id)
+    if db_lot is None:
+        raise HTTPException(status_code=404, detail="Parking lot not found")
+    db_lot = await crud.parking_lot.update(db=db, db_obj=db_lot, obj_in=lot)
+    occupancy.set_lot(db_lot.id, db_lot.capacity)
+    return db_lot
+
+@router.delete("/{lot_id}", response_model=schemas.ParkingLot)
+async def delete_parking_lot(lot_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_lot = await crud.parking_lot.delete(db=db, id=lot_id)
+    if db_lot is None:
+        raise HTTPException(status_code=404, detail="Parking lot not found")
+    occupancy.remove_lot(lot_id)
+    return db_lot
+
+@router.get("/", response_model=List[schemas.ParkingLot])
+async def read_parking_lots(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    return await crud.parking_lot.get_multi(db, skip=skip, limit=limit)
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from app.parking_system import crud, schemas
+from app.core.database import get_async_db
+from app.core.pagination import write_total_count
+from app.core.routing import InstrumentedRoute
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+@router.get("/{session_id}", response_model=schemas.ParkingSession)
+async def read_parking_session(session_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_session = await crud.parking_session.get(db=db, id=session_id)
+    if db_session is None:
+        raise HTTPException(status_code=404, detail="Parking session not found")
+    return db_session
+
+@router.get("/", response_model=List[schemas.ParkingSession])
+async def read_parking_sessions(
+    response: Response,
+    lot_id: int = Query(None, description="Filter sessions by parking lot"),
+    plate: str = Query(None, description="Filter sessions by plate number"),
+    open_only: bool = Query(False, description="Only sessions that have not exited yet"),
+    skip: int = 0,
+    limit: int = 100,
+    count: bool = Query(False, description="Add X-Total-Count (estimated for unfiltered lists, counted up to LIST_COUNT_CAP otherwise)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    sessions = await crud.get_parking_sessions(db, lot_id=lot_id, plate=plate, open_only=open_only, skip=skip, limit=limit)
+    if count:
+        write_total_count(response, await crud.parking_session.count_filtered(db, lot_id=lot_id, plate=plate, open_only=open_only))
+    return sessions
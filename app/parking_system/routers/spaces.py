@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from typing import List
+from app.parking_system import crud, schemas
+from app.core.database import get_async_db
+from app.core.routing import InstrumentedRoute
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+@router.post("/", response_model=schemas.ParkingSpace)
+async def create_parking_space(space: schemas.ParkingSpaceCreate, db: AsyncSession = Depends(get_async_db)):
+    if await crud.parking_lot.get(db=db, id=space.lot_id) is None:
+        raise HTTPException(status_code=404, detail="Parking lot not found")
+    try:
+        return await crud.parking_space.create(db=db, obj_in=space)
+    except IntegrityError:
+        raise HTTPException(status_code=400, detail="Space code already registered in this lot")
+
+@router.get("/{space_id}", response_model=schemas.ParkingSpace)
+async def read_parking_space(space_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_space = await crud.parking_space.get(db=db, id=space_id)
+    if db_space is None:
+        raise HTTPException(status_code=404, detail="Parking space not found")
+    return db_space
+
+@router.delete("/{space_id}", response_model=schemas.ParkingSpace)
+async def delete_parking_space(space_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_space = await crud.parking_space.delete(db=db, id=space_id)
+    if db_space is None:
+        raise HTTPException(status_code=404, detail="Parking space not found")
+    return db_space
+
+@router.get("/", response_model=List[schemas.ParkingSpace])
+async def read_parking_spaces(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    return await crud.parking_space.get_multi(db, skip=skip, limit=limit)
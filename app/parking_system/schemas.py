@@ -0,0 +1,66 @@
+from pydantic import BaseModel, conint, constr
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+class ParkingLotBase(BaseModel):
+    name: str
+    capacity: conint(ge=0)
+
+class ParkingLotCreate(ParkingLotBase):
+    pass
+
+class ParkingLot(ParkingLotBase):
+    id: int
+
+    class Config:
+        orm_mode = True
+
+class ParkingSpaceBase(BaseModel):
+    lot_id: int
+    code: constr(min_length=1, max_length=32)
+
+class ParkingSpaceCreate(ParkingSpaceBase):
+    pass
+
+class ParkingSpace(ParkingSpaceBase):
+    id: int
+
+    class Config:
+        orm_mode = True
+
+class ParkingSession(BaseModel):
+    id: int
+    lot_id: int
+    space_id: Optional[int] = None
+    plate: str
+    entered_at: datetime
+    exited_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+class GateEventKind(str, Enum):
+    entry = "entry"
+    exit = "exit"
+
+class GateEvent(BaseModel):
+    event_id: constr(min_length=1, max_length=64)  # 게이트가 만든 고유 id (재전송 중복 제거용)
+    lot_id: int
+    plate: constr(min_length=1, max_length=16)
+    kind: GateEventKind
+    occurred_at: datetime
+    space_code: Optional[constr(max_length=32)] = None
+
+class GateEventIngestResult(BaseModel):
+    received: int
+    entries: int  # 새로 열린 세션
+    exits: int  # 닫힌 세션
+    ignored: int  # 중복/없는 주차장/열린 세션 없는 출차
+
+class LotOccupancy(BaseModel):
+    lot_id: int
+    capacity: int
+    occupied: int
+    available: int
+    reconciled_at: Optional[datetime] = None
@@ -0,0 +1,38 @@
+from prometheus_client import REGISTRY
+
+
+async def test_ingest_events_updates_occupancy(async_test_client):
+    lot = (await async_test_client.post("/parking-system/lots/", json={"name": "Central", "capacity": 2})).json()
+    ignored = lambda: REGISTRY.get_sample_value("parking_gate_events_total", {"result": "ignored"}) or 0
+    before = ignored()
+    events = [
+        {"event_id": "g1-1", "lot_id": lot["id"], "plate": "12가3456", "kind": "entry", "occurred_at": "2024-05-01T09:00:00Z"},
+        {"event_id": "g1-2", "lot_id": lot["id"], "plate": "34나5678", "kind": "entry", "occurred_at": "2024-05-01T09:01:00Z"},
+        {"event_id": "g2-1", "lot_id": lot["id"], "plate": "12가3456", "kind": "exit", "occurred_at": "2024-05-01T09:30:00Z"},
+        {"event_id": "g2-2", "lot_id": lot["id"], "plate": "56다7890", "kind": "exit", "occurred_at": "2024-05-01T09:31:00Z"},
+    ]
+    response = await async_test_client.post("/parking-system/events/batch", json=events)
+    assert response.status_code == 200
+    assert response.json() == {"received": 4, "entries": 2, "exits": 1, "ignored": 1}
+    assert ignored() - before == 1
+
+    occupancy = (await async_test_client.get(f"/parking-system/lots/{lot['id']}/occupancy")).json()
+    assert (occupancy["occupied"], occupancy["available"]) == (1, 1)
+
+    sessions = (await async_test_client.get("/parking-system/sessions/", params={"lot_id": lot["id"], "open_only": True})).json()
+    assert [session["plate"] for session in sessions] == ["34나5678"]
+    session = (await async_test_client.get(f"/parking-system/sessions/{sessions[0]['id']}")).json()
+    assert session["exited_at"] is None
+    counted = await async_test_client.get("/parking-system/sessions/", params={"lot_id": lot["id"], "limit": 1, "count": True})
+    assert (counted.headers["X-Total-Count"], counted.headers["X-Total-Count-Accuracy"]) == ("2", "exact")
+
+    # 재전송은 무시되고 점유 수도 그대로다
+    response = await async_test_client.post("/parking-system/events/batch", json=events)
+    assert response.json() == {"received": 4, "entries": 0, "exits": 0, "ignored": 4}
+    assert (await async_test_client.get(f"/parking-system/lots/{lot['id']}/occupancy")).json()["occupied"] == 1
+
+
+async def test_ingest_events_validation(async_test_client):
+    assert (await async_test_client.post("/parking-system/events/batch", json=[])).status_code == 422
+    bad_kind = [{"event_id": "x", "lot_id": 1, "plate": "12가3456", "kind": "park", "occurred_at": "2024-05-01T09:00:00Z"}]
+    assert (await async_test_client.post("/parking-system/events/batch", json=bad_kind)).status_code == 422
@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+from app.parking_system import crud, schemas
+
+
+async def test_parking_lot_crud(async_test_client):
+    response = await async_test_client.post("/parking-system/lots/", json={"name": "Central", "capacity": 50})
+    assert response.status_code == 200
+    lot = response.json()
+    assert (await async_test_client.get(f"/parking-system/lots/{lot['id']}")).json() == lot
+
+    updated = await async_test_client.put(f"/parking-system/lots/{lot['id']}", json={"name": "Central", "capacity": 40})
+    assert updated.json()["capacity"] == 40
+    occupancy = (await async_test_client.get(f"/parking-system/lots/{lot['id']}/occupancy")).json()
+    assert (occupancy["capacity"], occupancy["occupied"], occupancy["available"]) == (40, 0, 40)
+
+    assert (await async_test_client.delete(f"/parking-system/lots/{lot['id']}")).status_code == 200
+    assert (await async_test_client.get(f"/parking-system/lots/{lot['id']}")).status_code == 404
+    assert (await async_test_client.get(f"/parking-system/lots/{lot['id']}/occupancy")).status_code == 404
+
+
+async def test_parking_spaces(async_test_client):
+    lot = (await async_test_client.post("/parking-system/lots/", json={"name": "Central", "capacity": 2})).json()
+    response = await async_test_client.post("/parking-system/spaces/", json={"lot_id": lot["id"], "code": "B2-017"})
+    assert response.status_code == 200
+    duplicate = await async_test_client.post("/parking-system/spaces/", json={"lot_id": lot["id"], "code": "B2-017"})
+    assert duplicate.status_code == 400
+    missing_lot = await async_test_client.post("/parking-system/spaces/", json={"lot_id": lot["id"] + 1000, "code": "A"})
+    assert missing_lot.status_code == 404
+    spaces = (await async_test_client.get(f"/parking-system/lots/{lot['id']}/spaces")).json()
+    assert [space["code"] for space in spaces] == ["B2-017"]
+
+
+async def test_occupancy_is_reconciled_with_database(async_test_client, async_db_session, occupancy_counters):
+    lot_id = (await crud.parking_lot.create(async_db_session, schemas.ParkingLotCreate(name="Central", capacity=3))).id
+    # 다른 워커가 만든 주차장/세션은 reconcile 전까지 이 워커의 카운터에 없다
+    assert occupancy_counters.get(lot_id) is None
+    await crud.ingest_gate_events(async_db_session, [schemas.GateEvent(
+        event_id="other-worker", lot_id=lot_id, plate="12가3456", kind="entry", occurred_at=datetime.now(timezone.utc))])
+
+    assert await occupancy_counters.reconcile(async_db_session) == 0
+    data = (await async_test_client.get("/parking-system/lots/occupancy")).json()
+    assert [(row["lot_id"], row["occupied"], row["available"]) for row in data] == [(lot_id, 1, 2)]
+    assert data[0]["reconciled_at"] is not None
+
+    # 카운터가 어긋나면 다음 reconcile 에서 DB 값으로 맞춘다
+    occupancy_counters.apply({lot_id: 5})
+    assert await occupancy_counters.reconcile(async_db_session) == 5
+    assert occupancy_counters.get(lot_id).occupied == 1
+
+
+async def test_lot_occupancy_miss_reads_database(async_test_client, async_db_session, occupancy_counters):
+    # 다른 워커가 만든 주차장은 DB 에서 읽어 카운터를 채운다
+    lot_id = (await crud.parking_lot.create(async_db_session, schemas.ParkingLotCreate(name="East", capacity=3))).id
+    await crud.ingest_gate_events(async_db_session, [schemas.GateEvent(
+        event_id="other-worker", lot_id=lot_id, plate="12가3456", kind="entry", occurred_at=datetime.now(timezone.utc))])
+    assert occupancy_counters.get(lot_id) is None
+
+    response = await async_test_client.get(f"/parking-system/lots/{lot_id}/occupancy")
+    assert response.status_code == 200
+    assert (response.json()["occupied"], response.json()["available"]) == (1, 2)
+    assert occupancy_counters.get(lot_id).occupied == 1
+    # 이후 이 워커가 받은 이벤트는 채운 카운터에 더해진다
+    occupancy_counters.apply({lot_id: 1})
+    assert (await async_test_client.get(f"/parking-system/lots/{lot_id}/occupancy")).json()["occupied"] == 2
+    # 정말 없는 주차장만 404
+    assert (await async_test_client.get(f"/parking-system/lots/{lot_id + 1000}/occupancy")).status_code == 404
+
+
+async def test_occupancy_not_loaded(async_test_client, occupancy_counters):
+    occupancy_counters.reset()
+    response = await async_test_client.get("/parking-system/lots/occupancy")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
@@ -0,0 +1,11 @@
+import pytest_asyncio
+from app.parking_system.occupancy import occupancy
+
+
+# 점유 카운터는 프로세스 전역이므로 테스트마다 비우고 테스트 트랜잭션 기준으로 다시 채운다
+@pytest_asyncio.fixture(autouse=True)
+async def occupancy_counters(async_db_session):
+    occupancy.reset()
+    await occupancy.reconcile(async_db_session)
+    yield occupancy
+    occupancy.reset()
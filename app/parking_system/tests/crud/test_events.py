@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta, timezone
+from app.parking_system import crud, schemas
+
+T0 = datetime(2024, 5, 1, 9, 0, tzinfo=timezone.utc)
+
+
+def event(event_id, lot_id, plate, kind, minutes, space_code=None):
+    return schemas.GateEvent(event_id=event_id, lot_id=lot_id, plate=plate, kind=kind,
+                             occurred_at=T0 + timedelta(minutes=minutes), space_code=space_code)
+
+
+async def test_ingest_gate_events(async_db_session):
+    lot_id = (await crud.parking_lot.create(async_db_session, schemas.ParkingLotCreate(name="Central", capacity=10))).id
+    space_id = (await crud.parking_space.create(async_db_session, schemas.ParkingSpaceCreate(lot_id=lot_id, code="A-01"))).id
+    events = [
+        # 순서가 섞여 들어와도 시간순으로 반영한다: 12가3456 은 입차 -> 출차 -> 재입차
+        event("e3", lot_id, "12가3456", "entry", 20),
+        event("e2", lot_id, "12가3456", "exit", 10),
+        event("e1", lot_id, "12가3456", "entry", 0, space_code="A-01"),
+        event("e4", lot_id, "34나5678", "entry", 5),
+        event("e1", lot_id, "12가3456", "entry", 0),  # 재전송
+        event("e5", lot_id, "99다9999", "exit", 6),  # 열린 세션 없음
+        event("e6", lot_id + 1000, "56라7890", "entry", 7),  # 없는 주차장
+    ]
+    result, deltas = await crud.ingest_gate_events(async_db_session, events)
+    assert result == schemas.GateEventIngestResult(received=7, entries=3, exits=1, ignored=3)
+    assert deltas == {lot_id: 2}
+
+    sessions = await crud.get_parking_sessions(async_db_session, lot_id=lot_id, plate="12가3456")
+    assert [(s.entered_at, s.exited_at, s.space_id) for s in sessions] == [
+        (T0 + timedelta(minutes=20), None, None),
+        (T0, T0 + timedelta(minutes=10), space_id),
+    ]
+    assert await crud.parking_lot.occupancy(async_db_session) == [(lot_id, 10, 2)]
+
+    # 같은 묶음을 다시 보내도 바뀌는 것이 없다
+    result, deltas = await crud.ingest_gate_events(async_db_session, events)
+    assert (result.entries, result.exits, deltas) == (0, 0, {})
@@ -0,0 +1,22 @@
+import argparse
+import uvicorn
+from app.core.config import settings
+from app.core.shutdown import DrainingServer
+
+# 배포용 실행 진입점: 종료 신호를 받으면 uvicorn 이 리스너를 닫기 전에 진행 중인 요청을 drain 한다
+# python -m app.serve --host 0.0.0.0 --port 8000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    from app.main import app, drainer
+    config = uvicorn.Config(app, host=args.host, port=args.port)
+    DrainingServer(config, drainer, settings.SHUTDOWN_DRAIN_TIMEOUT).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,17 @@
 from fastapi import APIRouter
+from . import crud
 from .routers import stores, store_inspections, products, product_arrivals, customers, purchases
 
+# 목록 캐시 무효화: 왼쪽 리소스에 쓰면 그 리소스를 expand 로 포함하는 목록도 함께 비운다
+CACHE_DEPENDENTS = {
+    "stores": ["store-inspections"],
+    "products": ["product-arrivals", "purchases"],
+    "customers": ["purchases"],
+}
+
+# 시작할 때 SQL 컴파일 캐시를 채울 CRUD (app.core.warmup)
+WARMUP_CRUDS = [crud.store, crud.store_inspection, crud.product, crud.product_arrival, crud.customer, crud.purchase]
+
 def include_routers():
     router = APIRouter()
     router.include_router(stores.router, prefix="/stores", tags=["stores"])
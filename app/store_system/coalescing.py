@@ -0,0 +1,29 @@
+from typing import List, Optional
+from fastapi import Request
+from sqlalchemy import Row
+from app.core.coalescer import WriteCoalescer
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.store_system import crud, schemas
+
+# 구매 생성 묶음 처리 (PURCHASE_COALESCE_WINDOW_MS > 0 일 때만).
+# startup 이벤트가 lifespan 마다 새로 만들어 app.state 에 두고 shutdown 이벤트가 닫는다 (닫은 것은 다시 열지 않는다)
+
+
+def _flush_purchases(purchases_in: List[schemas.PurchaseCreate]) -> List[Row]:
+    db = SessionLocal()
+    try:
+        return crud.purchase.create_many(db, purchases_in)
+    finally:
+        db.close()
+
+
+def create_purchase_coalescer() -> Optional[WriteCoalescer]:
+    if settings.PURCHASE_COALESCE_WINDOW_MS <= 0:
+        return None
+    return WriteCoalescer(_flush_purchases, window=settings.PURCHASE_COALESCE_WINDOW_MS / 1000,
+                          max_batch=settings.PURCHASE_COALESCE_MAX_ROWS, name="purchases")
+
+
+def get_purchase_coalescer(request: Request) -> Optional[WriteCoalescer]:
+    return getattr(request.app.state, "purchase_coalescer", None)
@@ -1,45 +1,265 @@
+import re
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import Row, and_, cast, func, or_, select, text
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION, insert
+from typing import Dict, List, Optional, Sequence, Tuple
 from datetime import date
 from app.store_system import models, schemas
-from app.core.crud.base import CRUDBase
+from app.core.config import settings
+from app.core.crud.base import CRUDBase, ModelType, CreateSchemaType, UpdateSchemaType
+from app.core.pagination import TotalCount
+from app.core import partitioning
+
+class NameSearchMixin:
+    # name + search_vector(생성 컬럼) 을 가진 모델용 전문/접두어/유사도 검색
+    def search(self, db: Session, q: str, limit: int = 20, after: Optional[Tuple[float, int]] = None) -> List[Tuple[ModelType, float]]:
+        words = re.findall(r"\w+", q.lower())
+        if not words:
+            return []
+        # 각 단어를 접두어로 매칭 ('gala:* & pho:*')
+        tsquery = func.to_tsquery("simple", " & ".join(f"{word}:*" for word in words))
+        search_vector = self.model.__table__.c.search_vector
+
+        # 정규화 1: 긴 이름일수록 점수를 낮춘다. real 그대로 비교하면 커서로 왕복한 값과 어긋나므로 double precision 으로 맞춘다
+        score = cast(func.ts_rank_cd(search_vector, tsquery, 1) + func.word_similarity(q, self.model.name), DOUBLE_PRECISION)
+        # 후보는 GIN 인덱스로 찾고, 점수 상위 SEARCH_MAX_RESULTS 개만 남긴다 (top-N 정렬이라 메모리는 N 개분).
+        # 정렬 없이 자르면 Postgres 가 아무 N 개나 골라서 가장 잘 맞는 행이 빠지거나 페이지마다 후보가 달라진다
+        candidates = select(self.model.id, score.label("rank")) \
+            .where(or_(search_vector.op("@@")(tsquery), self.model.name.op("%>")(q))) \
+            .order_by(score.desc(), self.model.id) \
+            .limit(settings.SEARCH_MAX_RESULTS) \
+            .subquery()
+        rank = candidates.c.rank
+
+        query = db.query(self.model, rank).join(candidates, candidates.c.id == self.model.id)
+        if after is not None:
+            after_rank, after_id = after
+            query = query.filter(or_(rank < after_rank, and_(rank == after_rank, self.model.id > after_id)))
+        return query.order_by(rank.desc(), self.model.id).limit(limit).all()
 
 class CRUDStore(CRUDBase[models.Store, schemas.StoreCreate, schemas.StoreCreate]):
     def get_by_location(self, db: Session, location: str, skip: int = 0, limit: int = 100) -> List[models.Store]:
         return db.query(self.model).filter(func.lower(self.model.location) == func.lower(location)).offset(skip).limit(limit).all()
 
+    def count_by_location(self, db: Session, location: str) -> TotalCount:
+        return self.count(db, func.lower(self.model.location) == func.lower(location))
+
+    def search_by_location(self, db: Session, q: str, mode: schemas.StoreSearchMode = schemas.StoreSearchMode.auto, limit: int = 20) -> List[Tuple[models.Store, bool, float]]:
+        # prefix: lower(location) LIKE 'q%'      -> ix_stores_location_lower (text_pattern_ops)
+        # similar: q <% location (word similarity) -> ix_stores_location_trgm (GIN)
+        escaped = q.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        is_prefix = func.lower(self.model.location).like(escaped + "%", escape="\\")
+        is_similar = self.model.location.op("%>")(q)
+        score = func.word_similarity(q, self.model.location)
+
+        if mode == schemas.StoreSearchMode.prefix:
+            condition = is_prefix
+        elif mode == schemas.StoreSearchMode.similar:
+            condition = is_similar
+        else:
+            condition = or_(is_prefix, is_similar)
+
+        # 접두어 일치를 먼저, 그다음 유사도 순
+        return db.query(self.model, is_prefix.label("is_prefix"), score.label("score")) \
+            .filter(condition) \
+            .order_by(is_prefix.desc(), score.desc(), self.model.id) \
+            .limit(limit).all()
+
 class CRUDStoreInspection(CRUDBase[models.StoreInspection, schemas.StoreInspectionCreate, schemas.StoreInspectionCreate]):
-    def get_by_store_id(self, db: Session, store_id: int, skip: int = 0, limit: int = 100) -> List[models.StoreInspection]:
-        return db.query(self.model).filter(self.model.store_id == store_id).offset(skip).limit(limit).all()
+    def get_by_store_id(self, db: Session, store_id: int, skip: int = 0, limit: int = 100, expand: Sequence[str] = ()) -> List[models.StoreInspection]:
+        return db.query(self.model).options(*self.expand_options(expand)).filter(self.model.store_id == store_id).offset(skip).limit(limit).all()
+
+    def count_by_store_id(self, db: Session, store_id: int) -> TotalCount:
+        return self.count(db, self.model.store_id == store_id)
 
-    def get_by_date_range(self, db: Session, start_date: date, end_date: date, skip: int = 0, limit: int = 100) -> List[models.StoreInspection]:
-        return db.query(self.model).filter(self.model.inspection_date.between(start_date, end_date)).offset(skip).limit(limit).all()
+    def get_by_date_range(self, db: Session, start_date: date, end_date: date, skip: int = 0, limit: int = 100, expand: Sequence[str] = ()) -> List[models.StoreInspection]:
+        return db.query(self.model).options(*self.expand_options(expand)).filter(self.model.inspection_date.between(start_date, end_date)).offset(skip).limit(limit).all()
 
-class CRUDProduct(CRUDBase[models.Product, schemas.ProductCreate, schemas.ProductCreate]):
+    def count_by_date_range(self, db: Session, start_date: date, end_date: date) -> TotalCount:
+        return self.count(db, self.model.inspection_date.between(start_date, end_date))
+
+class CRUDProduct(NameSearchMixin, CRUDBase[models.Product, schemas.ProductCreate, schemas.ProductCreate]):
     def get_by_price_range(self, db: Session, min_price: float, max_price: float, skip: int = 0, limit: int = 100) -> List[models.Product]:
         return db.query(self.model).filter(self.model.price.between(min_price, max_price)).offset(skip).limit(limit).all()
 
-class CRUDProductArrival(CRUDBase[models.ProductArrival, schemas.ProductArrivalCreate, schemas.ProductArrivalCreate]):
-    def get_by_product_id(self, db: Session, product_id: int, skip: int = 0, limit: int = 100) -> List[models.ProductArrival]:
-        return db.query(self.model).filter(self.model.product_id == product_id).offset(skip).limit(limit).all()
+    def count_by_price_range(self, db: Session, min_price: float, max_price: float) -> TotalCount:
+        return self.count(db, self.model.price.between(min_price, max_price))
+
+class CRUDInventory(CRUDBase[models.Inventory, schemas.ProductStock, schemas.ProductStock]):
+    def get(self, db: Session, id: int) -> Optional[models.Inventory]:
+        # 재고는 product_id 가 기본키다
+        return db.get(self.model, id)
+
+    def adjust(self, db: Session, product_id: int, delta: int) -> None:
+        # 커밋하지 않는다: 호출한 쪽의 입고/구매 변경과 같은 트랜잭션에서 함께 커밋된다
+        if not delta:
+            return
+        stmt = insert(self.model).values(product_id=product_id, quantity=delta)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[self.model.product_id],
+            set_={"quantity": self.model.quantity + stmt.excluded.quantity},
+        )
+        db.execute(stmt)
+
+    def get_stock(self, db: Session, product_id: int) -> Optional[int]:
+        # 상품이 없으면 None, 입고/구매 내역이 없으면 0
+        row = db.execute(
+            select(func.coalesce(self.model.quantity, 0))
+            .select_from(models.Product)
+            .outerjoin(self.model, self.model.product_id == models.Product.id)
+            .where(models.Product.id == product_id)
+        ).first()
+        return row[0] if row else None
+
+    def get_stocks(self, db: Session, product_ids: List[int]) -> Dict[int, int]:
+        rows = db.execute(
+            select(models.Product.id, func.coalesce(self.model.quantity, 0))
+            .outerjoin(self.model, self.model.product_id == models.Product.id)
+            .where(models.Product.id.in_(product_ids))
+        ).all()
+        return {product_id: quantity for product_id, quantity in rows}
+
+    def reconcile(self, db: Session) -> List[int]:
+        # 입고/구매 합계(보존 기간이 지나 분리한 구매 포함)로 재고를 다시 계산해서 어긋난 상품만 고친다.
+        # 테이블 잠금으로 진행 중인 adjust 와 겹치지 않게 한다 (읽기는 막지 않음).
+        with self.auto_commit(db):
+            db.execute(text("LOCK TABLE inventory IN SHARE ROW EXCLUSIVE MODE"))
+            repaired = db.execute(text("""
+                WITH expected AS (
+                    SELECT p.id AS product_id, COALESCE(a.quantity, 0) - COALESCE(pu.quantity, 0) - COALESCE(ar.quantity, 0) AS quantity
+                    FROM products p
+                    LEFT JOIN (SELECT product_id, SUM(quantity) AS quantity FROM product_arrivals GROUP BY product_id) a
+                        ON a.product_id = p.id
+                    LEFT JOIN (SELECT product_id, SUM(quantity) AS quantity FROM purchases GROUP BY product_id) pu
+                        ON pu.product_id = p.id
+                    LEFT JOIN purchase_archive_totals ar ON ar.product_id = p.id
+                )
+                INSERT INTO inventory (product_id, quantity)
+                SELECT e.product_id, e.quantity
+                FROM expected e
+                LEFT JOIN inventory i ON i.product_id = e.product_id
+                WHERE e.quantity <> COALESCE(i.quantity, 0)
+                ON CONFLICT (product_id) DO UPDATE SET quantity = EXCLUDED.quantity
+                RETURNING product_id
+            """)).scalars().all()
+        return repaired
+
+class CRUDStockMovement(CRUDBase[ModelType, CreateSchemaType, UpdateSchemaType]):
+    # 재고 증감 방향: 입고 +1, 구매 -1
+    stock_sign = 1
+
+    def create(self, db: Session, obj_in: CreateSchemaType, commit: bool = True) -> ModelType:
+        inventory.adjust(db, product_id=obj_in.product_id, delta=self.stock_sign * obj_in.quantity)
+        return super().create(db, obj_in, commit=commit)
+
+    def create_many(self, db: Session, objs_in: Sequence[CreateSchemaType]) -> List[Row]:
+        """여러 행을 한 트랜잭션에서 다중 행 INSERT ... RETURNING 한 번으로 만든다. 입력 순서대로 행(Row)을 돌려준다.
+
+        재고는 상품별로 합쳐서 상품 id 순서로 한 번씩만 조정한다.
+        """
+        if not objs_in:
+            return []
+        rows = [jsonable_encoder(obj_in) for obj_in in objs_in]
+        deltas: Dict[int, int] = {}
+        for row in rows:
+            deltas[row["product_id"]] = deltas.get(row["product_id"], 0) + self.stock_sign * row["quantity"]
+        table = self.model.__table__
+        # 파티션 테이블은 시스템 컬럼(xmin)을 RETURNING 할 수 없다
+        columns = [column for column in table.c if not column.system]
+        with self.auto_commit(db):
+            for product_id in sorted(deltas):
+                inventory.adjust(db, product_id=product_id, delta=deltas[product_id])
+            created = db.execute(insert(table).returning(*columns, sort_by_parameter_order=True), rows).all()
+        return created
+
+    def update(self, db: Session, db_obj: ModelType, obj_in: UpdateSchemaType) -> ModelType:
+        update_data = obj_in.dict(exclude_unset=True)
+        new_product_id = update_data.get("product_id", db_obj.product_id)
+        new_quantity = update_data.get("quantity", db_obj.quantity)
+        deltas = {db_obj.product_id: -self.stock_sign * (db_obj.quantity or 0)}
+        deltas[new_product_id] = deltas.get(new_product_id, 0) + self.stock_sign * new_quantity
+        # 행 잠금 순서를 고정해서 교차 업데이트 간 데드락을 피한다
+        for product_id in sorted(deltas):
+            inventory.adjust(db, product_id=product_id, delta=deltas[product_id])
+        return super().update(db, db_obj, obj_in)
 
-    def get_by_date_range(self, db: Session, start_date: date, end_date: date, skip: int = 0, limit: int = 100) -> List[models.ProductArrival]:
-        return db.query(self.model).filter(self.model.arrival_date.between(start_date, end_date)).offset(skip).limit(limit).all()
+    def delete(self, db: Session, id: int) -> ModelType | None:
+        obj = db.get(self.model, id)
+        if obj:
+            inventory.adjust(db, product_id=obj.product_id, delta=-self.stock_sign * (obj.quantity or 0))
+        return super().delete(db, id)
 
-class CRUDCustomer(CRUDBase[models.Customer, schemas.CustomerCreate, schemas.CustomerCreate]):
+class CRUDProductArrival(CRUDStockMovement[models.ProductArrival, schemas.ProductArrivalCreate, schemas.ProductArrivalCreate]):
+    stock_sign = 1
+
+    def get_by_product_id(self, db: Session, product_id: int, skip: int = 0, limit: int = 100, expand: Sequence[str] = ()) -> List[models.ProductArrival]:
+        return db.query(self.model).options(*self.expand_options(expand)).filter(self.model.product_id == product_id).offset(skip).limit(limit).all()
+
+    def count_by_product_id(self, db: Session, product_id: int) -> TotalCount:
+        return self.count(db, self.model.product_id == product_id)
+
+    def get_by_date_range(self, db: Session, start_date: date, end_date: date, skip: int = 0, limit: int = 100, expand: Sequence[str] = ()) -> List[models.ProductArrival]:
+        return db.query(self.model).options(*self.expand_options(expand)).filter(self.model.arrival_date.between(start_date, end_date)).offset(skip).limit(limit).all()
+
+    def count_by_date_range(self, db: Session, start_date: date, end_date: date) -> TotalCount:
+        return self.count(db, self.model.arrival_date.between(start_date, end_date))
+
+class CRUDCustomer(NameSearchMixin, CRUDBase[models.Customer, schemas.CustomerCreate, schemas.CustomerCreate]):
     def get_by_email(self, db: Session, email: str) -> Optional[models.Customer]:
         return db.query(self.model).filter(self.model.email == email).first()
 
-class CRUDPurchase(CRUDBase[models.Purchase, schemas.PurchaseCreate, schemas.PurchaseCreate]):
-    def get_by_customer_id(self, db: Session, customer_id: int, skip: int = 0, limit: int = 100) -> List[models.Purchase]:
-        return db.query(self.model).filter(self.model.customer_id == customer_id).offset(skip).limit(limit).all()
+    def upsert_by_email(self, db: Session, customers_in: Sequence[schemas.CustomerCreate]) -> List[models.Customer]:
+        # 중복 생성 경쟁 상태에서도 IntegrityError 없이 한 문장으로 처리된다
+        return self.upsert(db, customers_in, index_elements=["email"])
+
+class CRUDPurchase(CRUDStockMovement[models.Purchase, schemas.PurchaseCreate, schemas.PurchaseCreate]):
+    stock_sign = -1
+
+    def get_by_customer_id(self, db: Session, customer_id: int, skip: int = 0, limit: int = 100, expand: Sequence[str] = ()) -> List[models.Purchase]:
+        return db.query(self.model).options(*self.expand_options(expand)).filter(self.model.customer_id == customer_id).offset(skip).limit(limit).all()
+
+    def count_by_customer_id(self, db: Session, customer_id: int) -> TotalCount:
+        return self.count(db, self.model.customer_id == customer_id)
+
+    def get_by_product_id(self, db: Session, product_id: int, skip: int = 0, limit: int = 100, expand: Sequence[str] = ()) -> List[models.Purchase]:
+        return db.query(self.model).options(*self.expand_options(expand)).filter(self.model.product_id == product_id).offset(skip).limit(limit).all()
 
-    def get_by_product_id(self, db: Session, product_id: int, skip: int = 0, limit: int = 100) -> List[models.Purchase]:
-        return db.query(self.model).filter(self.model.product_id == product_id).offset(skip).limit(limit).all()
+    def count_by_product_id(self, db: Session, product_id: int) -> TotalCount:
+        return self.count(db, self.model.product_id == product_id)
 
-    def get_by_date_range(self, db: Session, start_date: date, end_date: date, skip: int = 0, limit: int = 100) -> List[models.Purchase]:
-        return db.query(self.model).filter(self.model.purchase_date.between(start_date, end_date)).offset(skip).limit(limit).all()
+    def get_by_date_range(self, db: Session, start_date: date, end_date: date, skip: int = 0, limit: int = 100, expand: Sequence[str] = ()) -> List[models.Purchase]:
+        return db.query(self.model).options(*self.expand_options(expand)).filter(self.model.purchase_date.between(start_date, end_date)).offset(skip).limit(limit).all()
+
+    def count_by_date_range(self, db: Session, start_date: date, end_date: date) -> TotalCount:
+        return self.count(db, self.model.purchase_date.between(start_date, end_date))
+
+    def ensure_partitions(self, db: Session, months_ahead: int, today: Optional[date] = None) -> List[str]:
+        # 이번 달부터 months_ahead 개월 뒤까지 월 파티션을 미리 만든다
+        start = partitioning.month_start(today or date.today())
+        with self.auto_commit(db):
+            return partitioning.ensure_month_partitions(
+                db, "purchases", "purchase_date", start, partitioning.add_months(start, months_ahead))
+
+    def expire_partitions(self, db: Session, retention_months: int, drop: bool = False, today: Optional[date] = None) -> List[str]:
+        # 보존 기간(retention_months 개월)보다 오래된 월 파티션을 분리(drop=True 면 삭제)한다.
+        # 재고 재계산이 어긋나지 않도록 분리한 구매 수량은 purchase_archive_totals 에 더해 둔다.
+        cutoff = partitioning.add_months(partitioning.month_start(today or date.today()), -retention_months)
+        expired = [p.name for p in partitioning.list_partitions(db, "purchases") if p.end <= cutoff]
+        with self.auto_commit(db):
+            for name in expired:
+                partitioning.detach_partition(db, "purchases", name)
+                db.execute(text(f"""
+                    INSERT INTO purchase_archive_totals (product_id, quantity)
+                    SELECT product_id, SUM(quantity) FROM {name}
+                    WHERE product_id IS NOT NULL AND quantity IS NOT NULL
+                    GROUP BY product_id
+                    ON CONFLICT (product_id) DO UPDATE
+                    SET quantity = purchase_archive_totals.quantity + EXCLUDED.quantity
+                """))
+                if drop:
+                    db.execute(text(f"DROP TABLE {name}"))
+        return expired
 
 store = CRUDStore(models.Store)
 store_inspection = CRUDStoreInspection(models.StoreInspection)
@@ -47,34 +267,53 @@ product = CRUDProduct(models.Product)
 product_arrival = CRUDProductArrival(models.ProductArrival)
 customer = CRUDCustomer(models.Customer)
 purchase = CRUDPurchase(models.Purchase)
+inventory = CRUDInventory(models.Inventory)
 
 # Convenience functions
 def get_store_by_location(db: Session, location: str, skip: int = 0, limit: int = 100) -> List[models.Store]:
     return store.get_by_location(db, location=location, skip=skip, limit=limit)
 
-def get_store_inspections_by_store(db: Session, store_id: int, skip: int = 0, limit: int = 100) -> List[models.StoreInspection]:
-    return store_inspection.get_by_store_id(db, store_id=store_id, skip=skip, limit=limit)
+def search_stores_by_location(db: Session, q: str, mode: schemas.StoreSearchMode = schemas.StoreSearchMode.auto, limit: int = 20) -> List[Tuple[models.Store, bool, float]]:
+    return store.search_by_location(db, q=q, mode=mode, limit=limit)
 
-def get_store_inspections_by_date_range(db: Session, start_date: date, end_date: date, skip: int = 0, limit: int = 100) -> List[models.StoreInspection]:
-    return store_inspection.get_by_date_range(db, start_date=start_date, end_date=end_date, skip=skip, limit=limit)
+def get_store_inspections_by_store(db: Session, store_id: int, skip: int = 0, limit: int = 100, expand: Sequence[str] = ()) -> List[models.StoreInspection]:
+    return store_inspection.get_by_store_id(db, store_id=store_id, skip=skip, limit=limit, expand=expand)
+
+def get_store_inspections_by_date_range(db: Session, start_date: date, end_date: date, skip: int = 0, limit: int = 100, expand: Sequence[str] = ()) -> List[models.StoreInspection]:
+    return store_inspection.get_by_date_range(db, start_date=start_date, end_date=end_date, skip=skip, limit=limit, expand=expand)
 
 def get_products_by_price_range(db: Session, min_price: float, max_price: float, skip: int = 0, limit: int = 100) -> List[models.Product]:
     return product.get_by_price_range(db, min_price=min_price, max_price=max_price, skip=skip, limit=limit)
 
-def get_product_arrivals_by_product(db: Session, product_id: int, skip: int = 0, limit: int = 100) -> List[models.ProductArrival]:
-    return product_arrival.get_by_product_id(db, product_id=product_id, skip=skip, limit=limit)
+def get_product_arrivals_by_product(db: Session, product_id: int, skip: int = 0, limit: int = 100, expand: Sequence[str] = ()) -> List[models.ProductArrival]:
+    return product_arrival.get_by_product_id(db, product_id=product_id, skip=skip, limit=limit, expand=expand)
+
+def get_product_arrivals_by_date_range(db: Session, start_date: date, end_date: date, skip: int = 0, limit: int = 100, expand: Sequence[str] = ()) -> List[models.ProductArrival]:
+    return product_arrival.get_by_date_range(db, start_date=start_date, end_date=end_date, skip=skip, limit=limit, expand=expand)
 
-def get_product_arrivals_by_date_range(db: Session, start_date: date, end_date: date, skip: int = 0, limit: int = 100) -> List[models.ProductArrival]:
-    return product_arrival.get_by_date_range(db, start_date=start_date, end_date=end_date, skip=skip, limit=limit)
+def search_products(db: Session, q: str, limit: int = 20, after: Optional[Tuple[float, int]] = None) -> List[Tuple[models.Product, float]]:
+    return product.search(db, q=q, limit=limit, after=after)
 
 def get_customer_by_email(db: Session, email: str) -> Optional[models.Customer]:
     return customer.get_by_email(db, email=email)
 
-def get_purchases_by_customer(db: Session, customer_id: int, skip: int = 0, limit: int = 100) -> List[models.Purchase]:
-    return purchase.get_by_customer_id(db, customer_id=customer_id, skip=skip, limit=limit)
+def upsert_customer_by_email(db: Session, customer_in: schemas.CustomerCreate) -> models.Customer:
+    return customer.upsert_by_email(db, [customer_in])[0]
+
+def search_customers(db: Session, q: str, limit: int = 20, after: Optional[Tuple[float, int]] = None) -> List[Tuple[models.Customer, float]]:
+    return customer.search(db, q=q, limit=limit, after=after)
+
+def get_purchases_by_customer(db: Session, customer_id: int, skip: int = 0, limit: int = 100, expand: Sequence[str] = ()) -> List[models.Purchase]:
+    return purchase.get_by_customer_id(db, customer_id=customer_id, skip=skip, limit=limit, expand=expand)
+
+def get_purchases_by_product(db: Session, product_id: int, skip: int = 0, limit: int = 100, expand: Sequence[str] = ()) -> List[models.Purchase]:
+    return purchase.get_by_product_id(db, product_id=product_id, skip=skip, limit=limit, expand=expand)
+
+def get_purchases_by_date_range(db: Session, start_date: date, end_date: date, skip: int = 0, limit: int = 100, expand: Sequence[str] = ()) -> List[models.Purchase]:
+    return purchase.get_by_date_range(db, start_date=start_date, end_date=end_date, skip=skip, limit=limit, expand=expand)
 
-def get_purchases_by_product(db: Session, product_id: int, skip: int = 0, limit: int = 100) -> List[models.Purchase]:
-    return purchase.get_by_product_id(db, product_id=product_id, skip=skip, limit=limit)
+def get_product_stock(db: Session, product_id: int) -> Optional[int]:
+    return inventory.get_stock(db, product_id=product_id)
 
-def get_purchases_by_date_range(db: Session, start_date: date, end_date: date, skip: int = 0, limit: int = 100) -> List[models.Purchase]:
-    return purchase.get_by_date_range(db, start_date=start_date, end_date=end_date, skip=skip, limit=limit)
\ No newline at end of file
+def get_product_stocks(db: Session, product_ids: List[int]) -> Dict[int, int]:
+    return inventory.get_stocks(db, product_ids=product_ids)
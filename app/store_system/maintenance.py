@@ -0,0 +1,70 @@
+import argparse
+from loguru import logger
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core import idempotency
+from app.store_system import crud
+
+# 주기적으로 실행하는 유지보수 작업 (cron 등에서 scripts/maintenance.sh 로 호출)
+# 예: ./scripts/maintenance.sh reconcile-inventory
+#     ./scripts/maintenance.sh manage-partitions --retention-months 24 --drop
+#     ./scripts/maintenance.sh purge-idempotency-keys
+
+
+def reconcile_inventory():
+    db = SessionLocal()
+    try:
+        repaired = crud.inventory.reconcile(db)
+    finally:
+        db.close()
+    if repaired:
+        logger.warning(f"Inventory drift repaired for {len(repaired)} products: {repaired[:20]}")
+    else:
+        logger.info("Inventory is consistent")
+    return repaired
+
+
+def manage_partitions(months_ahead: int, retention_months=None, drop: bool = False):
+    db = SessionLocal()
+    try:
+        created = crud.purchase.ensure_partitions(db, months_ahead=months_ahead)
+        expired = crud.purchase.expire_partitions(db, retention_months=retention_months, drop=drop) \
+            if retention_months is not None else []
+    finally:
+        db.close()
+    logger.info(f"Purchase partitions created: {created or 'none'}; {'dropped' if drop else 'detached'}: {expired or 'none'}")
+    return created, expired
+
+
+def purge_idempotency_keys():
+    db = SessionLocal()
+    try:
+        deleted = idempotency.purge_expired(db)
+    finally:
+        db.close()
+    logger.info(f"Purged {deleted} expired idempotency keys")
+    return deleted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="store_system maintenance jobs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("reconcile-inventory", help="Recompute inventory from arrivals and purchases and repair drift")
+    partitions = subparsers.add_parser("manage-partitions", help="Create upcoming purchase partitions and expire old ones")
+    partitions.add_argument("--months-ahead", type=int, default=settings.PURCHASE_PARTITION_MONTHS_AHEAD)
+    partitions.add_argument("--retention-months", type=int, default=settings.PURCHASE_RETENTION_MONTHS,
+                            help="Detach partitions older than this many months (default: keep everything)")
+    partitions.add_argument("--drop", action="store_true", help="Drop expired partitions instead of only detaching them")
+    subparsers.add_parser("purge-idempotency-keys", help="Delete expired Idempotency-Key records")
+    args = parser.parse_args(argv)
+
+    if args.command == "reconcile-inventory":
+        reconcile_inventory()
+    elif args.command == "manage-partitions":
+        manage_partitions(args.months_ahead, args.retention_months, args.drop)
+    elif args.command == "purge-idempotency-keys":
+        purge_idempotency_keys()
+
+
+if __name__ == "__main__":
+    main()
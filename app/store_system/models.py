@@ -1,12 +1,45 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Index, DDL, Computed, FetchedValue, event, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from app.core.database import Base
 
+# create_all 로 스키마를 만들 때(테스트 템플릿 DB 등) 트라이그램 확장을 먼저 설치한다
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+
+def name_search_vector():
+    # 이름 전문 검색용 생성 컬럼 (형태소 분석 없이 'simple' 사전 사용, 조회 시에는 로드하지 않음)
+    return deferred(Column(TSVECTOR, Computed("to_tsvector('simple', coalesce(name, ''))", persisted=True)))
+
+
+def row_version():
+    # PostgreSQL 시스템 컬럼 xmin: 행이 바뀔 때마다(직접 실행한 SQL 포함) 달라지므로 ETag 용 행 버전으로 쓴다.
+    # system=True 라서 CREATE TABLE 에서 빠지고, FetchedValue 라서 INSERT/UPDATE 후에는 DB 값을 다시 읽는다.
+    return Column("xmin", String, system=True, server_default=FetchedValue(), server_onupdate=FetchedValue())
+
+
+def name_search_indexes(table_name: str):
+    return (
+        Index(f"ix_{table_name}_search_vector", "search_vector", postgresql_using="gin"),
+        Index(f"ix_{table_name}_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
+
 class Store(Base):
     __tablename__ = "stores"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     location = Column(String)
+    version = row_version()
+
+    __table_args__ = (
+        # lower(location) = / LIKE 'prefix%' 검색용 (text_pattern_ops 는 로케일과 무관하게 접두어 검색 가능)
+        Index("ix_stores_location_lower", func.lower(location).label("location_lower"),
+              postgresql_ops={"location_lower": "text_pattern_ops"}),
+        # 유사도(오타 허용) 검색용 트라이그램 인덱스
+        Index("ix_stores_location_trgm", location, postgresql_using="gin",
+              postgresql_ops={"location": "gin_trgm_ops"}),
+    )
 
 class StoreInspection(Base):
     __tablename__ = "store_inspections"
@@ -15,6 +48,9 @@ class StoreInspection(Base):
     store_id = Column(Integer, ForeignKey("stores.id"))
     inspection_date = Column(Date)
     result = Column(String)
+    version = row_version()
+
+    store = relationship("Store")
 
 class Product(Base):
     __tablename__ = "products"
@@ -22,6 +58,10 @@ class Product(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     price = Column(Float)
+    search_vector = name_search_vector()
+    version = row_version()
+
+    __table_args__ = name_search_indexes("products")
 
 class ProductArrival(Base):
     __tablename__ = "product_arrivals"
@@ -30,6 +70,9 @@ class ProductArrival(Base):
     product_id = Column(Integer, ForeignKey("products.id"))
     arrival_date = Column(Date)
     quantity = Column(Integer)
+    version = row_version()
+
+    product = relationship("Product")
 
 class Customer(Base):
     __tablename__ = "customers"
@@ -37,12 +80,43 @@ class Customer(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     email = Column(String, unique=True, index=True)
+    search_vector = name_search_vector()
+    version = row_version()
+
+    __table_args__ = name_search_indexes("customers")
 
 class Purchase(Base):
     __tablename__ = "purchases"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # purchase_date 기준 월 단위 RANGE 파티션. 파티션 키가 기본키에 포함되어야 해서 DB 기본키는 (id, purchase_date),
+    # ORM 에서는 id 만으로 식별한다 (id 는 시퀀스로 유일).
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     customer_id = Column(Integer, ForeignKey("customers.id"))
     product_id = Column(Integer, ForeignKey("products.id"))
-    purchase_date = Column(Date)
-    quantity = Column(Integer)
\ No newline at end of file
+    purchase_date = Column(Date, primary_key=True)
+    quantity = Column(Integer)
+    version = row_version()
+
+    customer = relationship("Customer")
+    product = relationship("Product")
+
+    __table_args__ = {"postgresql_partition_by": "RANGE (purchase_date)"}
+    # 파티션 테이블은 INSERT ... RETURNING 으로 시스템 컬럼(xmin)을 돌려줄 수 없어서 version 은 나중에 SELECT 로 읽는다
+    __mapper_args__ = {"primary_key": [id], "eager_defaults": False}
+
+# 월 파티션이 아직 없는 날짜의 구매는 DEFAULT 파티션에 들어간다 (maintenance 의 manage-partitions 가 옮긴다)
+event.listen(Purchase.__table__, "after_create", DDL("CREATE TABLE purchases_default PARTITION OF purchases DEFAULT"))
+
+class PurchaseArchiveTotal(Base):
+    __tablename__ = "purchase_archive_totals"
+
+    # 보존 기간이 지나 분리/삭제한 구매 파티션의 상품별 수량 합계 (재고 재계산에 사용)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0, server_default="0")
+
+class Inventory(Base):
+    __tablename__ = "inventory"
+
+    # 입고/구매 생성·수정·삭제 시 같은 트랜잭션에서 갱신되는 재고 카운터
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0, server_default="0")
\ No newline at end of file
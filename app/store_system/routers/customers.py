@@ -1,25 +1,85 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import EmailStr, conlist
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import List
+from typing import List, Optional
 from app.store_system import crud, schemas
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.batch import IdList, parse_ids, batch_result
+from app.core.idempotency import IdempotencyKey, idempotency_key, run_idempotent
+from app.core.etag import check_row_not_modified, row_response, list_response
+from app.core.pagination import TotalCount, encode_cursor, decode_cursor, set_total_count
+from app.core.routing import InstrumentedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 @router.post("/", response_model=schemas.Customer)
-def create_customer(customer: schemas.CustomerCreate, db: Session = Depends(get_db)):
-    try:
-        return crud.customer.create(db=db, obj_in=customer)
-    except IntegrityError:
-        raise HTTPException(status_code=400, detail="Email already registered")
+def create_customer(customer: schemas.CustomerCreate, idempotency: Optional[IdempotencyKey] = Depends(idempotency_key), db: Session = Depends(get_db)):
+    def create(commit: bool):
+        try:
+            return crud.customer.create(db=db, obj_in=customer, commit=commit)
+        except IntegrityError:
+            raise HTTPException(status_code=400, detail="Email already registered")
+    return run_idempotent(db, idempotency, customer, create, schemas.Customer)
+
+@router.put("/by-email", response_model=List[schemas.Customer])
+def upsert_customers_by_email(
+    customers: conlist(schemas.CustomerCreate, min_items=1, max_items=settings.BATCH_MAX_IDS),
+    db: Session = Depends(get_db)
+):
+    # 이메일 기준 일괄 생성/갱신 (INSERT ... ON CONFLICT (email) DO UPDATE 한 번)
+    return crud.customer.upsert_by_email(db, customers)
+
+@router.put("/by-email/{email}", response_model=schemas.Customer)
+def upsert_customer_by_email(email: EmailStr, customer: schemas.CustomerUpsert, db: Session = Depends(get_db)):
+    return crud.upsert_customer_by_email(db, schemas.CustomerCreate(name=customer.name, email=email))
+
+@router.post("/batch", response_model=List[schemas.Customer])
+def read_customers_batch(body: IdList, response: Response, db: Session = Depends(get_db)):
+    return batch_result(response, body.ids, crud.customer.get_many(db, ids=body.ids))
+
+@router.get("/search", response_model=schemas.CustomerSearchPage)
+def search_customers(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to match by prefix against customer names"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_db)
+):
+    after = None
+    if cursor:
+        try:
+            after_rank, after_id = decode_cursor(cursor)
+            after = (float(after_rank), int(after_id))
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=422, detail="Invalid cursor")
+    rows = crud.search_customers(db, q=q, limit=limit, after=after)
+    items = [schemas.CustomerSearchResult(**schemas.Customer.from_orm(customer).dict(), rank=rank) for customer, rank in rows]
+    # 페이지가 가득 찼을 때만 다음 페이지 커서를 준다
+    next_cursor = encode_cursor(rows[-1][1], rows[-1][0].id) if len(rows) == limit else None
+    return schemas.CustomerSearchPage(items=items, next_cursor=next_cursor)
 
 @router.get("/{customer_id}", response_model=schemas.Customer)
-def read_customer(customer_id: int, db: Session = Depends(get_db)):
+def read_customer(customer_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = check_row_not_modified(request, customer_id, lambda: crud.customer.get_version(db, id=customer_id))
+    if cached:
+        return cached
     db_customer = crud.customer.get(db=db, id=customer_id)
     if db_customer is None:
         raise HTTPException(status_code=404, detail="Customer not found")
-    return db_customer
+    return row_response(response, db_customer)
+
+@router.get("/{customer_id}/purchases", response_model=List[schemas.PurchaseExpanded], response_model_exclude_unset=True)
+def read_customer_purchases(
+    customer_id: int,
+    expand: List[schemas.PurchaseExpand] = Query([], description="Related objects to embed (loaded in one extra query each)"),
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    if crud.customer.get(db=db, id=customer_id) is None:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return crud.get_purchases_by_customer(db, customer_id=customer_id, skip=skip, limit=limit, expand=[e.value for e in expand])
 
 @router.put("/{customer_id}", response_model=schemas.Customer)
 def update_customer(customer_id: int, customer: schemas.CustomerCreate, db: Session = Depends(get_db)):
@@ -37,13 +97,24 @@ def delete_customer(customer_id: int, db: Session = Depends(get_db)):
 
 @router.get("/", response_model=List[schemas.Customer])
 def read_customers(
+    request: Request,
+    response: Response,
+    ids: str = Query(None, description="Comma-separated IDs to fetch in one query (missing IDs are listed in X-Missing-Ids)"),
     email: str = Query(None, description="Filter customers by email"),
     skip: int = 0,
     limit: int = 100,
+    count: bool = Query(False, description="Add X-Total-Count (estimated for unfiltered lists, counted up to LIST_COUNT_CAP otherwise)"),
     db: Session = Depends(get_db)
 ):
-    if email:
+    if ids is not None:
+        id_list = parse_ids(ids)
+        customers = batch_result(response, id_list, crud.customer.get_many(db, ids=id_list))
+        set_total_count(response, count, lambda: TotalCount(len(customers), "exact"))
+    elif email:
         customer = crud.get_customer_by_email(db, email=email)
-        return [customer] if customer else []
+        customers = [customer] if customer else []
+        set_total_count(response, count, lambda: TotalCount(len(customers), "exact"))
     else:
-        return crud.customer.get_multi(db, skip=skip, limit=limit)
\ No newline at end of file
+        customers = crud.customer.get_multi(db, skip=skip, limit=limit)
+        set_total_count(response, count, lambda: crud.customer.count(db))
+    return list_response(request, response, customers)
\ No newline at end of file
@@ -1,22 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import date
 from app.store_system import crud, schemas
 from app.core.database import get_db
+from app.core.batch import IdList, parse_ids, batch_result
+from app.core.idempotency import IdempotencyKey, idempotency_key, run_idempotent
+from app.core.etag import check_row_not_modified, row_response, list_response
+from app.core.pagination import TotalCount, set_total_count
+from app.core.routing import InstrumentedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 @router.post("/", response_model=schemas.ProductArrival)
-def create_product_arrival(arrival: schemas.ProductArrivalCreate, db: Session = Depends(get_db)):
-    return crud.product_arrival.create(db=db, obj_in=arrival)
+def create_product_arrival(arrival: schemas.ProductArrivalCreate, idempotency: Optional[IdempotencyKey] = Depends(idempotency_key), db: Session = Depends(get_db)):
+    return run_idempotent(db, idempotency, arrival, lambda commit: crud.product_arrival.create(db=db, obj_in=arrival, commit=commit), schemas.ProductArrival)
+
+@router.post("/batch", response_model=List[schemas.ProductArrivalExpanded], response_model_exclude_unset=True)
+def read_product_arrivals_batch(
+    body: IdList,
+    response: Response,
+    expand: List[schemas.ProductArrivalExpand] = Query([], description="Related objects to embed (loaded in one extra query each)"),
+    db: Session = Depends(get_db)
+):
+    return batch_result(response, body.ids, crud.product_arrival.get_many(db, ids=body.ids, expand=[e.value for e in expand]))
 
 @router.get("/{arrival_id}", response_model=schemas.ProductArrival)
-def read_product_arrival(arrival_id: int, db: Session = Depends(get_db)):
+def read_product_arrival(arrival_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = check_row_not_modified(request, arrival_id, lambda: crud.product_arrival.get_version(db, id=arrival_id))
+    if cached:
+        return cached
     db_arrival = crud.product_arrival.get(db=db, id=arrival_id)
     if db_arrival is None:
         raise HTTPException(status_code=404, detail="Product arrival not found")
-    return db_arrival
+    return row_response(response, db_arrival)
 
 @router.put("/{arrival_id}", response_model=schemas.ProductArrival)
 def update_product_arrival(arrival_id: int, arrival: schemas.ProductArrivalCreate, db: Session = Depends(get_db)):
@@ -32,18 +49,32 @@ def delete_product_arrival(arrival_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Product arrival not found")
     return crud.product_arrival.delete(db=db, id=arrival_id)
 
-@router.get("/", response_model=List[schemas.ProductArrival])
+@router.get("/", response_model=List[schemas.ProductArrivalExpanded], response_model_exclude_unset=True)
 def read_product_arrivals(
+    request: Request,
+    response: Response,
+    ids: str = Query(None, description="Comma-separated IDs to fetch in one query (missing IDs are listed in X-Missing-Ids)"),
     product_id: int = Query(None, description="Filter arrivals by product ID"),
     start_date: date = Query(None, description="Start date for date range filter"),
     end_date: date = Query(None, description="End date for date range filter"),
+    expand: List[schemas.ProductArrivalExpand] = Query([], description="Related objects to embed (loaded in one extra query each)"),
     skip: int = 0,
     limit: int = 100,
+    count: bool = Query(False, description="Add X-Total-Count (estimated for unfiltered lists, counted up to LIST_COUNT_CAP otherwise)"),
     db: Session = Depends(get_db)
 ):
-    if product_id:
-        return crud.get_product_arrivals_by_product(db, product_id=product_id, skip=skip, limit=limit)
+    expand = [e.value for e in expand]
+    if ids is not None:
+        id_list = parse_ids(ids)
+        arrivals = batch_result(response, id_list, crud.product_arrival.get_many(db, ids=id_list, expand=expand))
+        set_total_count(response, count, lambda: TotalCount(len(arrivals), "exact"))
+    elif product_id:
+        arrivals = crud.get_product_arrivals_by_product(db, product_id=product_id, skip=skip, limit=limit, expand=expand)
+        set_total_count(response, count, lambda: crud.product_arrival.count_by_product_id(db, product_id=product_id))
     elif start_date and end_date:
-        return crud.get_product_arrivals_by_date_range(db, start_date=start_date, end_date=end_date, skip=skip, limit=limit)
+        arrivals = crud.get_product_arrivals_by_date_range(db, start_date=start_date, end_date=end_date, skip=skip, limit=limit, expand=expand)
+        set_total_count(response, count, lambda: crud.product_arrival.count_by_date_range(db, start_date=start_date, end_date=end_date))
     else:
-        return crud.product_arrival.get_multi(db, skip=skip, limit=limit)
\ No newline at end of file
+        arrivals = crud.product_arrival.get_multi(db, skip=skip, limit=limit, expand=expand)
+        set_total_count(response, count, lambda: crud.product_arrival.count(db))
+    return list_response(request, response, arrivals, expand)
\ No newline at end of file
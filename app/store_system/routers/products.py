@@ -1,21 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.store_system import crud, schemas
 from app.core.database import get_db
+from app.core.batch import IdList, parse_ids, batch_result
+from app.core.idempotency import IdempotencyKey, idempotency_key, run_idempotent
+from app.core.etag import check_row_not_modified, row_response, list_response
+from app.core.pagination import TotalCount, encode_cursor, decode_cursor, set_total_count
+from app.core.routing import InstrumentedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 @router.post("/", response_model=schemas.Product)
-def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)):
-    return crud.product.create(db=db, obj_in=product)
+def create_product(product: schemas.ProductCreate, idempotency: Optional[IdempotencyKey] = Depends(idempotency_key), db: Session = Depends(get_db)):
+    return run_idempotent(db, idempotency, product, lambda commit: crud.product.create(db=db, obj_in=product, commit=commit), schemas.Product)
+
+@router.post("/batch", response_model=List[schemas.Product])
+def read_products_batch(body: IdList, response: Response, db: Session = Depends(get_db)):
+    return batch_result(response, body.ids, crud.product.get_many(db, ids=body.ids))
+
+@router.get("/search", response_model=schemas.ProductSearchPage)
+def search_products(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to match by prefix against product names"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_db)
+):
+    after = None
+    if cursor:
+        try:
+            after_rank, after_id = decode_cursor(cursor)
+            after = (float(after_rank), int(after_id))
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=422, detail="Invalid cursor")
+    rows = crud.search_products(db, q=q, limit=limit, after=after)
+    items = [schemas.ProductSearchResult(**schemas.Product.from_orm(product).dict(), rank=rank) for product, rank in rows]
+    # 페이지가 가득 찼을 때만 다음 페이지 커서를 준다
+    next_cursor = encode_cursor(rows[-1][1], rows[-1][0].id) if len(rows) == limit else None
+    return schemas.ProductSearchPage(items=items, next_cursor=next_cursor)
+
+@router.get("/stock", response_model=List[schemas.ProductStock])
+def read_product_stocks(
+    ids: str = Query(..., description="Comma-separated product IDs (max 1000)"),
+    db: Session = Depends(get_db)
+):
+    product_ids = parse_ids(ids)
+    stocks = crud.get_product_stocks(db, product_ids=product_ids)
+    # 요청한 순서대로, 존재하지 않는 상품은 제외
+    return [schemas.ProductStock(product_id=i, quantity=stocks[i]) for i in dict.fromkeys(product_ids) if i in stocks]
+
+@router.get("/{product_id}/stock", response_model=schemas.ProductStock)
+def read_product_stock(product_id: int, db: Session = Depends(get_db)):
+    quantity = crud.get_product_stock(db, product_id=product_id)
+    if quantity is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return schemas.ProductStock(product_id=product_id, quantity=quantity)
 
 @router.get("/{product_id}", response_model=schemas.Product)
-def read_product(product_id: int, db: Session = Depends(get_db)):
+def read_product(product_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = check_row_not_modified(request, product_id, lambda: crud.product.get_version(db, id=product_id))
+    if cached:
+        return cached
     db_product = crud.product.get(db=db, id=product_id)
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
-    return db_product
+    return row_response(response, db_product)
 
 @router.put("/{product_id}", response_model=schemas.Product)
 def update_product(product_id: int, product: schemas.ProductCreate, db: Session = Depends(get_db)):
@@ -33,14 +82,24 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
 
 @router.get("/", response_model=List[schemas.Product])
 def read_products(
+    request: Request,
+    response: Response,
+    ids: str = Query(None, description="Comma-separated IDs to fetch in one query (missing IDs are listed in X-Missing-Ids)"),
     min_price: float = Query(None, description="Minimum price for filtering products"),
     max_price: float = Query(None, description="Maximum price for filtering products"),
     skip: int = 0,
     limit: int = 100,
+    count: bool = Query(False, description="Add X-Total-Count (estimated for unfiltered lists, counted up to LIST_COUNT_CAP otherwise)"),
     db: Session = Depends(get_db)
 ):
-    if min_price is not None and max_price is not None:
+    if ids is not None:
+        id_list = parse_ids(ids)
+        products = batch_result(response, id_list, crud.product.get_many(db, ids=id_list))
+        set_total_count(response, count, lambda: TotalCount(len(products), "exact"))
+    elif min_price is not None and max_price is not None:
         products = crud.get_products_by_price_range(db, min_price=min_price, max_price=max_price, skip=skip, limit=limit)
+        set_total_count(response, count, lambda: crud.product.count_by_price_range(db, min_price=min_price, max_price=max_price))
     else:
         products = crud.product.get_multi(db, skip=skip, limit=limit)
-    return products
\ No newline at end of file
+        set_total_count(response, count, lambda: crud.product.count(db))
+    return list_response(request, response, products)
\ No newline at end of file
@@ -1,22 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import date
 from app.store_system import crud, schemas
-from app.core.database import get_db
+from app.core.database import get_db, get_lazy_db
+from app.core.batch import IdList, parse_ids, batch_result
+from app.core.idempotency import IdempotencyKey, idempotency_key, run_idempotent
+from app.core.etag import check_row_not_modified, row_response, list_response
+from app.core.pagination import TotalCount, set_total_count
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from app.core.coalescer import WriteCoalescer
+from app.core.deadline import request_deadline
+from app.store_system.coalescing import get_purchase_coalescer
+from app.core.routing import InstrumentedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 @router.post("/", response_model=schemas.Purchase)
-def create_purchase(purchase: schemas.PurchaseCreate, db: Session = Depends(get_db)):
-    return crud.purchase.create(db=db, obj_in=purchase)
+def create_purchase(
+    purchase: schemas.PurchaseCreate,
+    request: Request,
+    idempotency: Optional[IdempotencyKey] = Depends(idempotency_key),
+    coalescer: Optional[WriteCoalescer] = Depends(get_purchase_coalescer),
+    db: Session = Depends(get_lazy_db)
+):
+    # Idempotency-Key 요청은 쓰기와 응답 저장을 한 트랜잭션으로 커밋해야 하므로 묶지 않는다
+    if coalescer is not None and idempotency is None:
+        # 세션은 커넥션을 빌리지 않은 채로 두고 요청 기한까지만 배치 결과를 기다린다
+        try:
+            return coalescer.submit(purchase, timeout=request_deadline(request).remaining_seconds())
+        except FutureTimeoutError:
+            raise HTTPException(status_code=504, detail="Request deadline exceeded")
+    return run_idempotent(db, idempotency, purchase, lambda commit: crud.purchase.create(db=db, obj_in=purchase, commit=commit), schemas.Purchase)
+
+@router.post("/batch", response_model=List[schemas.PurchaseExpanded], response_model_exclude_unset=True)
+def read_purchases_batch(
+    body: IdList,
+    response: Response,
+    expand: List[schemas.PurchaseExpand] = Query([], description="Related objects to embed (loaded in one extra query each)"),
+    db: Session = Depends(get_db)
+):
+    return batch_result(response, body.ids, crud.purchase.get_many(db, ids=body.ids, expand=[e.value for e in expand]))
 
 @router.get("/{purchase_id}", response_model=schemas.Purchase)
-def read_purchase(purchase_id: int, db: Session = Depends(get_db)):
+def read_purchase(purchase_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = check_row_not_modified(request, purchase_id, lambda: crud.purchase.get_version(db, id=purchase_id))
+    if cached:
+        return cached
     db_purchase = crud.purchase.get(db=db, id=purchase_id)
     if db_purchase is None:
         raise HTTPException(status_code=404, detail="Purchase not found")
-    return db_purchase
+    return row_response(response, db_purchase)
 
 @router.put("/{purchase_id}", response_model=schemas.Purchase)
 def update_purchase(purchase_id: int, purchase: schemas.PurchaseCreate, db: Session = Depends(get_db)):
@@ -32,21 +66,36 @@ def delete_purchase(purchase_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Purchase not found")
     return crud.purchase.delete(db=db, id=purchase_id)
 
-@router.get("/", response_model=List[schemas.Purchase])
+@router.get("/", response_model=List[schemas.PurchaseExpanded], response_model_exclude_unset=True)
 def read_purchases(
+    request: Request,
+    response: Response,
+    ids: str = Query(None, description="Comma-separated IDs to fetch in one query (missing IDs are listed in X-Missing-Ids)"),
     customer_id: int = Query(None, description="Filter purchases by customer ID"),
     product_id: int = Query(None, description="Filter purchases by product ID"),
     start_date: date = Query(None, description="Start date for date range filter"),
     end_date: date = Query(None, description="End date for date range filter"),
+    expand: List[schemas.PurchaseExpand] = Query([], description="Related objects to embed (loaded in one extra query each)"),
     skip: int = 0,
     limit: int = 100,
+    count: bool = Query(False, description="Add X-Total-Count (estimated for unfiltered lists, counted up to LIST_COUNT_CAP otherwise)"),
     db: Session = Depends(get_db)
 ):
-    if customer_id:
-        return crud.get_purchases_by_customer(db, customer_id=customer_id, skip=skip, limit=limit)
+    expand = [e.value for e in expand]
+    if ids is not None:
+        id_list = parse_ids(ids)
+        purchases = batch_result(response, id_list, crud.purchase.get_many(db, ids=id_list, expand=expand))
+        set_total_count(response, count, lambda: TotalCount(len(purchases), "exact"))
+    elif customer_id:
+        purchases = crud.get_purchases_by_customer(db, customer_id=customer_id, skip=skip, limit=limit, expand=expand)
+        set_total_count(response, count, lambda: crud.purchase.count_by_customer_id(db, customer_id=customer_id))
     elif product_id:
-        return crud.get_purchases_by_product(db, product_id=product_id, skip=skip, limit=limit)
+        purchases = crud.get_purchases_by_product(db, product_id=product_id, skip=skip, limit=limit, expand=expand)
+        set_total_count(response, count, lambda: crud.purchase.count_by_product_id(db, product_id=product_id))
     elif start_date and end_date:
-        return crud.get_purchases_by_date_range(db, start_date=start_date, end_date=end_date, skip=skip, limit=limit)
+        purchases = crud.get_purchases_by_date_range(db, start_date=start_date, end_date=end_date, skip=skip, limit=limit, expand=expand)
+        set_total_count(response, count, lambda: crud.purchase.count_by_date_range(db, start_date=start_date, end_date=end_date))
     else:
-        return crud.purchase.get_multi(db, skip=skip, limit=limit)
\ No newline at end of file
+        purchases = crud.purchase.get_multi(db, skip=skip, limit=limit, expand=expand)
+        set_total_count(response, count, lambda: crud.purchase.count(db))
+    return list_response(request, response, purchases, expand)
\ No newline at end of file
@@ -1,22 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import date
 from app.store_system import crud, schemas
 from app.core.database import get_db
+from app.core.batch import IdList, parse_ids, batch_result
+from app.core.idempotency import IdempotencyKey, idempotency_key, run_idempotent
+from app.core.etag import check_row_not_modified, row_response, list_response
+from app.core.pagination import TotalCount, set_total_count
+from app.core.routing import InstrumentedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 @router.post("/", response_model=schemas.StoreInspection)
-def create_store_inspection(inspection: schemas.StoreInspectionCreate, db: Session = Depends(get_db)):
-    return crud.store_inspection.create(db=db, obj_in=inspection)
+def create_store_inspection(inspection: schemas.StoreInspectionCreate, idempotency: Optional[IdempotencyKey] = Depends(idempotency_key), db: Session = Depends(get_db)):
+    return run_idempotent(db, idempotency, inspection, lambda commit: crud.store_inspection.create(db=db, obj_in=inspection, commit=commit), schemas.StoreInspection)
+
+@router.post("/batch", response_model=List[schemas.StoreInspectionExpanded], response_model_exclude_unset=True)
+def read_store_inspections_batch(
+    body: IdList,
+    response: Response,
+    expand: List[schemas.StoreInspectionExpand] = Query([], description="Related objects to embed (loaded in one extra query each)"),
+    db: Session = Depends(get_db)
+):
+    return batch_result(response, body.ids, crud.store_inspection.get_many(db, ids=body.ids, expand=[e.value for e in expand]))
 
 @router.get("/{inspection_id}", response_model=schemas.StoreInspection)
-def read_store_inspection(inspection_id: int, db: Session = Depends(get_db)):
+def read_store_inspection(inspection_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = check_row_not_modified(request, inspection_id, lambda: crud.store_inspection.get_version(db, id=inspection_id))
+    if cached:
+        return cached
     db_inspection = crud.store_inspection.get(db=db, id=inspection_id)
     if db_inspection is None:
         raise HTTPException(status_code=404, detail="Store inspection not found")
-    return db_inspection
+    return row_response(response, db_inspection)
 
 @router.put("/{inspection_id}", response_model=schemas.StoreInspection)
 def update_store_inspection(inspection_id: int, inspection: schemas.StoreInspectionCreate, db: Session = Depends(get_db)):
@@ -32,18 +49,32 @@ def delete_store_inspection(inspection_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Store inspection not found")
     return crud.store_inspection.delete(db=db, id=inspection_id)
 
-@router.get("/", response_model=List[schemas.StoreInspection])
+@router.get("/", response_model=List[schemas.StoreInspectionExpanded], response_model_exclude_unset=True)
 def read_store_inspections(
+    request: Request,
+    response: Response,
+    ids: str = Query(None, description="Comma-separated IDs to fetch in one query (missing IDs are listed in X-Missing-Ids)"),
     store_id: int = Query(None, description="Filter inspections by store ID"),
     start_date: date = Query(None, description="Start date for date range filter"),
     end_date: date = Query(None, description="End date for date range filter"),
+    expand: List[schemas.StoreInspectionExpand] = Query([], description="Related objects to embed (loaded in one extra query each)"),
     skip: int = 0,
     limit: int = 100,
+    count: bool = Query(False, description="Add X-Total-Count (estimated for unfiltered lists, counted up to LIST_COUNT_CAP otherwise)"),
     db: Session = Depends(get_db)
 ):
-    if store_id:
-        return crud.get_store_inspections_by_store(db, store_id=store_id, skip=skip, limit=limit)
+    expand = [e.value for e in expand]
+    if ids is not None:
+        id_list = parse_ids(ids)
+        inspections = batch_result(response, id_list, crud.store_inspection.get_many(db, ids=id_list, expand=expand))
+        set_total_count(response, count, lambda: TotalCount(len(inspections), "exact"))
+    elif store_id:
+        inspections = crud.get_store_inspections_by_store(db, store_id=store_id, skip=skip, limit=limit, expand=expand)
+        set_total_count(response, count, lambda: crud.store_inspection.count_by_store_id(db, store_id=store_id))
     elif start_date and end_date:
-        return crud.get_store_inspections_by_date_range(db, start_date=start_date, end_date=end_date, skip=skip, limit=limit)
+        inspections = crud.get_store_inspections_by_date_range(db, start_date=start_date, end_date=end_date, skip=skip, limit=limit, expand=expand)
+        set_total_count(response, count, lambda: crud.store_inspection.count_by_date_range(db, start_date=start_date, end_date=end_date))
     else:
-        return crud.store_inspection.get_multi(db, skip=skip, limit=limit)
\ No newline at end of file
+        inspections = crud.store_inspection.get_multi(db, skip=skip, limit=limit, expand=expand)
+        set_total_count(response, count, lambda: crud.store_inspection.count(db))
+    return list_response(request, response, inspections, expand)
\ No newline at end of file
@@ -1,21 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.store_system import crud, schemas
 from app.core.database import get_db
+from app.core.batch import IdList, parse_ids, batch_result
+from app.core.idempotency import IdempotencyKey, idempotency_key, run_idempotent
+from app.core.etag import check_row_not_modified, row_response, list_response
+from app.core.pagination import TotalCount, set_total_count
+from app.core.routing import InstrumentedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 @router.post("/", response_model=schemas.Store)
-def create_store(store: schemas.StoreCreate, db: Session = Depends(get_db)):
-    return crud.store.create(db=db, obj_in=store)
+def create_store(store: schemas.StoreCreate, idempotency: Optional[IdempotencyKey] = Depends(idempotency_key), db: Session = Depends(get_db)):
+    return run_idempotent(db, idempotency, store, lambda commit: crud.store.create(db=db, obj_in=store, commit=commit), schemas.Store)
+
+@router.post("/batch", response_model=List[schemas.Store])
+def read_stores_batch(body: IdList, response: Response, db: Session = Depends(get_db)):
+    return batch_result(response, body.ids, crud.store.get_many(db, ids=body.ids))
+
+@router.get("/search", response_model=List[schemas.StoreSearchResult])
+def search_stores(
+    q: str = Query(..., min_length=1, max_length=200, description="Location search text"),
+    mode: schemas.StoreSearchMode = Query(schemas.StoreSearchMode.auto, description="prefix, similar (typo tolerant) or auto (both)"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    rows = crud.search_stores_by_location(db, q=q, mode=mode, limit=limit)
+    return [
+        schemas.StoreSearchResult(id=store.id, name=store.name, location=store.location, prefix_match=is_prefix, score=score)
+        for store, is_prefix, score in rows
+    ]
 
 @router.get("/{store_id}", response_model=schemas.Store)
-def read_store(store_id: int, db: Session = Depends(get_db)):
+def read_store(store_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = check_row_not_modified(request, store_id, lambda: crud.store.get_version(db, id=store_id))
+    if cached:
+        return cached
     db_store = crud.store.get(db=db, id=store_id)
     if db_store is None:
         raise HTTPException(status_code=404, detail="Store not found")
-    return db_store
+    return row_response(response, db_store)
+
+@router.get("/{store_id}/inspections", response_model=List[schemas.StoreInspection])
+def read_store_inspections(store_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    if crud.store.get(db=db, id=store_id) is None:
+        raise HTTPException(status_code=404, detail="Store not found")
+    return crud.get_store_inspections_by_store(db, store_id=store_id, skip=skip, limit=limit)
 
 @router.put("/{store_id}", response_model=schemas.Store)
 def update_store(store_id: int, store: schemas.StoreCreate, db: Session = Depends(get_db)):
@@ -33,13 +64,23 @@ def delete_store(store_id: int, db: Session = Depends(get_db)):
 
 @router.get("/", response_model=List[schemas.Store])
 def read_stores(
+    request: Request,
+    response: Response,
+    ids: str = Query(None, description="Comma-separated IDs to fetch in one query (missing IDs are listed in X-Missing-Ids)"),
     location: str = Query(None, description="Filter stores by location"),
     skip: int = 0,
     limit: int = 100,
+    count: bool = Query(False, description="Add X-Total-Count (estimated for unfiltered lists, counted up to LIST_COUNT_CAP otherwise)"),
     db: Session = Depends(get_db)
 ):
-    if location:
+    if ids is not None:
+        id_list = parse_ids(ids)
+        stores = batch_result(response, id_list, crud.store.get_many(db, ids=id_list))
+        set_total_count(response, count, lambda: TotalCount(len(stores), "exact"))
+    elif location:
         stores = crud.get_store_by_location(db, location=location, skip=skip, limit=limit)
+        set_total_count(response, count, lambda: crud.store.count_by_location(db, location=location))
     else:
         stores = crud.store.get_multi(db, skip=skip, limit=limit)
-    return stores
\ No newline at end of file
+        set_total_count(response, count, lambda: crud.store.count(db))
+    return list_response(request, response, stores)
\ No newline at end of file
@@ -1,6 +1,8 @@
 from pydantic import BaseModel, EmailStr
 from datetime import date
+from enum import Enum
 from typing import List, Optional
+from app.core.schemas import LoadedGetterDict
 
 class StoreBase(BaseModel):
     name: str
@@ -15,6 +17,16 @@ class Store(StoreBase):
     class Config:
         orm_mode = True
 
+class StoreSearchMode(str, Enum):
+    auto = "auto"
+    prefix = "prefix"
+    similar = "similar"
+
+class StoreSearchResult(Store):
+    # 접두어 일치 여부와 검색어와의 단어 유사도(0~1)
+    prefix_match: bool
+    score: float
+
 class StoreInspectionBase(BaseModel):
     store_id: int
     inspection_date: date
@@ -42,6 +54,13 @@ class Product(ProductBase):
     class Config:
         orm_mode = True
 
+class ProductSearchResult(Product):
+    rank: float
+
+class ProductSearchPage(BaseModel):
+    items: List[ProductSearchResult]
+    next_cursor: Optional[str] = None
+
 class ProductArrivalBase(BaseModel):
     product_id: int
     arrival_date: date
@@ -63,12 +82,23 @@ class CustomerBase(BaseModel):
 class CustomerCreate(CustomerBase):
     pass
 
+class CustomerUpsert(BaseModel):
+    # PUT /customers/by-email/{email} 본문 (이메일은 경로에서)
+    name: str
+
 class Customer(CustomerBase):
     id: int
 
     class Config:
         orm_mode = True
 
+class CustomerSearchResult(Customer):
+    rank: float
+
+class CustomerSearchPage(BaseModel):
+    items: List[CustomerSearchResult]
+    next_cursor: Optional[str] = None
+
 class PurchaseBase(BaseModel):
     customer_id: int
     product_id: int
@@ -82,4 +112,41 @@ class Purchase(PurchaseBase):
     id: int
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class ProductStock(BaseModel):
+    product_id: int
+    quantity: int
+
+    class Config:
+        orm_mode = True
+
+# expand 쿼리 파라미터로 함께 읽어올 수 있는 관계
+class StoreInspectionExpand(str, Enum):
+    store = "store"
+
+class ProductArrivalExpand(str, Enum):
+    product = "product"
+
+class PurchaseExpand(str, Enum):
+    customer = "customer"
+    product = "product"
+
+class StoreInspectionExpanded(StoreInspection):
+    store: Optional[Store] = None
+
+    class Config:
+        getter_dict = LoadedGetterDict
+
+class ProductArrivalExpanded(ProductArrival):
+    product: Optional[Product] = None
+
+    class Config:
+        getter_dict = LoadedGetterDict
+
+class PurchaseExpanded(Purchase):
+    customer: Optional[Customer] = None
+    product: Optional[Product] = None
+
+    class Config:
+        getter_dict = LoadedGetterDict
\ No newline at end of file
@@ -3,40 +3,13 @@ from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 from app.main import app
 from app.store_system import crud, schemas
-from app.core.database import get_db, Base, engine
-from app.store_system.tests.factories import CustomerFactory
+from app.store_system.tests.factories import CustomerFactory, ProductFactory, PurchaseFactory
 
 client = TestClient(app)
 
-@pytest.fixture(autouse=True, scope="function")
-def reset_db(test_db):
-    for table in reversed(Base.metadata.sorted_tables):
-        test_db.execute(table.delete())
-    test_db.commit()
-    yield
-    test_db.rollback()
-
-@pytest.fixture(scope="module")
-def test_db():
-    Base.metadata.create_all(bind=engine)
-    db = next(get_db())
-    yield db
-    db.close()
-    Base.metadata.drop_all(bind=engine)
-
-@pytest.fixture(scope="function")
-def test_client(test_db):
-    def override_get_db():
-        try:
-            yield test_db
-        finally:
-            test_db.rollback()
-    app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as client:
-        yield client
-    app.dependency_overrides.clear()
-
-@pytest.mark.order(1)
+# 요청 하나가 실행하는 SQL 수 상한 (N+1 회귀 방지)
+pytestmark = pytest.mark.max_queries(5)
+
 def test_create_customer(test_client):
     customer_data = CustomerFactory.build()
     response = test_client.post("/store-system/customers/", json=CustomerFactory.to_dict(customer_data))
@@ -46,7 +19,6 @@ def test_create_customer(test_client):
     assert data["email"] == customer_data.email
     assert "id" in data
 
-@pytest.mark.order(2)
 def test_read_customer(test_client):
     customer_data = CustomerFactory.build()
     create_response = test_client.post("/store-system/customers/", json=CustomerFactory.to_dict(customer_data))
@@ -58,7 +30,6 @@ def test_read_customer(test_client):
     assert data["name"] == customer_data.name
     assert data["email"] == customer_data.email
 
-@pytest.mark.order(5)
 def test_update_customer(test_client):
     customer_data = CustomerFactory.build()
     create_response = test_client.post("/store-system/customers/", json=CustomerFactory.to_dict(customer_data))
@@ -71,7 +42,6 @@ def test_update_customer(test_client):
     assert data["name"] == update_data.name
     assert data["email"] == update_data.email
 
-@pytest.mark.order(6)
 def test_delete_customer(test_client):
     customer_data = CustomerFactory.build()
     create_response = test_client.post("/store-system/customers/", json=CustomerFactory.to_dict(customer_data))
@@ -83,7 +53,6 @@ def test_delete_customer(test_client):
     get_response = test_client.get(f"/store-system/customers/{created_customer['id']}")
     assert get_response.status_code == 404
 
-@pytest.mark.order(3)
 def test_read_customers(test_client):
     customer_data1 = CustomerFactory.build()
     customer_data2 = CustomerFactory.build()
@@ -97,7 +66,6 @@ def test_read_customers(test_client):
     assert any(customer["name"] == customer_data1.name for customer in data)
     assert any(customer["name"] == customer_data2.name for customer in data)
 
-@pytest.mark.order(4)
 def test_read_customer_by_email(test_client):
     customer_data = CustomerFactory.build()
     test_client.post("/store-system/customers/", json=CustomerFactory.to_dict(customer_data))
@@ -109,29 +77,24 @@ def test_read_customer_by_email(test_client):
     assert data[0]["name"] == customer_data.name
     assert data[0]["email"] == customer_data.email
 
-@pytest.mark.order(7)
 def test_read_customer_not_found(test_client):
     response = test_client.get("/store-system/customers/99999")
     assert response.status_code == 404
 
-@pytest.mark.order(8)
 def test_update_customer_not_found(test_client):
     update_data = CustomerFactory.build()
     response = test_client.put("/store-system/customers/99999", json=CustomerFactory.to_dict(update_data))
     assert response.status_code == 404
 
-@pytest.mark.order(9)
 def test_delete_customer_not_found(test_client):
     response = test_client.delete("/store-system/customers/99999")
     assert response.status_code == 404
 
-@pytest.mark.order(10)
 def test_create_customer_invalid_data(test_client):
     invalid_customer_data = {"name": "Invalid", "email": "not-an-email"}
     response = test_client.post("/store-system/customers/", json=invalid_customer_data)
     assert response.status_code == 422
 
-@pytest.mark.order(11)
 def test_create_customer_duplicate_email(test_client):
     customer_data = CustomerFactory.build()
     test_client.post("/store-system/customers/", json=CustomerFactory.to_dict(customer_data))
@@ -140,7 +103,6 @@ def test_create_customer_duplicate_email(test_client):
     response = test_client.post("/store-system/customers/", json=CustomerFactory.to_dict(duplicate_data))
     assert response.status_code == 400
 
-@pytest.mark.order(12)
 def test_read_customers_with_pagination(test_client):
     for _ in range(15):
         customer_data = CustomerFactory.build()
@@ -151,4 +113,91 @@ def test_read_customers_with_pagination(test_client):
     response = test_client.get(f"/store-system/customers/?skip={skip}&limit={limit}")
     assert response.status_code == 200
     data = response.json()
-    assert len(data) == limit
\ No newline at end of file
+    assert len(data) == limit
+
+def _create_purchases(test_client, customer_id, count):
+    for _ in range(count):
+        product = test_client.post("/store-system/products/", json=ProductFactory.to_dict(ProductFactory.build())).json()
+        test_client.post("/store-system/purchases/", json=PurchaseFactory.to_dict(
+            PurchaseFactory.build(customer_id=customer_id, product_id=product["id"])))
+
+def test_read_customer_purchases_expand_product(test_client, db_session, count_queries):
+    customer = test_client.post("/store-system/customers/", json=CustomerFactory.to_dict(CustomerFactory.build())).json()
+    _create_purchases(test_client, customer["id"], 5)
+    db_session.expire_all()
+
+    with count_queries() as counter:
+        response = test_client.get(f"/store-system/customers/{customer['id']}/purchases?expand=product")
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 5
+    assert all(purchase["product"]["id"] == purchase["product_id"] for purchase in data)
+    # 고객 확인 + 구매 목록 + 상품 selectinload
+    assert counter.count <= 3
+
+def test_read_customer_purchases_query_count_is_bounded(test_client, db_session, count_queries):
+    counts = []
+    for purchases in (1, 10):
+        customer = test_client.post("/store-system/customers/", json=CustomerFactory.to_dict(CustomerFactory.build())).json()
+        _create_purchases(test_client, customer["id"], purchases)
+        db_session.expire_all()
+        with count_queries() as counter:
+            test_client.get(f"/store-system/customers/{customer['id']}/purchases?expand=product")
+        counts.append(counter.count)
+    assert counts[0] == counts[1]
+
+def test_read_customer_purchases_without_expand(test_client):
+    customer = test_client.post("/store-system/customers/", json=CustomerFactory.to_dict(CustomerFactory.build())).json()
+    _create_purchases(test_client, customer["id"], 2)
+
+    response = test_client.get(f"/store-system/customers/{customer['id']}/purchases")
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert all("product" not in purchase for purchase in response.json())
+
+def test_read_customer_purchases_not_found(test_client):
+    response = test_client.get("/store-system/customers/99999/purchases")
+    assert response.status_code == 404
+
+def test_search_customers(test_client):
+    for name, email in [("Kim Minsu", "minsu@example.com"), ("Kim Mina", "mina@example.com"), ("Lee Minsu", "lee@example.com")]:
+        test_client.post("/store-system/customers/", json={"name": name, "email": email})
+
+    response = test_client.get("/store-system/customers/search", params={"q": "kim min"})
+    assert response.status_code == 200
+    names = {item["name"] for item in response.json()["items"]}
+    assert names == {"Kim Minsu", "Kim Mina"}
+
+def test_search_customers_no_words(test_client):
+    response = test_client.get("/store-system/customers/search", params={"q": "!!"})
+    assert response.status_code == 200
+    assert response.json() == {"items": [], "next_cursor": None}
+
+def test_upsert_customer_by_email(test_client):
+    response = test_client.put("/store-system/customers/by-email/upsert@example.com", json={"name": "First"})
+    assert response.status_code == 200
+    created = response.json()
+    assert created["email"] == "upsert@example.com"
+
+    response = test_client.put("/store-system/customers/by-email/upsert@example.com", json={"name": "Second"})
+    assert response.status_code == 200
+    assert response.json() == {**created, "name": "Second"}
+    assert test_client.get(f"/store-system/customers/{created['id']}").json()["name"] == "Second"
+
+def test_upsert_customers_by_email_bulk(test_client):
+    existing = test_client.post("/store-system/customers/", json={"name": "Old", "email": "old@example.com"}).json()
+
+    response = test_client.put("/store-system/customers/by-email", json=[
+        {"name": "New", "email": "new@example.com"},
+        {"name": "Renamed", "email": "old@example.com"},
+        {"name": "New again", "email": "new@example.com"},
+    ])
+    assert response.status_code == 200
+    data = response.json()
+    # 입력 순서대로, 같은 이메일은 마지막 값
+    assert [(c["email"], c["name"]) for c in data] == [("new@example.com", "New again"), ("old@example.com", "Renamed")]
+    assert data[1]["id"] == existing["id"]
+
+def test_upsert_customer_by_email_invalid(test_client):
+    assert test_client.put("/store-system/customers/by-email/not-an-email", json={"name": "X"}).status_code == 422
+    assert test_client.put("/store-system/customers/by-email", json=[]).status_code == 422
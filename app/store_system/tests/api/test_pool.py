@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError
+import app.main as main
+from app.core.pool import AdaptiveQueuePool, PoolController, PoolSample
+from app.core.testing import database_url
+
+
+@pytest.fixture
+def adaptive_engine(test_database):
+    engine = create_engine(database_url(test_database), poolclass=AdaptiveQueuePool, pool_size=3, max_overflow=0, pool_timeout=0.1)
+    yield engine
+    engine.dispose()
+
+
+def test_adaptive_pool_limits_checkouts(adaptive_engine):
+    pool = adaptive_engine.pool
+    pool.set_limit(1)
+    first = adaptive_engine.connect()
+    with pytest.raises(TimeoutError):
+        adaptive_engine.connect()
+    pool.set_limit(2)
+    second = adaptive_engine.connect()
+
+    sample = pool.sample()
+    assert (sample.limit, sample.checkouts, sample.timeouts, sample.peak_in_use) == (2, 2, 1, 2)
+    # 상한보다 많은 유휴 커넥션은 반납할 때 닫는다
+    pool.set_limit(1)
+    first.close()
+    second.close()
+    assert (pool.checkedout(), pool.checkedin()) == (0, 1)
+    # 물리 풀 크기를 넘을 수는 없다
+    pool.set_limit(10)
+    assert pool.limit == 3
+
+
+def test_pool_controller_grows_on_wait_and_shrinks_when_idle(adaptive_engine):
+    controller = PoolController(adaptive_engine, min_size=2, max_size=12, interval=60, wait_target_ms=5)
+    assert controller.decide(PoolSample(8, 100, 20.0, 50.0, 0, 8)) == (10, "wait")
+    assert controller.decide(PoolSample(8, 100, 0.1, 1.0, 0, 8)) == (10, "utilization")
+    assert controller.decide(PoolSample(11, 100, 0.1, 30.0, 2, 11)) == (12, "timeouts")
+    assert controller.decide(PoolSample(8, 100, 0.1, 1.0, 0, 6)) == (8, "steady")
+    assert controller.decide(PoolSample(8, 100, 0.1, 1.0, 0, 1)) == (7, "idle")
+    assert controller.decide(PoolSample(2, 0, 0.0, 0.0, 0, 0)) == (2, "idle")
+
+    resized = []
+    controller.on_resize.append(resized.append)
+    adaptive_engine.pool.set_limit(3)
+    with adaptive_engine.connect(), adaptive_engine.connect(), adaptive_engine.connect():
+        pass
+    # 최대 동시 사용량이 상한에 닿았지만 물리 풀 크기(3)보다 늘릴 수는 없다
+    assert controller.tick() is None
+    assert controller.tick().reason == "idle"
+    assert resized[-1] == adaptive_engine.pool.limit == 2
+
+
+# /debug/pool 라우트는 DEBUG 일 때만 있으므로 내용을 만드는 함수를 직접 부른다
+def test_pool_status(test_client):
+    data = main.pool_status()
+    assert data["sync"]["class"] in ("QueuePool", "AdaptiveQueuePool")
+    assert data["async"]["class"] == "AsyncAdaptedQueuePool"
+    assert set(data["admission"]) == {"read", "write"}
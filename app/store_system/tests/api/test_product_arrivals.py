@@ -5,40 +5,12 @@ from sqlalchemy.orm import Session
 from datetime import date, timedelta
 from app.main import app
 from app.store_system import crud, schemas
-from app.core.database import get_db, Base, engine
 from app.store_system.tests.factories import ProductFactory, ProductArrivalFactory
 
 client = TestClient(app)
 
-@pytest.fixture(autouse=True, scope="function")
-def reset_db(test_db):
-    for table in reversed(Base.metadata.sorted_tables):
-        test_db.execute(table.delete())
-    test_db.commit()
-    yield
-    test_db.rollback()
-
-@pytest.fixture(scope="module")
-def test_db():
-    Base.metadata.create_all(bind=engine)
-    db = next(get_db())
-    yield db
-    db.close()
-    Base.metadata.drop_all(bind=engine)
-
-
-@pytest.fixture(scope="function")
-def test_client(test_db):
-    def override_get_db():
-        try:
-            yield test_db
-        finally:
-            test_db.rollback()
-    app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as client:
-        yield client
-    app.dependency_overrides.clear()
-
+# 요청 하나가 실행하는 SQL 수 상한 (N+1 회귀 방지)
+pytestmark = pytest.mark.max_queries(6)
 
 @pytest.fixture(scope="function")
 def test_product(test_client):
@@ -46,7 +18,6 @@ def test_product(test_client):
     response = test_client.post("/store-system/products/", json=ProductFactory.to_dict(product))
     return response.json()
 
-@pytest.mark.order(1)
 def test_create_product_arrival(test_client, test_product):
     arrival = ProductArrivalFactory.build(product_id=test_product["id"])
     arrival_data = ProductArrivalFactory.to_dict(arrival)
@@ -58,7 +29,6 @@ def test_create_product_arrival(test_client, test_product):
     assert data["quantity"] == arrival_data["quantity"]
     assert "id" in data
 
-@pytest.mark.order(2)
 def test_read_product_arrival(test_client, test_product):
     arrival = ProductArrivalFactory.build(product_id=test_product["id"])
     arrival_data = ProductArrivalFactory.to_dict(arrival)
@@ -72,7 +42,6 @@ def test_read_product_arrival(test_client, test_product):
     assert data["arrival_date"] == arrival_data["arrival_date"]
     assert data["quantity"] == arrival_data["quantity"]
 
-@pytest.mark.order(6)
 def test_update_product_arrival(test_client, test_product):
     arrival = ProductArrivalFactory.build(product_id=test_product["id"])
     arrival_data = ProductArrivalFactory.to_dict(arrival)
@@ -87,7 +56,6 @@ def test_update_product_arrival(test_client, test_product):
     assert data["arrival_date"] == update_data["arrival_date"]
     assert data["quantity"] == update_data["quantity"]
 
-@pytest.mark.order(7)
 def test_delete_product_arrival(test_client, test_product):
     arrival = ProductArrivalFactory.build(product_id=test_product["id"])
     arrival_data = ProductArrivalFactory.to_dict(arrival)
@@ -100,7 +68,6 @@ def test_delete_product_arrival(test_client, test_product):
     get_response = test_client.get(f"/store-system/product-arrivals/{created_arrival['id']}")
     assert get_response.status_code == 404
 
-@pytest.mark.order(3)
 def test_read_product_arrivals(test_client, test_product):
     arrival1 = ProductArrivalFactory.build(product_id=test_product["id"])
     arrival2 = ProductArrivalFactory.build(product_id=test_product["id"])
@@ -114,7 +81,6 @@ def test_read_product_arrivals(test_client, test_product):
     assert any(arrival["quantity"] == arrival1.quantity for arrival in data)
     assert any(arrival["quantity"] == arrival2.quantity for arrival in data)
 
-@pytest.mark.order(4)
 def test_read_product_arrivals_by_product(test_client, test_product):
     arrival = ProductArrivalFactory.build(product_id=test_product["id"])
     test_client.post("/store-system/product-arrivals/", json=ProductArrivalFactory.to_dict(arrival))
@@ -125,7 +91,6 @@ def test_read_product_arrivals_by_product(test_client, test_product):
     assert len(data) > 0
     assert all(arrival["product_id"] == test_product["id"] for arrival in data)
 
-@pytest.mark.order(5)
 def test_read_product_arrivals_by_date_range(test_client, test_product):
     arrival1 = ProductArrivalFactory.build(product_id=test_product["id"], arrival_date=date.today() - timedelta(days=5))
     arrival2 = ProductArrivalFactory.build(product_id=test_product["id"], arrival_date=date.today())
@@ -140,7 +105,6 @@ def test_read_product_arrivals_by_date_range(test_client, test_product):
     assert len(data) > 0
     assert all(start_date <= arrival["arrival_date"] <= end_date for arrival in data)
 
-@pytest.mark.order(11)
 def test_create_product_arrival_invalid_data(test_client, test_product):
     invalid_arrival_data = {
         "product_id": test_product["id"],
@@ -150,7 +114,6 @@ def test_create_product_arrival_invalid_data(test_client, test_product):
     response = test_client.post("/store-system/product-arrivals/", json=invalid_arrival_data)
     assert response.status_code == 422  # Unprocessable Entity
 
-@pytest.mark.order(12)
 def test_update_product_arrival_invalid_data(test_client, test_product):
     arrival = ProductArrivalFactory.build(product_id=test_product["id"])
     arrival_data = ProductArrivalFactory.to_dict(arrival)
@@ -1,44 +1,19 @@
+import asyncio
+from prometheus_client import REGISTRY
 import pytest
 import pytest_asyncio
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 from app.main import app
+from app.core.config import settings
 from app.store_system import crud, schemas
-from app.core.database import get_db, Base, engine
-from app.store_system.tests.factories import ProductFactory
+from app.store_system.tests.factories import ProductFactory, ProductArrivalFactory, CustomerFactory, PurchaseFactory
 
 client = TestClient(app)
 
-@pytest.fixture(autouse=True, scope="function")
-def reset_db(test_db):
-    for table in reversed(Base.metadata.sorted_tables):
-        test_db.execute(table.delete())
-    test_db.commit()
-    yield
-    test_db.rollback()
-
-@pytest.fixture(scope="module")
-def test_db():
-    Base.metadata.create_all(bind=engine)
-    db = next(get_db())
-    yield db
-    db.close()
-    Base.metadata.drop_all(bind=engine)
-
-
-@pytest.fixture(scope="function")
-def test_client(test_db):
-    def override_get_db():
-        try:
-            yield test_db
-        finally:
-            test_db.rollback()
-    app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as client:
-        yield client
-    app.dependency_overrides.clear()
-
-@pytest.mark.order(1)
+# 요청 하나가 실행하는 SQL 수 상한 (N+1 회귀 방지)
+pytestmark = pytest.mark.max_queries(7)
+
 def test_create_product(test_client):
     product = ProductFactory.build()
     product_data = ProductFactory.to_dict(product)
@@ -49,7 +24,6 @@ def test_create_product(test_client):
     assert data["price"] == product_data["price"]
     assert "id" in data
 
-@pytest.mark.order(2)
 def test_read_product(test_client):
     product = ProductFactory.build()
     product_data = ProductFactory.to_dict(product)
@@ -62,7 +36,6 @@ def test_read_product(test_client):
     assert data["name"] == product_data["name"]
     assert data["price"] == product_data["price"]
 
-@pytest.mark.order(5)
 def test_update_product(test_client):
     product = ProductFactory.build()
     product_data = ProductFactory.to_dict(product)
@@ -77,7 +50,6 @@ def test_update_product(test_client):
     assert data["name"] == update_data["name"]
     assert data["price"] == update_data["price"]
 
-@pytest.mark.order(6)
 def test_delete_product(test_client):
     product = ProductFactory.build()
     product_data = ProductFactory.to_dict(product)
@@ -90,7 +62,6 @@ def test_delete_product(test_client):
     get_response = test_client.get(f"/store-system/products/{created_product['id']}")
     assert get_response.status_code == 404
 
-@pytest.mark.order(3)
 def test_read_products(test_client):
     product1 = ProductFactory.build()
     product2 = ProductFactory.build()
@@ -104,7 +75,6 @@ def test_read_products(test_client):
     assert any(product["name"] == product1.name for product in data)
     assert any(product["name"] == product2.name for product in data)
 
-@pytest.mark.order(4)
 def test_read_products_by_price_range(test_client):
     cheap_product = ProductFactory.build(price=5.99)
     expensive_product = ProductFactory.build(price=99.99)
@@ -119,29 +89,38 @@ def test_read_products_by_price_range(test_client):
     assert len(data) > 0
     assert all(min_price <= product["price"] <= max_price for product in data)
 
-@pytest.mark.order(7)
+def test_read_products_total_count(test_client, monkeypatch):
+    for _ in range(3):
+        test_client.post("/store-system/products/", json=ProductFactory.to_dict(ProductFactory.build(price=4242.0)))
+
+    response = test_client.get("/store-system/products/?min_price=4242&max_price=4242&limit=1")
+    assert "X-Total-Count" not in response.headers
+    response = test_client.get("/store-system/products/?min_price=4242&max_price=4242&limit=1&count=true")
+    assert len(response.json()) == 1
+    assert (response.headers["X-Total-Count"], response.headers["X-Total-Count-Accuracy"]) == ("3", "exact")
+    # 조건이 있는 목록은 LIST_COUNT_CAP 개까지만 센다
+    monkeypatch.setattr(settings, "LIST_COUNT_CAP", 2)
+    response = test_client.get("/store-system/products/?min_price=4242&max_price=4242&count=true")
+    assert (response.headers["X-Total-Count"], response.headers["X-Total-Count-Accuracy"]) == ("2+", "at_least")
+
 def test_read_product_not_found(test_client):
     response = test_client.get("/store-system/products/99999")
     assert response.status_code == 404
 
-@pytest.mark.order(8)
 def test_update_product_not_found(test_client):
     update_data = ProductFactory.to_dict(ProductFactory.build())
     response = test_client.put("/store-system/products/99999", json=update_data)
     assert response.status_code == 404
 
-@pytest.mark.order(9)
 def test_delete_product_not_found(test_client):
     response = test_client.delete("/store-system/products/99999")
     assert response.status_code == 404
 
-@pytest.mark.order(10)
 def test_create_product_invalid_data(test_client):
     invalid_product_data = {"name": "Invalid Product", "price": "not a number"}
     response = test_client.post("/store-system/products/", json=invalid_product_data)
     assert response.status_code == 422  # Unprocessable Entity
 
-@pytest.mark.order(11)
 def test_update_product_invalid_data(test_client):
     product = ProductFactory.build()
     product_data = ProductFactory.to_dict(product)
@@ -152,7 +131,6 @@ def test_update_product_invalid_data(test_client):
     response = test_client.put(f"/store-system/products/{created_product['id']}", json=invalid_update_data)
     assert response.status_code == 422  # Unprocessable Entity
 
-@pytest.mark.order(12)
 def test_read_products_with_pagination(test_client):
     for _ in range(15):
         product = ProductFactory.build()
@@ -163,4 +141,203 @@ def test_read_products_with_pagination(test_client):
     response = test_client.get(f"/store-system/products/?skip={skip}&limit={limit}")
     assert response.status_code == 200
     data = response.json()
-    assert len(data) == limit
\ No newline at end of file
+    assert len(data) == limit
+
+def test_read_product_stock(test_client):
+    product = test_client.post("/store-system/products/", json=ProductFactory.to_dict(ProductFactory.build())).json()
+    customer = test_client.post("/store-system/customers/", json=CustomerFactory.to_dict(CustomerFactory.build())).json()
+
+    response = test_client.get(f"/store-system/products/{product['id']}/stock")
+    assert response.status_code == 200
+    assert response.json() == {"product_id": product["id"], "quantity": 0}
+
+    arrival = test_client.post("/store-system/product-arrivals/", json=ProductArrivalFactory.to_dict(
+        ProductArrivalFactory.build(product_id=product["id"], quantity=10))).json()
+    purchase = test_client.post("/store-system/purchases/", json=PurchaseFactory.to_dict(
+        PurchaseFactory.build(customer_id=customer["id"], product_id=product["id"], quantity=3))).json()
+    assert test_client.get(f"/store-system/products/{product['id']}/stock").json()["quantity"] == 7
+
+    test_client.put(f"/store-system/purchases/{purchase['id']}", json=PurchaseFactory.to_dict(
+        PurchaseFactory.build(customer_id=customer["id"], product_id=product["id"], quantity=5)))
+    assert test_client.get(f"/store-system/products/{product['id']}/stock").json()["quantity"] == 5
+
+    test_client.delete(f"/store-system/product-arrivals/{arrival['id']}")
+    assert test_client.get(f"/store-system/products/{product['id']}/stock").json()["quantity"] == -5
+
+def test_read_product_stock_moves_between_products(test_client):
+    product1 = test_client.post("/store-system/products/", json=ProductFactory.to_dict(ProductFactory.build())).json()
+    product2 = test_client.post("/store-system/products/", json=ProductFactory.to_dict(ProductFactory.build())).json()
+    arrival = test_client.post("/store-system/product-arrivals/", json=ProductArrivalFactory.to_dict(
+        ProductArrivalFactory.build(product_id=product1["id"], quantity=4))).json()
+
+    test_client.put(f"/store-system/product-arrivals/{arrival['id']}", json=ProductArrivalFactory.to_dict(
+        ProductArrivalFactory.build(product_id=product2["id"], quantity=6)))
+    assert test_client.get(f"/store-system/products/{product1['id']}/stock").json()["quantity"] == 0
+    assert test_client.get(f"/store-system/products/{product2['id']}/stock").json()["quantity"] == 6
+
+def test_read_product_stock_not_found(test_client):
+    response = test_client.get("/store-system/products/99999/stock")
+    assert response.status_code == 404
+
+def test_read_product_stocks(test_client):
+    product1 = test_client.post("/store-system/products/", json=ProductFactory.to_dict(ProductFactory.build())).json()
+    product2 = test_client.post("/store-system/products/", json=ProductFactory.to_dict(ProductFactory.build())).json()
+    test_client.post("/store-system/product-arrivals/", json=ProductArrivalFactory.to_dict(
+        ProductArrivalFactory.build(product_id=product2["id"], quantity=8)))
+
+    response = test_client.get(f"/store-system/products/stock?ids={product2['id']},99999,{product1['id']}")
+    assert response.status_code == 200
+    assert response.json() == [
+        {"product_id": product2["id"], "quantity": 8},
+        {"product_id": product1["id"], "quantity": 0},
+    ]
+
+def test_read_product_stocks_invalid_ids(test_client):
+    response = test_client.get("/store-system/products/stock?ids=1,abc")
+    assert response.status_code == 422
+
+def _create_named_products(test_client, names):
+    return [test_client.post("/store-system/products/", json={"name": name, "price": 1.0}).json() for name in names]
+
+def test_search_products_prefix(test_client):
+    _create_named_products(test_client, ["Galaxy Phone", "Galaxy Tab", "Pixel Phone"])
+
+    response = test_client.get("/store-system/products/search", params={"q": "gal pho"})
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["name"] for item in data["items"]] == ["Galaxy Phone"]
+    assert data["next_cursor"] is None
+
+def test_search_products_ranks_closer_match_first(test_client):
+    _create_named_products(test_client, ["Phone Case Deluxe Edition", "Phone"])
+
+    response = test_client.get("/store-system/products/search", params={"q": "phone"})
+    names = [item["name"] for item in response.json()["items"]]
+    assert names[0] == "Phone"
+
+def test_search_products_caps_candidates_by_rank(test_client, monkeypatch):
+    # 약하게 맞는 행이 먼저 저장되어 있어도 후보를 점수순으로 자르므로 가장 잘 맞는 행이 남는다
+    _create_named_products(test_client, [f"Phone Case Deluxe Edition {i}" for i in range(3)] + ["Phone"])
+    monkeypatch.setattr(settings, "SEARCH_MAX_RESULTS", 2)
+
+    response = test_client.get("/store-system/products/search", params={"q": "phone"})
+    names = [item["name"] for item in response.json()["items"]]
+    assert names[0] == "Phone"
+    assert len(names) == 2
+
+def test_search_products_keyset_pagination(test_client):
+    created = _create_named_products(test_client, [f"Widget {i}" for i in range(5)])
+
+    seen = []
+    params = {"q": "widget", "limit": 2}
+    while True:
+        data = test_client.get("/store-system/products/search", params=params).json()
+        seen.extend(item["id"] for item in data["items"])
+        if data["next_cursor"] is None:
+            break
+        params["cursor"] = data["next_cursor"]
+    assert sorted(seen) == sorted(p["id"] for p in created)
+    assert len(seen) == len(set(seen))
+
+def test_search_products_invalid_cursor(test_client):
+    response = test_client.get("/store-system/products/search", params={"q": "widget", "cursor": "not-a-cursor"})
+    assert response.status_code == 422
+
+def test_read_products_by_ids(test_client, count_queries):
+    product1, product2 = _create_named_products(test_client, ["First", "Second"])
+
+    with count_queries() as counter:
+        response = test_client.get(f"/store-system/products/?ids={product2['id']},99999,{product1['id']},{product2['id']}")
+    assert response.status_code == 200
+    # 요청 순서대로, 중복 제거, 없는 id 는 헤더로
+    assert [p["id"] for p in response.json()] == [product2["id"], product1["id"]]
+    assert response.headers["X-Missing-Ids"] == "99999"
+    assert sum("FROM products" in s for s in counter.statements) == 1
+
+def test_read_products_batch_post(test_client):
+    product1, product2 = _create_named_products(test_client, ["First", "Second"])
+
+    response = test_client.post("/store-system/products/batch", json={"ids": [product1["id"], product2["id"]]})
+    assert response.status_code == 200
+    assert [p["id"] for p in response.json()] == [product1["id"], product2["id"]]
+    assert "X-Missing-Ids" not in response.headers
+
+def test_read_products_by_ids_invalid(test_client):
+    assert test_client.get("/store-system/products/?ids=1,abc").status_code == 422
+    assert test_client.get("/store-system/products/?ids=" + ",".join(["1"] * 1001)).status_code == 422
+    assert test_client.post("/store-system/products/batch", json={"ids": []}).status_code == 422
+
+def test_read_product_etag(test_client, count_queries):
+    product = _create_named_products(test_client, ["Tagged"])[0]
+    url = f"/store-system/products/{product['id']}"
+
+    response = test_client.get(url)
+    etag = response.headers["ETag"]
+    assert not etag.startswith("W/")
+
+    # 바뀌지 않았으면 버전만 조회하고 본문 없이 304
+    with count_queries() as counter:
+        response = test_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+    product_queries = [s for s in counter.statements if "FROM products" in s]
+    assert len(product_queries) == 1 and "products.name" not in product_queries[0]
+
+    test_client.put(url, json={"name": "Tagged", "price": 2.0})
+    response = test_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+def test_read_products_list_cache(test_client, list_cache, count_queries):
+    _create_named_products(test_client, ["Cached"])
+    first = test_client.get("/store-system/products/?limit=100&skip=0")
+
+    # 파라미터 순서가 달라도 같은 키, DB 조회 없이 응답
+    with count_queries() as counter:
+        second = test_client.get("/store-system/products/?skip=0&limit=100")
+    assert counter.count == 0
+    assert second.json() == first.json()
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert test_client.get("/store-system/products/?skip=0&limit=100",
+                           headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    # 쓰기가 성공하면 무효화
+    _create_named_products(test_client, ["Fresh"])
+    names = [p["name"] for p in test_client.get("/store-system/products/?skip=0&limit=100").json()]
+    assert "Fresh" in names
+
+async def test_read_products_list_cache_coalesces_concurrent_misses(async_test_client, list_cache, count_queries):
+    coalesced = lambda: REGISTRY.get_sample_value("list_cache_requests_total", {"resource": "products", "result": "coalesced"}) or 0
+    before = coalesced()
+    with count_queries() as counter:
+        responses = await asyncio.gather(*[async_test_client.get("/store-system/products/") for _ in range(5)])
+    assert [r.status_code for r in responses] == [200] * 5
+    assert len({r.content for r in responses}) == 1
+    assert sum("FROM products" in s for s in counter.statements) == 1
+    assert coalesced() - before == 4
+
+
+async def test_admission_sheds_load_when_slots_are_taken(async_test_client, admission):
+    rejected = lambda reason: REGISTRY.get_sample_value("admission_rejected_total", {"route_class": "read", "reason": reason}) or 0
+    before = rejected("timeout"), rejected("queue_full")
+    # 읽기 자리를 테스트가 차지하면 읽기는 잠깐 기다린 뒤 503, 쓰기와 /metrics 는 영향이 없다
+    assert await admission.limiters["read"].acquire(0)
+    try:
+        response = await async_test_client.get("/store-system/products/")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        created = await async_test_client.post("/store-system/products/", json=ProductFactory.to_dict(ProductFactory.build()))
+        assert created.status_code == 200
+        assert (await async_test_client.get("/metrics/")).status_code == 200
+
+        # 대기열(max_queue=1)이 차 있으면 기다리지 않고 바로 거절한다
+        waiting = asyncio.ensure_future(async_test_client.get("/store-system/products/"))
+        await asyncio.sleep(0.01)
+        assert (await async_test_client.get("/store-system/products/")).status_code == 503
+        assert (await waiting).status_code == 503
+    finally:
+        admission.limiters["read"].release()
+    assert rejected("timeout") - before[0] == 2
+    assert rejected("queue_full") - before[1] == 1
+    assert (await async_test_client.get("/store-system/products/")).status_code == 200
@@ -0,0 +1,58 @@
+import time
+import pytest
+from app.main import request_profiler
+from app.store_system import crud
+from app.store_system.tests.factories import StoreFactory
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    saved = dict(vars(request_profiler))
+    request_profiler.output_dir = tmp_path
+    yield request_profiler
+    vars(request_profiler).update(saved)
+
+
+@pytest.fixture
+def store_id(test_client):
+    return test_client.post("/store-system/stores/", json=StoreFactory.to_dict(StoreFactory.build())).json()["id"]
+
+
+def _slow_get(monkeypatch):
+    get = crud.store.get
+
+    def slow_get(*args, **kwargs):
+        time.sleep(0.02)
+        return get(*args, **kwargs)
+    monkeypatch.setattr(crud.store, "get", slow_get)
+
+
+def test_profile_header_returns_profile(test_client, profiler, store_id, monkeypatch):
+    _slow_get(monkeypatch)
+    response = test_client.get(f"/store-system/stores/{store_id}", headers={"X-Profile": "speedscope"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["X-Profiled-Status"] == "200"
+    # 동기 엔드포인트는 스레드풀에서 실행되지만 프로파일에 포함된다
+    frames = {frame["name"] for frame in response.json()["shared"]["frames"]}
+    assert {"read_store", "slow_get"} <= frames
+
+    response = test_client.get("/store-system/stores/0", headers={"X-Profile": "1"})
+    assert response.headers["content-type"].startswith("text/html")
+    assert response.headers["X-Profiled-Status"] == "404"
+
+
+def test_profile_header_requires_token_outside_debug(test_client, profiler, store_id):
+    profiler.allow_header, profiler.token = False, "secret"
+    url = f"/store-system/stores/{store_id}"
+    assert test_client.get(url, headers={"X-Profile": "html"}).json()["id"] == store_id
+    assert test_client.get(url, headers={"X-Profile": "html", "X-Profile-Token": "wrong"}).json()["id"] == store_id
+    response = test_client.get(url, headers={"X-Profile": "html", "X-Profile-Token": "secret"})
+    assert response.headers["content-type"].startswith("text/html")
+
+
+def test_sampled_requests_are_saved(test_client, profiler, store_id, tmp_path):
+    profiler.sample_routes = {"GET /store-system/stores/{store_id}": 1.0}
+    assert test_client.get(f"/store-system/stores/{store_id}").json()["id"] == store_id
+    assert test_client.get("/store-system/stores/").status_code == 200
+    assert [path.name.split("-", 1)[1] for path in tmp_path.iterdir()] == ["GET-store_system_stores_store_id.speedscope.json"]
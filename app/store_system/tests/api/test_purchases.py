@@ -1,43 +1,32 @@
+import asyncio
+import threading
+import time
 import pytest
 import pytest_asyncio
+from fastapi import FastAPI, Request
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta, timezone
+from hashlib import md5
+from fastapi.encoders import jsonable_encoder
+from app.core.config import settings
+from app.core.coalescer import WriteCoalescer
+from app.core.database import get_db, get_lazy_db
+from app.core.deadline import DeadlineMiddleware, request_deadline, track_request
+from app.core.idempotency import IdempotencyRecord
+from app.core.querystats import track_queries
 from app.main import app
 from app.store_system import crud, schemas
-from app.core.database import get_db, Base, engine
+from app.store_system import coalescing
+from app.store_system.coalescing import get_purchase_coalescer
 from app.store_system.tests.factories import CustomerFactory, ProductFactory, PurchaseFactory
 
 client = TestClient(app)
 
-@pytest.fixture(autouse=True, scope="function")
-def reset_db(test_db):
-    for table in reversed(Base.metadata.sorted_tables):
-        test_db.execute(table.delete())
-    test_db.commit()
-    yield
-    test_db.rollback()
-
-@pytest.fixture(scope="module")
-def test_db():
-    Base.metadata.create_all(bind=engine)
-    db = next(get_db())
-    yield db
-    db.close()
-    Base.metadata.drop_all(bind=engine)
-
-@pytest.fixture(scope="function")
-def test_client(test_db):
-    def override_get_db():
-        try:
-            yield test_db
-        finally:
-            test_db.rollback()
-    app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as client:
-        yield client
-    app.dependency_overrides.clear()
-
+# 요청 하나가 실행하는 SQL 수 상한
+pytestmark = pytest.mark.max_queries(10)
 
 # 기존의 fixture들은 그대로 유지
 
@@ -53,7 +42,6 @@ def test_product(test_client):
     response = test_client.post("/store-system/products/", json=ProductFactory.to_dict(product))
     return response.json()
 
-@pytest.mark.order(1)
 def test_create_purchase(test_client, test_customer, test_product):
     purchase = PurchaseFactory.build(
         customer_id=test_customer["id"],
@@ -69,7 +57,6 @@ def test_create_purchase(test_client, test_customer, test_product):
     assert data["quantity"] == purchase_data["quantity"]
     assert "id" in data
 
-@pytest.mark.order(2)
 def test_read_purchase(test_client, test_customer, test_product):
     purchase = PurchaseFactory.build(
         customer_id=test_customer["id"],
@@ -87,7 +74,6 @@ def test_read_purchase(test_client, test_customer, test_product):
     assert data["purchase_date"] == purchase_data["purchase_date"]
     assert data["quantity"] == purchase_data["quantity"]
 
-@pytest.mark.order(7)
 def test_update_purchase(test_client, test_customer, test_product):
     purchase = PurchaseFactory.build(
         customer_id=test_customer["id"],
@@ -110,7 +96,6 @@ def test_update_purchase(test_client, test_customer, test_product):
     assert data["purchase_date"] == update_data["purchase_date"]
     assert data["quantity"] == update_data["quantity"]
 
-@pytest.mark.order(8)
 def test_delete_purchase(test_client, test_customer, test_product):
     purchase = PurchaseFactory.build(
         customer_id=test_customer["id"],
@@ -126,7 +111,6 @@ def test_delete_purchase(test_client, test_customer, test_product):
     get_response = test_client.get(f"/store-system/purchases/{created_purchase['id']}")
     assert get_response.status_code == 404
 
-@pytest.mark.order(3)
 def test_read_purchases(test_client, test_customer, test_product):
     purchase1 = PurchaseFactory.build(
         customer_id=test_customer["id"],
@@ -148,7 +132,6 @@ def test_read_purchases(test_client, test_customer, test_product):
     assert any(purchase["quantity"] == 1 for purchase in data)
     assert any(purchase["quantity"] == 2 for purchase in data)
 
-@pytest.mark.order(4)
 def test_read_purchases_by_customer(test_client, test_customer, test_product):
     purchase = PurchaseFactory.build(
         customer_id=test_customer["id"],
@@ -162,7 +145,6 @@ def test_read_purchases_by_customer(test_client, test_customer, test_product):
     assert len(data) > 0
     assert all(purchase["customer_id"] == test_customer["id"] for purchase in data)
 
-@pytest.mark.order(5)
 def test_read_purchases_by_product(test_client, test_customer, test_product):
     purchase = PurchaseFactory.build(
         customer_id=test_customer["id"],
@@ -176,7 +158,6 @@ def test_read_purchases_by_product(test_client, test_customer, test_product):
     assert len(data) > 0
     assert all(purchase["product_id"] == test_product["id"] for purchase in data)
 
-@pytest.mark.order(6)
 def test_read_purchases_by_date_range(test_client, test_customer, test_product):
     purchase1 = PurchaseFactory.build(
         customer_id=test_customer["id"],
@@ -199,12 +180,10 @@ def test_read_purchases_by_date_range(test_client, test_customer, test_product):
     assert len(data) > 0
     assert all(start_date <= purchase["purchase_date"] <= end_date for purchase in data)
 
-@pytest.mark.order(9)
 def test_read_purchase_not_found(test_client):
     response = test_client.get("/store-system/purchases/99999")
     assert response.status_code == 404
 
-@pytest.mark.order(10)
 def test_update_purchase_not_found(test_client, test_customer, test_product):
     update_data = PurchaseFactory.to_dict(PurchaseFactory.build(
         customer_id=test_customer["id"],
@@ -213,7 +192,299 @@ def test_update_purchase_not_found(test_client, test_customer, test_product):
     response = test_client.put("/store-system/purchases/99999", json=update_data)
     assert response.status_code == 404
 
-@pytest.mark.order(11)
 def test_delete_purchase_not_found(test_client):
     response = test_client.delete("/store-system/purchases/99999")
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def test_read_purchases_expand(test_client, test_customer, test_product):
+    purchase = PurchaseFactory.build(
+        customer_id=test_customer["id"],
+        product_id=test_product["id"]
+    )
+    test_client.post("/store-system/purchases/", json=PurchaseFactory.to_dict(purchase))
+
+    response = test_client.get(f"/store-system/purchases/?product_id={test_product['id']}&expand=customer&expand=product")
+    assert response.status_code == 200
+    data = response.json()
+    assert data[0]["customer"] == test_customer
+    assert data[0]["product"] == test_product
+
+@pytest.mark.max_queries(4)
+def test_read_purchases_expand_query_count_does_not_grow_with_rows(test_client, db_session):
+    customers, products = CustomerFactory.build_batch(5), ProductFactory.build_batch(5)
+    db_session.add_all(customers + products)
+    db_session.flush()
+    db_session.add_all([PurchaseFactory.build(customer_id=c.id, product_id=p.id) for c in customers for p in products])
+    db_session.commit()
+
+    response = test_client.get("/store-system/purchases/?expand=customer&expand=product")
+    assert len(response.json()) == 25
+    # 테스트 세션의 SAVEPOINT + 구매 목록 1번 + 관계별 selectin 1번씩
+    assert response.headers["X-DB-Query-Count"] == "4"
+    assert float(response.headers["X-DB-Query-Time-Ms"]) > 0
+
+def test_track_queries_counts_repeated_statements(db_session):
+    db_session.execute(text("SELECT 1"))
+    with track_queries() as stats:
+        for _ in range(3):
+            db_session.execute(text("SELECT 1"))
+    assert stats.count == 3
+    assert stats.most_repeated() == ("SELECT 1", 3)
+
+def test_read_purchases_expand_invalid(test_client):
+    response = test_client.get("/store-system/purchases/?expand=store")
+    assert response.status_code == 422
+
+def test_read_purchases_batch_expand(test_client, test_customer, test_product):
+    purchase = PurchaseFactory.build(customer_id=test_customer["id"], product_id=test_product["id"])
+    created = test_client.post("/store-system/purchases/", json=PurchaseFactory.to_dict(purchase)).json()
+
+    response = test_client.post("/store-system/purchases/batch?expand=product", json={"ids": [99999, created["id"]]})
+    assert response.status_code == 200
+    data = response.json()
+    assert [p["id"] for p in data] == [created["id"]]
+    assert data[0]["product"] == test_product
+    assert "customer" not in data[0]
+    assert response.headers["X-Missing-Ids"] == "99999"
+
+def test_read_purchases_list_cache_invalidated_by_embedded_product(test_client, list_cache, test_customer, test_product):
+    purchase = PurchaseFactory.build(customer_id=test_customer["id"], product_id=test_product["id"])
+    test_client.post("/store-system/purchases/", json=PurchaseFactory.to_dict(purchase))
+    url = f"/store-system/purchases/?product_id={test_product['id']}&expand=product"
+    assert test_client.get(url).json()[0]["product"]["name"] == test_product["name"]
+
+    test_client.put(f"/store-system/products/{test_product['id']}", json={"name": "Renamed", "price": test_product["price"]})
+    assert test_client.get(url).json()[0]["product"]["name"] == "Renamed"
+
+def test_create_purchase_idempotency_key(test_client, test_customer, test_product):
+    purchase_data = PurchaseFactory.to_dict(PurchaseFactory.build(customer_id=test_customer["id"], product_id=test_product["id"]))
+    headers = {"Idempotency-Key": "pos-1-retry"}
+
+    first = test_client.post("/store-system/purchases/", json=purchase_data, headers=headers)
+    assert first.status_code == 200
+    # 재시도는 다시 실행하지 않고 저장된 응답을 돌려준다
+    retry = test_client.post("/store-system/purchases/", json=purchase_data, headers=headers)
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    purchases = test_client.get(f"/store-system/purchases/?customer_id={test_customer['id']}").json()
+    assert len(purchases) == 1
+    stock = test_client.get(f"/store-system/products/{test_product['id']}/stock").json()["quantity"]
+    assert stock == -purchase_data["quantity"]
+
+    # 같은 키로 다른 요청
+    other = {**purchase_data, "quantity": purchase_data["quantity"] + 1}
+    assert test_client.post("/store-system/purchases/", json=other, headers=headers).status_code == 422
+
+def _pending_idempotency_key(db_session, purchase, key, locked_at):
+    # 먼저 온 요청이 키를 차지했지만 응답을 아직 저장하지 않은 상태
+    db_session.add(IdempotencyRecord(
+        scope="POST /store-system/purchases/", key=key, locked_at=locked_at,
+        fingerprint=md5(purchase.json(sort_keys=True).encode()).hexdigest(),
+        expires_at=datetime.now(timezone.utc) + timedelta(hours=1),
+    ))
+    db_session.commit()
+
+def test_create_purchase_idempotency_key_in_progress(test_client, db_session, test_customer, test_product):
+    purchase = schemas.PurchaseCreate(customer_id=test_customer["id"], product_id=test_product["id"], purchase_date=date.today(), quantity=1)
+    _pending_idempotency_key(db_session, purchase, "in-flight", datetime.now(timezone.utc))
+
+    response = test_client.post("/store-system/purchases/", json=jsonable_encoder(purchase), headers={"Idempotency-Key": "in-flight"})
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+
+def test_create_purchase_reclaims_abandoned_idempotency_key(test_client, db_session, test_customer, test_product):
+    purchase = schemas.PurchaseCreate(customer_id=test_customer["id"], product_id=test_product["id"], purchase_date=date.today(), quantity=1)
+    # 처리하던 프로세스가 죽어서 임대(IDEMPOTENCY_LOCK_TIMEOUT)가 끝난 키는 재시도가 다시 실행한다
+    abandoned_at = datetime.now(timezone.utc) - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT + 1)
+    _pending_idempotency_key(db_session, purchase, "abandoned", abandoned_at)
+    headers = {"Idempotency-Key": "abandoned"}
+
+    response = test_client.post("/store-system/purchases/", json=jsonable_encoder(purchase), headers=headers)
+    assert response.status_code == 200
+    retry = test_client.post("/store-system/purchases/", json=jsonable_encoder(purchase), headers=headers)
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == response.json()
+
+def test_create_purchase_idempotency_response_save_failure_rolls_back_write(test_client, db_session, test_customer, test_product):
+    purchase_data = PurchaseFactory.to_dict(PurchaseFactory.build(customer_id=test_customer["id"], product_id=test_product["id"]))
+    headers = {"Idempotency-Key": "save-fails"}
+
+    # 응답 저장(UPDATE idempotency_keys)이 실패하면 같은 트랜잭션의 구매/재고 쓰기도 커밋되지 않는다
+    def fail_response_save(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE idempotency_keys"):
+            raise RuntimeError("response save failed")
+
+    event.listen(db_session.bind, "before_cursor_execute", fail_response_save)
+    try:
+        with pytest.raises(RuntimeError):
+            test_client.post("/store-system/purchases/", json=purchase_data, headers=headers)
+    finally:
+        event.remove(db_session.bind, "before_cursor_execute", fail_response_save)
+    assert test_client.get(f"/store-system/purchases/?customer_id={test_customer['id']}").json() == []
+    assert test_client.get(f"/store-system/products/{test_product['id']}/stock").json()["quantity"] == 0
+    assert db_session.query(IdempotencyRecord).filter_by(key="save-fails").first() is None
+
+    # 키가 풀렸으므로 재시도는 (409 가 아니라) 다시 실행되어 한 번만 쓴다
+    assert test_client.post("/store-system/purchases/", json=purchase_data, headers=headers).status_code == 200
+    assert len(test_client.get(f"/store-system/purchases/?customer_id={test_customer['id']}").json()) == 1
+
+def test_create_customer_failed_request_does_not_keep_idempotency_key(test_client):
+    test_client.post("/store-system/customers/", json={"name": "Taken", "email": "taken@example.com"})
+    headers = {"Idempotency-Key": "signup-1"}
+    data = {"name": "Taken", "email": "taken@example.com"}
+
+    assert test_client.post("/store-system/customers/", json=data, headers=headers).status_code == 400
+    # 실패한 요청은 키를 지우므로 재시도하면 (409 가 아니라) 다시 실행된다
+    assert test_client.post("/store-system/customers/", json=data, headers=headers).status_code == 400
+    assert test_client.post("/store-system/customers/", json={**data, "email": "free@example.com"}, headers={"Idempotency-Key": "signup-2"}).status_code == 200
+
+
+def test_create_purchase_through_coalescer(test_client, db_session, test_customer, test_product):
+    coalescer = WriteCoalescer(lambda purchases_in: crud.purchase.create_many(db_session, purchases_in),
+                               window=0.01, max_batch=10, name="test")
+    app.dependency_overrides[get_purchase_coalescer] = lambda: coalescer
+    purchase_data = PurchaseFactory.to_dict(PurchaseFactory.build(customer_id=test_customer["id"], product_id=test_product["id"]))
+    try:
+        response = test_client.post("/store-system/purchases/", json=purchase_data)
+    finally:
+        coalescer.close()
+    assert response.status_code == 200
+    data = response.json()
+    assert data["quantity"] == purchase_data["quantity"]
+    assert test_client.get(f"/store-system/purchases/{data['id']}").json()["quantity"] == purchase_data["quantity"]
+    stock = test_client.get(f"/store-system/products/{test_product['id']}/stock").json()
+    assert stock["quantity"] == -purchase_data["quantity"]
+
+
+def test_create_purchase_through_coalescer_honours_deadline(test_client, test_customer, test_product):
+    release = threading.Event()
+    coalescer = WriteCoalescer(lambda purchases_in: release.wait(5) and [], window=0, max_batch=1, name="test")
+    app.dependency_overrides[get_purchase_coalescer] = lambda: coalescer
+    purchase_data = PurchaseFactory.to_dict(PurchaseFactory.build(customer_id=test_customer["id"], product_id=test_product["id"]))
+    try:
+        # 배치 결과를 요청 기한까지만 기다린다
+        response = test_client.post("/store-system/purchases/", json=purchase_data, headers={"X-Request-Timeout-Ms": "50"})
+    finally:
+        release.set()
+        coalescer.close()
+    assert response.status_code == 504
+
+
+def test_purchase_coalescer_reopens_with_each_lifespan(db_session, monkeypatch):
+    # 종료한 앱을 다시 시작해도 (TestClient 를 다시 열거나 서버를 다시 띄워도) 묶음 처리가 동작한다
+    monkeypatch.setattr(settings, "PURCHASE_COALESCE_WINDOW_MS", 1)
+    monkeypatch.setattr(coalescing, "_flush_purchases", lambda purchases_in: crud.purchase.create_many(db_session, purchases_in))
+    customer, product = CustomerFactory.build(), ProductFactory.build()
+    db_session.add_all([customer, product])
+    db_session.commit()
+    purchase_data = PurchaseFactory.to_dict(PurchaseFactory.build(customer_id=customer.id, product_id=product.id))
+    app.dependency_overrides[get_lazy_db] = lambda: db_session
+    coalescers = []
+    try:
+        for _ in range(2):
+            with TestClient(app) as lifespan_client:
+                coalescers.append(app.state.purchase_coalescer)
+                assert lifespan_client.post("/store-system/purchases/", json=purchase_data).status_code == 200
+            assert app.state.purchase_coalescer is None
+    finally:
+        app.dependency_overrides.clear()
+    assert coalescers[0] is not coalescers[1]
+    assert coalescers[1].submitted == 1
+
+
+@pytest.fixture
+def tracked_db(test_client, db_session):
+    # 실제 get_db 처럼 요청 기한/취소를 테스트 세션에 건다
+    def override_get_db(request: Request):
+        track_request(db_session, request)
+        yield db_session
+
+    app.dependency_overrides[get_db] = override_get_db
+    return db_session
+
+
+def _slow_date_range(calls):
+    def get_purchases_by_date_range(db, **kwargs):
+        try:
+            db.execute(text("SELECT pg_sleep(5)"))
+        except OperationalError as e:
+            calls.append(e)
+            raise
+        return []
+    return get_purchases_by_date_range
+
+
+def test_read_purchases_stops_at_request_deadline(test_client, tracked_db, monkeypatch):
+    calls = []
+    monkeypatch.setattr(crud, "get_purchases_by_date_range", _slow_date_range(calls))
+    started = time.monotonic()
+    response = test_client.get("/store-system/purchases/?start_date=2020-01-01&end_date=2030-01-01",
+                               headers={"X-Request-Timeout-Ms": "200"})
+    assert response.status_code == 504
+    assert time.monotonic() - started < 2
+    assert "statement timeout" in str(calls[0])
+
+
+async def test_read_purchases_cancels_query_when_client_disconnects(tracked_db, monkeypatch):
+    calls, events = [], []
+    slow_date_range = _slow_date_range(calls)
+
+    def get_purchases_by_date_range(db, **kwargs):
+        try:
+            return slow_date_range(db, **kwargs)
+        finally:
+            # 쿼리가 취소된 뒤에도 스레드는 잠시 세션을 더 쓴다
+            time.sleep(0.2)
+            events.append("thread done")
+
+    monkeypatch.setattr(crud, "get_purchases_by_date_range", get_purchases_by_date_range)
+
+    # 의존성 정리(세션 닫기)는 쿼리가 취소되고 스레드가 끝난 다음에 실행되어야 한다
+    def override_get_db(request: Request):
+        track_request(tracked_db, request)
+        try:
+            yield tracked_db
+        finally:
+            events.append("cleanup")
+
+    app.dependency_overrides[get_db] = override_get_db
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.sleep(0.2)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+             "path": "/store-system/purchases/", "raw_path": b"/store-system/purchases/", "root_path": "",
+             "query_string": b"start_date=2020-01-01&end_date=2030-01-01", "headers": [(b"host", b"test")],
+             "client": ("test", 1), "server": ("test", 80)}
+    started = time.monotonic()
+    await app(scope, receive, send)
+    assert time.monotonic() - started < 2
+    assert "canceling statement due to user request" in str(calls[0])
+    # 요청 태스크를 취소하지 않으므로 세션은 쿼리가 취소되어 스레드가 끝난 다음에 닫힌다
+    assert events == ["thread done", "cleanup"]
+
+
+def test_deadline_starts_when_request_arrives():
+    # 라우팅 전에 시간을 쓰면 (부하 차단 대기 등) 그만큼 남은 시간이 줄어든다
+    deadline_app = FastAPI()
+
+    @deadline_app.get("/remaining")
+    def remaining(request: Request):
+        return {"remaining_ms": request_deadline(request).remaining_ms()}
+
+    @deadline_app.middleware("http")
+    async def queued(request, call_next):
+        await asyncio.sleep(0.3)
+        return await call_next(request)
+
+    deadline_app.add_middleware(DeadlineMiddleware)
+    response = TestClient(deadline_app).get("/remaining", headers={"X-Request-Timeout-Ms": "1000"})
+    assert response.json()["remaining_ms"] <= 700
@@ -0,0 +1,39 @@
+import re
+import pytest
+from app.core.config import settings
+from app.store_system.tests.factories import StoreFactory
+
+
+def server_timing(response):
+    # {"db": (ms, desc), ...}
+    entries = {}
+    for entry in response.headers["Server-Timing"].split(", "):
+        name, *params = entry.split(";")
+        values = dict(param.split("=", 1) for param in params)
+        entries[name] = (float(values["dur"]), values.get("desc", "").strip('"'))
+    return entries
+
+
+@pytest.fixture
+def timing_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "SERVER_TIMING_ENABLED", True)
+
+
+def test_server_timing_splits_handler_time(test_client, timing_enabled):
+    response = test_client.post("/store-system/stores/", json=StoreFactory.to_dict(StoreFactory.build()))
+    assert response.status_code == 200
+    entries = server_timing(response)
+    assert list(entries) == ["db", "validate", "app", "serialize", "handler", "total"]
+    assert re.fullmatch(r"\d+ queries", entries["db"][1])
+    parts = entries["validate"][0] + entries["app"][0] + entries["serialize"][0]
+    assert parts <= entries["handler"][0] + 0.5
+    assert entries["handler"][0] <= entries["total"][0]
+
+
+async def test_server_timing_async_endpoint(async_test_client, timing_enabled):
+    response = await async_test_client.get("/parking-system/lots/")
+    assert {"app", "handler", "total"} <= set(server_timing(response))
+
+
+def test_server_timing_disabled(test_client):
+    assert "Server-Timing" not in test_client.get("/store-system/stores/").headers
@@ -0,0 +1,161 @@
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+from pathlib import Path
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from httpx import AsyncClient
+import app.main as main
+from app.core.shutdown import DrainMiddleware, RequestDrainer
+
+
+@pytest.fixture
+def draining():
+    main.drainer.draining = True
+    yield main.drainer
+    main.drainer.reset()
+
+
+# 요청을 release 할 때까지 붙잡아 두는 앱
+@pytest.fixture
+def slow_app():
+    release = asyncio.Event()
+    drainer = RequestDrainer(poll_interval=0.01)
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        await release.wait()
+        return {"done": True}
+
+    app.add_middleware(DrainMiddleware, drainer=drainer)
+    return app, drainer, release
+
+
+def test_rejects_new_requests_while_draining(test_client, draining):
+    response = test_client.get("/store-system/stores/")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.headers["Connection"] == "close"
+
+
+async def test_drain_waits_for_in_flight_requests(slow_app):
+    app, drainer, release = slow_app
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        in_flight = asyncio.create_task(client.get("/slow"))
+        while drainer.in_flight == 0:
+            await asyncio.sleep(0.01)
+        drain = asyncio.create_task(drainer.drain(timeout=5))
+        await asyncio.sleep(0.05)
+        assert not drain.done()
+        # 종료 중에 들어온 요청은 바로 거절된다
+        assert (await client.get("/slow")).status_code == 503
+        release.set()
+        response = await in_flight
+        assert await drain == 0
+    assert response.status_code == 200
+    assert response.headers["Connection"] == "close"
+
+
+async def test_drain_gives_up_after_timeout(slow_app):
+    app, drainer, release = slow_app
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        in_flight = asyncio.create_task(client.get("/slow"))
+        while drainer.in_flight == 0:
+            await asyncio.sleep(0.01)
+        assert await drainer.drain(timeout=0.05) == 1
+        release.set()
+        await in_flight
+
+
+def test_shutdown_disposes_both_engines():
+    # dispose() 는 풀의 커넥션을 닫고 새 풀로 바꾼다
+    pools = main.engine.pool, main.async_engine.sync_engine.pool
+    with TestClient(main.app) as client:
+        assert client.get("/").status_code == 200
+    assert main.engine.pool is not pools[0]
+    assert main.async_engine.sync_engine.pool is not pools[1]
+    with TestClient(main.app) as client:
+        assert client.get("/").status_code == 200
+
+
+# DrainingServer 로 띄운 실제 uvicorn 서버. lifespan shutdown 이 언제 오는지 출력한다
+SERVER = textwrap.dedent('''
+    import asyncio, sys
+    import uvicorn
+    from fastapi import FastAPI
+    from app.core.shutdown import DrainMiddleware, DrainingServer, RequestDrainer
+
+    drainer = RequestDrainer(poll_interval=0.01)
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(1)
+        print("slow done", flush=True)
+        return {"done": True}
+
+    @app.get("/ready")
+    async def ready():
+        return {"status": "ready"}
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        print("lifespan shutdown", flush=True)
+
+    app.add_middleware(DrainMiddleware, drainer=drainer)
+    config = uvicorn.Config(app, port=int(sys.argv[1]), log_level="warning")
+    DrainingServer(config, drainer, timeout=5).run()
+''')
+
+
+@pytest.fixture
+def server(tmp_path):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    script = tmp_path / "server.py"
+    script.write_text(SERVER)
+    root = Path(__file__).resolve().parents[4]
+    process = subprocess.Popen([sys.executable, str(script), str(port)], cwd=root, stdout=subprocess.PIPE, text=True,
+                               env={**os.environ, "PYTHONPATH": str(root)})
+    url = f"http://127.0.0.1:{port}"
+    started = time.monotonic()
+    while True:
+        try:
+            httpx.get(f"{url}/ready")
+            break
+        except httpx.TransportError:
+            assert process.poll() is None and time.monotonic() - started < 10, "server did not start"
+            time.sleep(0.05)
+    yield process, url
+    process.kill()
+    process.wait()
+
+
+def test_sigterm_drains_before_uvicorn_shuts_down(server):
+    process, url = server
+    responses = []
+    slow = threading.Thread(target=lambda: responses.append(httpx.get(f"{url}/slow", timeout=10)))
+    slow.start()
+    time.sleep(0.2)
+    process.send_signal(signal.SIGTERM)
+    time.sleep(0.2)
+    # 신호를 받은 뒤에도 리스너는 열려 있고, 새 요청(readiness 포함)은 503 으로 돌려보낸다
+    rejected = httpx.get(f"{url}/ready")
+    assert rejected.status_code == 503
+    assert rejected.headers["Connection"] == "close"
+    slow.join(10)
+    assert responses[0].status_code == 200
+    # 최근 uvicorn 은 정상 종료한 뒤 받은 신호를 다시 보낸다
+    assert process.wait(10) in (0, -signal.SIGTERM)
+    # 진행 중인 요청이 끝난 다음에 lifespan shutdown 이 온다
+    assert process.stdout.read().split() == "slow done lifespan shutdown".split()
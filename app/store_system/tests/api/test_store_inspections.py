@@ -5,42 +5,13 @@ from sqlalchemy.orm import Session
 from datetime import date, timedelta
 from app.main import app
 from app.store_system import crud, schemas
-from app.core.database import get_db, Base, engine
 from app.store_system.tests.factories import StoreFactory, StoreInspectionFactory
 
 
 client = TestClient(app)
 
-@pytest.fixture(autouse=True, scope="function")
-def reset_db(test_db):
-    for table in reversed(Base.metadata.sorted_tables):
-        test_db.execute(table.delete())
-    test_db.commit()
-    yield
-    test_db.rollback()
-
-@pytest.fixture(scope="module")
-def test_db():
-    Base.metadata.create_all(bind=engine)
-    db = next(get_db())
-    yield db
-    db.close()
-    Base.metadata.drop_all(bind=engine)
-
-
-@pytest.fixture(scope="function")
-def test_client(test_db):
-    def override_get_db():
-        try:
-            yield test_db
-        finally:
-            test_db.rollback()
-    app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as client:
-        yield client
-    app.dependency_overrides.clear()
-
-
+# 요청 하나가 실행하는 SQL 수 상한 (N+1 회귀 방지)
+pytestmark = pytest.mark.max_queries(5)
 
 @pytest.fixture(scope="function")
 def test_store(test_client):
@@ -48,7 +19,6 @@ def test_store(test_client):
     response = test_client.post("/store-system/stores/", json=StoreFactory.to_dict(store))
     return response.json()
 
-@pytest.mark.order(1)
 def test_create_store_inspection(test_client, test_store):
     inspection = StoreInspectionFactory.build(store_id=test_store["id"])
     inspection_data = StoreInspectionFactory.to_dict(inspection)
@@ -60,7 +30,6 @@ def test_create_store_inspection(test_client, test_store):
     assert data["result"] == inspection_data["result"]
     assert "id" in data
 
-@pytest.mark.order(2)
 def test_read_store_inspection(test_client, test_store):
     inspection = StoreInspectionFactory.build(store_id=test_store["id"])
     inspection_data = StoreInspectionFactory.to_dict(inspection)
@@ -74,7 +43,6 @@ def test_read_store_inspection(test_client, test_store):
     assert data["inspection_date"] == inspection_data["inspection_date"]
     assert data["result"] == inspection_data["result"]
 
-@pytest.mark.order(6)
 def test_update_store_inspection(test_client, test_store):
     inspection = StoreInspectionFactory.build(store_id=test_store["id"])
     inspection_data = StoreInspectionFactory.to_dict(inspection)
@@ -93,7 +61,6 @@ def test_update_store_inspection(test_client, test_store):
     assert data["inspection_date"] == update_data["inspection_date"]
     assert data["result"] == update_data["result"]
 
-@pytest.mark.order(7)
 def test_delete_store_inspection(test_client, test_store):
     inspection = StoreInspectionFactory.build(store_id=test_store["id"])
     inspection_data = StoreInspectionFactory.to_dict(inspection)
@@ -106,7 +73,6 @@ def test_delete_store_inspection(test_client, test_store):
     get_response = test_client.get(f"/store-system/store-inspections/{created_inspection['id']}")
     assert get_response.status_code == 404
 
-@pytest.mark.order(3)
 def test_read_store_inspections(test_client, test_store):
     inspection1 = StoreInspectionFactory.build(store_id=test_store["id"], result="Passed")
     inspection2 = StoreInspectionFactory.build(store_id=test_store["id"], result="Failed")
@@ -120,7 +86,6 @@ def test_read_store_inspections(test_client, test_store):
     assert any(inspection["result"] == "Passed" for inspection in data)
     assert any(inspection["result"] == "Failed" for inspection in data)
 
-@pytest.mark.order(4)
 def test_read_store_inspections_by_store(test_client, test_store):
     inspection = StoreInspectionFactory.build(store_id=test_store["id"])
     test_client.post("/store-system/store-inspections/", json=StoreInspectionFactory.to_dict(inspection))
@@ -131,7 +96,6 @@ def test_read_store_inspections_by_store(test_client, test_store):
     assert len(data) > 0
     assert all(inspection["store_id"] == test_store["id"] for inspection in data)
 
-@pytest.mark.order(5)
 def test_read_store_inspections_by_date_range(test_client, test_store):
     inspection1 = StoreInspectionFactory.build(
         store_id=test_store["id"],
@@ -152,18 +116,15 @@ def test_read_store_inspections_by_date_range(test_client, test_store):
     assert len(data) > 0
     assert all(start_date <= inspection["inspection_date"] <= end_date for inspection in data)
 
-@pytest.mark.order(8)
 def test_read_store_inspection_not_found(test_client):
     response = test_client.get("/store-system/store-inspections/99999")
     assert response.status_code == 404
 
-@pytest.mark.order(9)
 def test_update_store_inspection_not_found(test_client, test_store):
     update_data = StoreInspectionFactory.to_dict(StoreInspectionFactory.build(store_id=test_store["id"]))
     response = test_client.put("/store-system/store-inspections/99999", json=update_data)
     assert response.status_code == 404
 
-@pytest.mark.order(10)
 def test_delete_store_inspection_not_found(test_client):
     response = test_client.delete("/store-system/store-inspections/99999")
     assert response.status_code == 404
\ No newline at end of file
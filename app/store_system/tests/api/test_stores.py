@@ -4,41 +4,13 @@ from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 from app.main import app
 from app.store_system import crud, schemas
-from app.core.database import get_db, Base, engine
-from app.store_system.tests.factories import StoreFactory
+from app.store_system.tests.factories import StoreFactory, StoreInspectionFactory
 
 client = TestClient(app)
 
-@pytest.fixture(autouse=True, scope="function")
-def reset_db(test_db):
-    for table in reversed(Base.metadata.sorted_tables):
-        test_db.execute(table.delete())
-    test_db.commit()
-    yield
-    test_db.rollback()
-
-@pytest.fixture(scope="module")
-def test_db():
-    Base.metadata.create_all(bind=engine)
-    db = next(get_db())
-    yield db
-    db.close()
-    Base.metadata.drop_all(bind=engine)
-
-
-@pytest.fixture(scope="function")
-def test_client(test_db):
-    def override_get_db():
-        try:
-            yield test_db
-        finally:
-            test_db.rollback()
-    app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as client:
-        yield client
-    app.dependency_overrides.clear()
-
-@pytest.mark.order(1)
+# 요청 하나가 실행하는 SQL 수 상한 (N+1 회귀 방지)
+pytestmark = pytest.mark.max_queries(5)
+
 def test_create_store(test_client):
     store = StoreFactory.build()
     store_data = StoreFactory.to_dict(store)
@@ -49,7 +21,6 @@ def test_create_store(test_client):
     assert data["location"] == store_data["location"]
     assert "id" in data
 
-@pytest.mark.order(2)
 def test_read_store(test_client):
     store = StoreFactory.build()
     store_data = StoreFactory.to_dict(store)
@@ -62,7 +33,6 @@ def test_read_store(test_client):
     assert data["name"] == store_data["name"]
     assert data["location"] == store_data["location"]
 
-@pytest.mark.order(5)
 def test_update_store(test_client):
     store = StoreFactory.build()
     store_data = StoreFactory.to_dict(store)
@@ -77,7 +47,6 @@ def test_update_store(test_client):
     assert data["name"] == update_data["name"]
     assert data["location"] == update_data["location"]
 
-@pytest.mark.order(6)
 def test_delete_store(test_client):
     store = StoreFactory.build()
     store_data = StoreFactory.to_dict(store)
@@ -90,7 +59,6 @@ def test_delete_store(test_client):
     get_response = test_client.get(f"/store-system/stores/{created_store['id']}")
     assert get_response.status_code == 404
 
-@pytest.mark.order(3)
 def test_read_stores(test_client):
     store1 = StoreFactory.build()
     store2 = StoreFactory.build()
@@ -104,7 +72,6 @@ def test_read_stores(test_client):
     assert any(store["name"] == store1.name for store in data)
     assert any(store["name"] == store2.name for store in data)
 
-@pytest.mark.order(4)
 def test_read_stores_with_filter(test_client):
     store = StoreFactory.build(location="Filter Location")
     test_client.post("/store-system/stores/", json=StoreFactory.to_dict(store))
@@ -115,18 +82,94 @@ def test_read_stores_with_filter(test_client):
     assert len(data) > 0
     assert all(store["location"] == "Filter Location" for store in data)
 
-@pytest.mark.order(7)
 def test_read_store_not_found(test_client):
     response = test_client.get("/store-system/stores/99999")
     assert response.status_code == 404
 
-@pytest.mark.order(8)
 def test_update_store_not_found(test_client):
     update_data = StoreFactory.to_dict(StoreFactory.build())
     response = test_client.put("/store-system/stores/99999", json=update_data)
     assert response.status_code == 404
 
-@pytest.mark.order(9)
 def test_delete_store_not_found(test_client):
     response = test_client.delete("/store-system/stores/99999")
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def test_read_store_inspections(test_client):
+    store = test_client.post("/store-system/stores/", json=StoreFactory.to_dict(StoreFactory.build())).json()
+    other_store = test_client.post("/store-system/stores/", json=StoreFactory.to_dict(StoreFactory.build())).json()
+    for store_id in (store["id"], store["id"], other_store["id"]):
+        test_client.post("/store-system/store-inspections/", json=StoreInspectionFactory.to_dict(
+            StoreInspectionFactory.build(store_id=store_id)))
+
+    response = test_client.get(f"/store-system/stores/{store['id']}/inspections")
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 2
+    assert all(inspection["store_id"] == store["id"] for inspection in data)
+
+def test_read_store_inspections_not_found(test_client):
+    response = test_client.get("/store-system/stores/99999/inspections")
+    assert response.status_code == 404
+
+
+def _create_store(test_client, location):
+    store = StoreFactory.build(location=location)
+    return test_client.post("/store-system/stores/", json=StoreFactory.to_dict(store)).json()
+
+def test_search_stores_prefix_ranked_first(test_client):
+    prefix = _create_store(test_client, "Gangnam-daero 123, Seoul")
+    similar = _create_store(test_client, "Seoul Gangnam-daero 456")
+    _create_store(test_client, "Haeundae-ro 1, Busan")
+
+    response = test_client.get("/store-system/stores/search?q=gangnam-daero")
+    assert response.status_code == 200
+    data = response.json()
+    assert [store["id"] for store in data] == [prefix["id"], similar["id"]]
+    assert data[0]["prefix_match"] is True
+    assert data[1]["prefix_match"] is False
+    assert data[1]["score"] > 0
+
+def test_search_stores_tolerates_typos(test_client):
+    store = _create_store(test_client, "Haeundae-ro 1, Busan")
+
+    response = test_client.get("/store-system/stores/search?q=Haeundea&mode=similar")
+    assert response.status_code == 200
+    assert [s["id"] for s in response.json()] == [store["id"]]
+
+    response = test_client.get("/store-system/stores/search?q=Haeundea&mode=prefix")
+    assert response.json() == []
+
+def test_search_stores_escapes_like_wildcards(test_client):
+    _create_store(test_client, "Gangnam-daero 123, Seoul")
+
+    response = test_client.get("/store-system/stores/search?q=%25&mode=prefix")
+    assert response.status_code == 200
+    assert response.json() == []
+
+def test_read_stores_by_location_case_insensitive(test_client):
+    store = _create_store(test_client, "Jongno 1, Seoul")
+
+    response = test_client.get("/store-system/stores/?location=JONGNO 1, SEOUL")
+    assert response.status_code == 200
+    assert [s["id"] for s in response.json()] == [store["id"]]
+
+def test_read_stores_by_ids(test_client):
+    store = test_client.post("/store-system/stores/", json=StoreFactory.to_dict(StoreFactory.build())).json()
+
+    response = test_client.get(f"/store-system/stores/?ids={store['id']}")
+    assert response.status_code == 200
+    assert response.json() == [store]
+
+def test_read_stores_weak_etag(test_client):
+    store = test_client.post("/store-system/stores/", json=StoreFactory.to_dict(StoreFactory.build())).json()
+
+    response = test_client.get("/store-system/stores/")
+    etag = response.headers["ETag"]
+    assert etag.startswith("W/")
+    assert test_client.get("/store-system/stores/", headers={"If-None-Match": etag}).status_code == 304
+
+    test_client.put(f"/store-system/stores/{store['id']}", json={"name": "Renamed", "location": store["location"]})
+    response = test_client.get("/store-system/stores/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
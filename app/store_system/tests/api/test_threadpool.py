@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import pytest
+from anyio import to_thread
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+import app.main as main
+from app.core.config import settings
+from app.core.database import pool_capacity
+from app.core.threadpool import ThreadPool
+
+
+# 테스트 이벤트 루프의 기본 limiter 크기를 되돌린다
+@pytest.fixture
+async def default_limiter():
+    limiter = to_thread.current_default_thread_limiter()
+    total_tokens = limiter.total_tokens
+    yield limiter
+    limiter.total_tokens = total_tokens
+
+
+async def test_limit_follows_pool_capacity(default_limiter):
+    threadpool = ThreadPool(extra=4)
+    threadpool.attach(30)
+    assert default_limiter.total_tokens == 34
+    assert REGISTRY.get_sample_value("threadpool_limit") == 34
+    # 자동 조절로 풀 상한이 바뀌면 같이 바뀐다
+    threadpool.set_capacity(10)
+    assert default_limiter.total_tokens == 14
+
+
+async def test_fixed_size_ignores_pool_capacity(default_limiter):
+    threadpool = ThreadPool(size=8, extra=4)
+    threadpool.attach(30)
+    threadpool.set_capacity(10)
+    assert default_limiter.total_tokens == 8
+
+
+async def test_samples_calls_waiting_for_a_thread(default_limiter):
+    threadpool = ThreadPool(size=1)
+    threadpool.attach(30)
+    release = threading.Event()
+    calls = [asyncio.create_task(to_thread.run_sync(release.wait)) for _ in range(2)]
+    try:
+        while threadpool.state()["waiting"] == 0:
+            await asyncio.sleep(0.01)
+        assert threadpool.state() == {"limit": 1, "busy": 1, "waiting": 1}
+        assert threadpool.sample() == 1
+        assert REGISTRY.get_sample_value("threadpool_busy") == 1
+        assert REGISTRY.get_sample_value("threadpool_queue_depth") == 1
+    finally:
+        release.set()
+        await asyncio.gather(*calls)
+    assert threadpool.sample() == 0
+
+
+async def current_limit():
+    return to_thread.current_default_thread_limiter().total_tokens
+
+
+def test_app_sizes_threadpool_on_startup():
+    # 앱 이벤트 루프(TestClient portal)의 기본 limiter 를 직접 본다 (/debug/pool 은 DEBUG 일 때만 있다)
+    with TestClient(main.app) as client:
+        limit = client.portal.call(current_limit)
+        assert main.threadpool.state()["limit"] == limit
+    assert limit == pool_capacity() + settings.THREADPOOL_EXTRA_THREADS
@@ -0,0 +1,125 @@
+import json
+import pytest
+from loguru import logger
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import SpanKind
+from app.core import tracing
+from app.store_system.tests.factories import ProductFactory
+
+
+@pytest.fixture
+def spans():
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracing.configure(provider)
+    yield exporter
+    tracing.configure(None)
+
+
+def by_name(finished):
+    return {span.name: span for span in finished}
+
+
+def test_request_crud_and_sql_spans_share_a_trace(test_client, spans):
+    response = test_client.post("/store-system/products/", json=ProductFactory.to_dict(ProductFactory.build()))
+    assert response.status_code == 200
+
+    finished = spans.get_finished_spans()
+    named = by_name(finished)
+    server, create = named["POST /store-system/products/"], named["CRUDProduct.create"]
+    assert server.kind == SpanKind.SERVER and server.attributes["http.status_code"] == 200
+    assert response.headers["X-Trace-Id"] == format(server.context.trace_id, "032x")
+    # 요청 -> CRUD 메서드 -> SQL 문
+    assert create.parent.span_id == server.context.span_id
+    insert = next(span for span in finished if span.name == "INSERT")
+    assert insert.parent.span_id == create.context.span_id
+    assert insert.attributes["db.statement"].startswith("INSERT INTO products")
+    assert {span.context.trace_id for span in finished} == {server.context.trace_id}
+
+
+def test_continues_incoming_traceparent(test_client, spans):
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    response = test_client.get("/store-system/products/", headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"})
+    assert response.headers["X-Trace-Id"] == trace_id
+    assert by_name(spans.get_finished_spans())["GET /store-system/products/"].parent.is_remote
+
+
+def test_log_records_carry_trace_id(test_client, spans):
+    records = []
+    sink = logger.add(lambda message: records.append(message.record), level="INFO")
+    try:
+        response = test_client.get("/")
+    finally:
+        logger.remove(sink)
+    logged = [record for record in records if record["message"] == "Root endpoint accessed"]
+    assert logged[0]["extra"]["trace_id"] == response.headers["X-Trace-Id"]
+
+
+def test_tail_sampling_keeps_only_slow_or_failed_traces(test_client):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(tracing.TailSamplingProcessor(SimpleSpanProcessor(exporter), latency_ms=60_000))
+    tracing.configure(provider)
+    try:
+        assert test_client.get("/").status_code == 200
+        assert exporter.get_finished_spans() == ()
+        assert test_client.get("/store-system/products/99999").status_code == 404
+        assert exporter.get_finished_spans() == ()
+        # 에러가 난 trace 는 빠르더라도 전부 내보낸다
+        with pytest.raises(ZeroDivisionError):
+            with tracing.start_span("failing"):
+                with tracing.start_span("child"):
+                    1 / 0
+        assert sorted(span.name for span in exporter.get_finished_spans()) == ["child", "failing"]
+    finally:
+        tracing.configure(None)
+
+
+def test_file_exporter_writes_json_lines(tmp_path, test_client):
+    path = tmp_path / "spans.jsonl"
+    provider = tracing.create_provider("test", exporter="file", file_path=str(path))
+    tracing.configure(provider)
+    try:
+        assert test_client.get("/").status_code == 200
+    finally:
+        tracing.shutdown()
+    names = [json.loads(line)["name"] for line in path.read_text().splitlines()]
+    assert names == ["GET /"]
+
+
+# 전역 loguru patcher 를 테스트가 끝나면 되돌린다
+@pytest.fixture
+def loguru_patcher():
+    previous = logger._core.patcher
+    logger._core.patcher = None
+    yield
+    logger._core.patcher = previous
+
+
+def test_disabled_tracing_leaves_log_patcher_alone(loguru_patcher):
+    tracing.install_tracing(None)
+    assert logger._core.patcher is None
+
+
+def test_log_trace_ids_keep_existing_patcher(loguru_patcher):
+    calls = []
+
+    def tag(record):
+        calls.append(record["message"])
+
+    logger.configure(patcher=tag)
+    tracing.configure(TracerProvider())
+    tracing.configure(TracerProvider())
+    records = []
+    sink = logger.add(lambda message: records.append(message.record))
+    try:
+        logger.info("patched")
+    finally:
+        logger.remove(sink)
+        tracing.configure(None)
+    # 두 번 켜도 한 번만 이어 붙는다
+    assert calls == ["patched"]
+    assert records[0]["extra"]["trace_id"] == "-"
@@ -0,0 +1,66 @@
+import asyncio
+import time
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.core.testing import database_url, async_database_url
+from app.core.warmup import Warmup
+from app.main import warmup as app_warmup
+from app.store_system import WARMUP_CRUDS as STORE_WARMUP_CRUDS
+from app.parking_system import WARMUP_CRUDS as PARKING_WARMUP_CRUDS
+
+
+# 워밍업이 끝나지 않는 상태 (TestClient 종료 시 shutdown 이벤트가 작업을 취소한다)
+@pytest.fixture
+def not_ready(monkeypatch):
+    async def never_finishes():
+        await asyncio.Event().wait()
+
+    ready = app_warmup.ready
+    app_warmup.ready = False
+    monkeypatch.setattr(app_warmup, "warm", never_finishes)
+    yield app_warmup
+    app_warmup.ready = ready
+
+
+# 앞선 테스트가 끝낸 워밍업 상태를 지워서 이번 startup 의 워밍업을 기다리게 한다 (test_client 보다 먼저 둔다)
+@pytest.fixture
+def warming_up():
+    app_warmup.ready = False
+    yield app_warmup
+
+
+def test_ready_after_warmup(warming_up, test_client):
+    # 워밍업은 startup 이벤트가 띄운 백그라운드 작업이므로 끝날 때까지 (최대 5초) /ready 를 다시 묻는다
+    deadline = time.monotonic() + 5
+    response = test_client.get("/ready")
+    while response.status_code == 503 and time.monotonic() < deadline:
+        time.sleep(0.01)
+        response = test_client.get("/ready")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready"}
+
+
+def test_not_ready_during_warmup(not_ready, test_client):
+    response = test_client.get("/ready")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+async def test_warmup_fills_pools_and_statement_cache(test_database):
+    engine = create_engine(database_url(test_database), pool_size=3, max_overflow=2)
+    async_engine = create_async_engine(async_database_url(test_database), pool_size=2, max_overflow=2)
+    warmup = Warmup(engine, async_engine, connections=5, async_connections=2,
+                    sync_cruds=STORE_WARMUP_CRUDS, async_cruds=PARKING_WARMUP_CRUDS)
+    try:
+        await warmup.run()
+        assert warmup.ready
+        # pool_size 까지만 열어 둔다 (넘는 커넥션은 반납하면 닫힌다)
+        assert (engine.pool.checkedin(), engine.pool.checkedout()) == (3, 0)
+        assert async_engine.sync_engine.pool.checkedin() == 2
+        # CRUD 기본 조회 3개씩이 컴파일 캐시에 들어가 있다
+        assert len(engine._compiled_cache) >= 3 * len(STORE_WARMUP_CRUDS)
+        assert len(async_engine.sync_engine._compiled_cache) >= 3 * len(PARKING_WARMUP_CRUDS)
+    finally:
+        engine.dispose()
+        await async_engine.dispose()
@@ -0,0 +1,20 @@
+import pytest
+from app.core.crud.base import AsyncCRUDBase
+from app.store_system import crud, models, schemas
+
+async_customer = AsyncCRUDBase(models.Customer)
+
+# 같은 이메일로 두 번 생성해도 테스트마다 롤백되므로 충돌하지 않아야 한다
+@pytest.mark.parametrize("run", [1, 2])
+def test_create_customer_is_rolled_back(db_session, run):
+    customer_in = schemas.CustomerCreate(name="Isolated", email="isolated@example.com")
+    customer = crud.customer.create(db_session, obj_in=customer_in)
+    assert customer.id is not None
+    assert crud.customer.get_by_email(db_session, email="isolated@example.com").id == customer.id
+
+@pytest.mark.parametrize("run", [1, 2])
+async def test_async_create_customer_is_rolled_back(async_db_session, run):
+    customer_in = schemas.CustomerCreate(name="Isolated", email="isolated@example.com")
+    customer = await async_customer.create(async_db_session, obj_in=customer_in)
+    assert customer.id is not None
+    assert (await async_customer.get(async_db_session, id=customer.id)).email == "isolated@example.com"
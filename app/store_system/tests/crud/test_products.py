@@ -0,0 +1,26 @@
+from datetime import date
+from sqlalchemy import text
+from app.store_system import crud, schemas
+
+
+def test_reconcile_inventory_repairs_drift(db_session):
+    product = crud.product.create(db_session, obj_in=schemas.ProductCreate(name="Widget", price=1.5))
+    crud.product_arrival.create(db_session, obj_in=schemas.ProductArrivalCreate(
+        product_id=product.id, arrival_date=date.today(), quantity=10))
+    assert crud.get_product_stock(db_session, product_id=product.id) == 10
+
+    # 카운터를 우회한 변경으로 재고가 어긋난 상황
+    db_session.execute(text("UPDATE inventory SET quantity = 3 WHERE product_id = :id"), {"id": product.id})
+
+    assert crud.inventory.reconcile(db_session) == [product.id]
+    assert crud.get_product_stock(db_session, product_id=product.id) == 10
+    assert crud.inventory.reconcile(db_session) == []
+
+
+def test_count_stops_at_cap(db_session):
+    for _ in range(3):
+        crud.product.create(db_session, obj_in=schemas.ProductCreate(name="Counted", price=4242.0))
+
+    assert tuple(crud.product.count_by_price_range(db_session, min_price=4242, max_price=4242)) == (3, "exact")
+    total = crud.product.count(db_session, crud.product.model.price == 4242.0, cap=2)
+    assert (total.header(), total.accuracy) == ("2+", "at_least")
@@ -0,0 +1,195 @@
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import date
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from app.core import partitioning
+from app.core.coalescer import WriteCoalescer
+from app.store_system import crud, schemas
+
+
+def _create_purchase(db, purchase_date, quantity=1):
+    customer = crud.customer.create(db, obj_in=schemas.CustomerCreate(name="Buyer", email=f"buyer{purchase_date}@example.com"))
+    product = crud.product.create(db, obj_in=schemas.ProductCreate(name="Widget", price=1.0))
+    return crud.purchase.create(db, obj_in=schemas.PurchaseCreate(
+        customer_id=customer.id, product_id=product.id, purchase_date=purchase_date, quantity=quantity))
+
+
+def _partition_of(db, purchase_id):
+    return db.execute(text("SELECT tableoid::regclass::text FROM purchases WHERE id = :id"), {"id": purchase_id}).scalar()
+
+
+def test_ensure_partitions_moves_rows_out_of_default(db_session):
+    purchase = _create_purchase(db_session, date(2031, 2, 14))
+    assert _partition_of(db_session, purchase.id) == "purchases_default"
+
+    created = crud.purchase.ensure_partitions(db_session, months_ahead=1, today=date(2031, 2, 1))
+    assert created == ["purchases_y2031m02", "purchases_y2031m03"]
+    assert _partition_of(db_session, purchase.id) == "purchases_y2031m02"
+    # ORM 은 id 만으로 조회/수정/삭제한다
+    assert crud.purchase.get(db_session, id=purchase.id).purchase_date == date(2031, 2, 14)
+    assert crud.purchase.ensure_partitions(db_session, months_ahead=1, today=date(2031, 2, 1)) == []
+
+
+def test_date_range_query_prunes_partitions(db_session):
+    crud.purchase.ensure_partitions(db_session, months_ahead=2, today=date(2031, 1, 1))
+    plan = "\n".join(db_session.execute(text(
+        "EXPLAIN SELECT * FROM purchases WHERE purchase_date BETWEEN '2031-02-03' AND '2031-02-20'"
+    )).scalars())
+    assert "purchases_y2031m02" in plan
+    assert "purchases_y2031m01" not in plan
+    assert "purchases_y2031m03" not in plan
+
+
+def test_expire_partitions_keeps_inventory_reconcilable(db_session):
+    crud.purchase.ensure_partitions(db_session, months_ahead=0, today=date(2031, 1, 1))
+    purchase = _create_purchase(db_session, date(2031, 1, 10), quantity=4)
+    purchase_id, product_id = purchase.id, purchase.product_id
+    assert crud.get_product_stock(db_session, product_id=product_id) == -4
+
+    expired = crud.purchase.expire_partitions(db_session, retention_months=3, drop=True, today=date(2031, 5, 1))
+    assert "purchases_y2031m01" in expired
+    assert crud.purchase.get(db_session, id=purchase_id) is None
+    assert [p.name for p in partitioning.list_partitions(db_session, "purchases") if p.name == "purchases_y2031m01"] == []
+    # 분리된 구매 수량이 합계에 남아 있어서 재계산해도 재고가 바뀌지 않는다
+    assert product_id not in crud.inventory.reconcile(db_session)
+    assert crud.get_product_stock(db_session, product_id=product_id) == -4
+
+
+def test_create_many_adjusts_inventory_once_per_product(db_session):
+    customer = crud.customer.create(db_session, obj_in=schemas.CustomerCreate(name="Buyer", email="batch@example.com"))
+    first = crud.product.create(db_session, obj_in=schemas.ProductCreate(name="Widget", price=1.0))
+    second = crud.product.create(db_session, obj_in=schemas.ProductCreate(name="Gadget", price=2.0))
+    purchases_in = [
+        schemas.PurchaseCreate(customer_id=customer.id, product_id=product_id, purchase_date=date(2031, 3, 1), quantity=quantity)
+        for product_id, quantity in [(second.id, 1), (first.id, 2), (second.id, 3)]
+    ]
+    created = crud.purchase.create_many(db_session, purchases_in)
+
+    assert [(row.product_id, row.quantity) for row in created] == [(second.id, 1), (first.id, 2), (second.id, 3)]
+    assert len({row.id for row in created}) == 3
+    assert crud.get_product_stock(db_session, product_id=first.id) == -2
+    assert crud.get_product_stock(db_session, product_id=second.id) == -4
+
+
+class _Submit(threading.Thread):
+    """스레드에서 coalescer.submit() 을 호출하고 결과(또는 예외)를 result 에 남긴다. 큐에 들어간 뒤에 돌아온다."""
+
+    def __init__(self, coalescer, item):
+        super().__init__()
+        self.coalescer, self.item, self.result = coalescer, item, None
+        submitted = coalescer.submitted
+        self.start()
+        while coalescer.submitted == submitted:
+            time.sleep(0.001)
+
+    def run(self):
+        try:
+            self.result = self.coalescer.submit(self.item)
+        except BaseException as e:
+            self.result = e
+
+
+def _submit_together(coalescer, items):
+    # 모두 큐에 들어간 뒤 창(window)을 기다리지 않고 바로 한 배치로 처리시킨다
+    submits = [_Submit(coalescer, item) for item in items]
+    coalescer.flush_now()
+    for submit in submits:
+        submit.join(5)
+    return [submit.result for submit in submits]
+
+
+def test_coalescer_flushes_concurrent_submits_together(db_session):
+    customer = crud.customer.create(db_session, obj_in=schemas.CustomerCreate(name="Buyer", email="coalesce@example.com"))
+    product = crud.product.create(db_session, obj_in=schemas.ProductCreate(name="Widget", price=1.0))
+    batches = []
+
+    def flush(purchases_in):
+        batches.append(len(purchases_in))
+        return crud.purchase.create_many(db_session, purchases_in)
+
+    coalescer = WriteCoalescer(flush, window=60, max_batch=10, name="test")
+    # 고객이 없는 구매가 섞이면 배치를 하나씩 다시 처리해서 그 요청만 실패한다
+    results = _submit_together(coalescer, [
+        schemas.PurchaseCreate(customer_id=customer_id, product_id=product.id, purchase_date=date(2031, 3, 1), quantity=1)
+        for customer_id in (customer.id, customer.id, -1, customer.id)
+    ])
+    coalescer.close()
+
+    assert batches == [4, 1, 1, 1, 1]
+    assert isinstance(results[2], IntegrityError)
+    assert all(results[i].customer_id == customer.id for i in (0, 1, 3))
+    assert crud.get_product_stock(db_session, product_id=product.id) == -3
+    with pytest.raises(RuntimeError):
+        coalescer.submit(schemas.PurchaseCreate(customer_id=customer.id, product_id=product.id, purchase_date=date(2031, 3, 1), quantity=1))
+
+
+def test_coalescer_fails_items_without_a_result():
+    # 결과가 항목보다 적으면 어느 요청의 결과인지 모르므로 모두 실패한다
+    coalescer = WriteCoalescer(lambda items: items[:1], window=60, max_batch=10, name="test")
+    results = _submit_together(coalescer, ["a", "b"])
+    coalescer.close()
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+class _Crash(BaseException):
+    pass
+
+
+def test_coalescer_rejects_queued_items_when_worker_stops():
+    flushing, release = threading.Event(), threading.Event()
+
+    def flush(items):
+        flushing.set()
+        release.wait(5)
+        raise _Crash()
+
+    coalescer = WriteCoalescer(flush, window=0, max_batch=1, name="test")
+    first = _Submit(coalescer, "first")
+    flushing.wait(5)
+    # 처리 스레드가 죽으면 뒤에 큐에 있던 항목도 결과를 기다리지 않고 실패한다
+    queued = _Submit(coalescer, "queued")
+    release.set()
+    first.join(5)
+    queued.join(5)
+    assert isinstance(first.result, _Crash)
+    assert isinstance(queued.result, RuntimeError)
+    with pytest.raises(RuntimeError):
+        coalescer.submit("after")
+
+
+def test_coalescer_submit_times_out_without_writing():
+    flushing, release = threading.Event(), threading.Event()
+    flushed = []
+
+    def flush(items):
+        flushing.set()
+        release.wait(5)
+        flushed.extend(items)
+        return items
+
+    coalescer = WriteCoalescer(flush, window=0, max_batch=1, name="test")
+    first = _Submit(coalescer, "first")
+    flushing.wait(5)
+    # 처리 스레드가 바쁜 동안 기한이 지난 항목은 쓰지 않는다
+    with pytest.raises(FutureTimeoutError):
+        coalescer.submit("late", timeout=0.05)
+    release.set()
+    first.join(5)
+    coalescer.close()
+    assert first.result == "first"
+    assert flushed == ["first"]
+
+
+def test_unfiltered_count_uses_partition_statistics(db_session):
+    for day in (1, 2, 3):
+        _create_purchase(db_session, date(2031, 5, day))
+    # 통계상 행 수가 cap(LIST_COUNT_CAP) 이하면 직접 센다
+    db_session.execute(text("ANALYZE purchases"))
+    exact = crud.purchase.count(db_session)
+    assert exact.accuracy == "exact" and exact.value >= 3
+    # 파티션별 reltuples 를 더한 값이 cap 보다 크면 세지 않고 추정치를 쓴다
+    estimate = crud.purchase.count(db_session, cap=1)
+    assert estimate.accuracy == "estimate" and estimate.value >= 3
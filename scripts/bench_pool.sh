@@ -0,0 +1,7 @@
+#!/bin/bash
+
+# 고정 크기 커넥션 풀과 자동 조절 풀을 같은 locust 시나리오로 비교 (추가 인자는 benchmark 에 전달, 예: -u 500 -t 5m)
+docker-compose exec app python -m app.load_tests.benchmark \
+    --variant fixed: \
+    --variant adaptive:DB_POOL_ADAPTIVE=true,DB_POOL_ADAPT_INTERVAL=2 \
+    "$@"
@@ -0,0 +1,10 @@
+#!/bin/bash
+
+# 기본 스레드풀(anyio 40개)과 커넥션 풀 크기에 맞춘 스레드풀을 같은 locust 시나리오로 비교 (추가 인자는 benchmark 에 전달, 예: -u 500 -t 5m).
+# 부하 차단을 끈 변형은 스레드 수만의 효과를 본다
+docker-compose exec app python -m app.load_tests.benchmark \
+    --variant threads40:THREADPOOL_SIZE=40 \
+    --variant matched: \
+    --variant threads40-no-admission:THREADPOOL_SIZE=40,ADMISSION_ENABLED=false \
+    --variant matched-no-admission:ADMISSION_ENABLED=false \
+    "$@"
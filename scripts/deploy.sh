@@ -8,14 +8,9 @@ done
 
 echo "PostgreSQL started"
 
-# 마이그레이션 디렉토리가 비어있는지 확인
-if [ -z "$(ls -A /dbtest/alembic/versions)" ]; then
-  echo "Generating initial migration"
-  alembic revision --autogenerate -m "Initial migration"
-fi
-
-# 마이그레이션 실행
+# 마이그레이션 실행 (alembic/versions 에 커밋된 리비전 적용)
 alembic upgrade head
 
 # FastAPI 애플리케이션 실행
-uvicorn app.main:app --host 0.0.0.0 --port 8000
\ No newline at end of file
+# exec: 종료 신호(SIGTERM)가 셸이 아니라 서버 프로세스로 가야 진행 중인 요청을 drain 할 수 있다
+exec python -m app.serve --host 0.0.0.0 --port 8000
\ No newline at end of file
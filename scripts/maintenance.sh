@@ -0,0 +1,4 @@
+#!/bin/bash
+
+# store_system 유지보수 작업 실행 (예: ./scripts/maintenance.sh reconcile-inventory)
+docker-compose exec app python -m app.store_system.maintenance "$@"
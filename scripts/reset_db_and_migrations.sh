@@ -23,24 +23,16 @@ docker-compose up -d
 echo "데이터베이스가 시작되기를 기다립니다..."
 sleep 10
 
-# 3. alembic_version 테이블 비우기 (존재한다면)
-echo "alembic_version 테이블을 비웁니다..."
-docker-compose exec db psql -U user -d testdb -c "DELETE FROM alembic_version;" || true
-
-# 4. 새로운 마이그레이션 생성
-echo "새로운 마이그레이션을 생성합니다..."
-docker-compose exec app alembic revision --autogenerate -m "recreate initial migration"
-
-# 5. 마이그레이션 적용
+# 3. 마이그레이션 적용 (alembic/versions 에 커밋된 리비전)
 echo "마이그레이션을 적용합니다..."
 docker-compose exec app alembic upgrade head
 
-# 6. 마이그레이션 상태 확인
+# 4. 마이그레이션 상태 확인
 echo "마이그레이션 상태를 확인합니다..."
 docker-compose exec app alembic history
 docker-compose exec app alembic current
 
-# 7. 애플리케이션 재시작
+# 5. 애플리케이션 재시작
 echo "애플리케이션을 재시작합니다..."
 docker-compose restart app
 
@@ -1,2 +1,3 @@
 #!/bin/bash
-docker-compose run --rm app poetry run pytest
\ No newline at end of file
+# pytest-xdist 로 CPU 코어 수만큼 병렬 실행 (워커마다 템플릿 DB 를 복제한 전용 DB 사용)
+docker-compose run --rm app poetry run pytest -n auto "$@"